@@ -1056,6 +1056,8 @@ class Server:
         # defaults to 'basic', other possible values are 'digest' and 'kerberos'
         self.authentication = 'basic'
         self.timeout = 30
+        # number of items per request for monitors with paginated APIs
+        self.page_size = 1000
         # just GUI-wise deciding if more options are shown in server dialog
         self.show_options = False
 
@@ -1113,6 +1115,7 @@ class Server:
 
         # Alertmanager mappings
         self.alertmanager_filter = ''
+        self.alertmanager_peers = ''
         self.map_to_critical = 'critical,error'
         self.map_to_warning = 'warning,warn'
         self.map_to_down = 'down'
@@ -1128,10 +1131,15 @@ class Server:
 
         # Thruk
         self.disabled_backends = ""
+        self.use_rest_api = False
+        self.backend_timeout = 10
 
         # LibreNMS
         self.treat_services_as_alerts = False
 
+        # Icinga2API
+        self.use_event_stream = False
+
 
 class Action:
     """
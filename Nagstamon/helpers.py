@@ -15,10 +15,13 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
+from collections import OrderedDict
 import datetime
 import getpass
 from glob import glob
 import os
+import threading
+import time
 from urllib.parse import quote
 
 import psutil
@@ -118,6 +121,192 @@ class FilesDict(dict):
         return key
 
 
+class TTLCache:
+    """
+    Size-limited key/value cache whose entries expire after ttl seconds
+    When full the least recently used entry is dropped first
+    Used by servers to keep metadata like device names or rule names between status polls
+    """
+    def __init__(self, maxsize=1000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (expiry timestamp, value), ordered by last access
+        self._data = OrderedDict()
+        # servers might fill caches from several threads when fetching concurrently
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        return value of key if it exists and is not expired yet, otherwise default
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        """
+        store value with optional individual ttl
+        """
+        if ttl is None:
+            ttl = self.ttl
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def update(self, items, ttl=None):
+        """
+        store several key/value pairs at once, for example after a batch prefetch
+        """
+        for key, value in dict(items).items():
+            self.set(key, value, ttl=ttl)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        if entry is None:
+            return default
+        return entry[1]
+
+    def expire(self):
+        """
+        remove all expired entries
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key in [k for k, v in self._data.items() if v[0] < now]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def items(self):
+        """
+        list of (key, value) tuples of all valid entries
+        """
+        self.expire()
+        with self._lock:
+            return [(key, entry[1]) for key, entry in self._data.items()]
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def __len__(self):
+        self.expire()
+        return len(self._data)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket which allows rate requests per second with bursts of up to burst requests
+    Used by servers to keep mass actions like recheck all from flooding the monitor
+    """
+    def __init__(self, rate=10, burst=1, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(1, burst)
+        # clock is exchangeable to check the token arithmetic without waiting
+        self._clock = clock
+        self._tokens = float(self.burst)
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, cancel=None):
+        """
+        block until a token is available, gives back False if cancel event has been set meanwhile
+        """
+        while cancel is None or not cancel.is_set():
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            # waiting on the event makes cancellation effective immediately
+            if cancel is None:
+                time.sleep(wait)
+            else:
+                cancel.wait(wait)
+        return False
+
+
+class ActionQueue:
+    """
+    Queue which runs actions one after another in its own thread, separated from the status polling
+    Identical actions which are still pending get merged, transient failures are retried with exponential backoff
+    """
+    def __init__(self, name='actions', retries=3, backoff=1.0, is_transient=None):
+        self.name = name
+        self.retries = retries
+        self.backoff = backoff
+        # decides by error string if an action is worth to be tried again
+        self.is_transient = is_transient or (lambda error: False)
+        # key -> (function, args, callbacks), the first one is the running action
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, key, function, *args, callback=None):
+        """
+        queue function(*args) - gives back False if an identical action is already pending and got merged
+        callback(error) is called when the action is done, error is '' in case of success
+        """
+        with self._lock:
+            if key in self._pending:
+                if callback:
+                    self._pending[key][2].append(callback)
+                return False
+            self._pending[key] = (function, args, [callback] if callback else [])
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        return True
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                key, (function, args, callbacks) = next(iter(self._pending.items()))
+            error = self._execute(function, args)
+            with self._lock:
+                self._pending.pop(key, None)
+            for callback in callbacks:
+                callback(error)
+
+    def _execute(self, function, args):
+        """
+        run function until it succeeds, fails permanently or retries are used up, gives back error string
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                result = function(*args)
+                # actions might give back a Result object, refused requests count as failed too
+                error = getattr(result, 'error', '') or ''
+                status_code = getattr(result, 'status_code', 0) or 0
+                if not error and status_code >= 400:
+                    error = 'HTTP status {0}'.format(status_code)
+            except Exception as exception:
+                error = traceback.format_exception_only(type(exception), exception)[0]
+            if not error or attempt == self.retries or not self.is_transient(error):
+                return error
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+
 def not_empty(x):
     '''
     tiny helper function for BeautifulSoup in server Generic.py to filter text elements
@@ -115,6 +115,8 @@ class DialogServer(Dialog):
             self.window.input_lineedit_map_to_status_information: ['Prometheus', 'Alertmanager'],
             self.window.label_alertmanager_filter: ['Alertmanager'],
             self.window.input_lineedit_alertmanager_filter: ['Alertmanager'],
+            self.window.label_alertmanager_peers: ['Alertmanager'],
+            self.window.input_lineedit_alertmanager_peers: ['Alertmanager'],
             self.window.label_map_to_ok: ['Alertmanager'],
             self.window.input_lineedit_map_to_ok: ['Alertmanager'],
             self.window.label_map_to_unknown: ['Alertmanager'],
@@ -133,6 +135,14 @@ class DialogServer(Dialog):
             self.window.label_custom_filter: ['IcingaDBWeb'],
             self.window.label_disabled_backends: ['Thruk'],
             self.window.input_lineedit_disabled_backends: ['Thruk'],
+            self.window.input_checkbox_use_rest_api: ['Thruk'],
+            self.window.input_checkbox_use_event_stream: ['Icinga2API'],
+            self.window.label_backend_timeout: ['Thruk', 'Alertmanager'],
+            self.window.input_spinbox_backend_timeout: ['Thruk', 'Alertmanager'],
+            self.window.label_backend_timeout_sec: ['Thruk', 'Alertmanager'],
+            self.window.label_page_size: ['Centreon', 'monitos4x', 'op5Monitor', 'SensuGo', 'SNAG-View 3'],
+            self.window.input_spinbox_page_size: ['Centreon', 'monitos4x', 'op5Monitor', 'SensuGo', 'SNAG-View 3'],
+            self.window.label_page_size_items: ['Centreon', 'monitos4x', 'op5Monitor', 'SensuGo', 'SNAG-View 3'],
         }
 
         # to be used when selecting authentication method Kerberos or Web
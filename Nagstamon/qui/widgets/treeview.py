@@ -14,10 +14,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
-from copy import deepcopy
 from datetime import datetime
 from subprocess import Popen
 from sys import stdout
+from threading import (Event,
+                       Thread)
 from traceback import print_exc
 from urllib.parse import quote
 
@@ -688,7 +689,6 @@ class TreeView(QTreeView):
 
             # get data to send to action
             server = self.server.get_name()
-            address = self.server.get_host(miserable_host).result
             monitor = self.server.monitor_url
             monitor_cgi = self.server.monitor_cgi_url
             username = self.server.username
@@ -703,7 +703,8 @@ class TreeView(QTreeView):
                                       'host': miserable_host,
                                       'service': miserable_service,
                                       'status-info': miserable_status_info,
-                                      'address': address,
+                                      # address is looked up by worker if needed, see Worker.execute_action()
+                                      'address': None,
                                       'monitor': monitor,
                                       'monitor-cgi': monitor_cgi,
                                       'username': username,
@@ -851,7 +852,8 @@ class TreeView(QTreeView):
                     'host': host,
                     'service': service,
                     'status-info': status,
-                    'address': self.server.get_host(host).result,
+                    # address is looked up by worker if needed, see Worker.execute_action()
+                    'address': None,
                     'monitor': self.server.monitor_url,
                     'monitor-cgi': self.server.monitor_cgi_url,
                     'username': self.server.username,
@@ -1114,6 +1116,9 @@ class TreeView(QTreeView):
 
             self.parent_statuswindow = status_window
 
+            # set to stop a running recheck_all
+            self.recheck_all_cancel = Event()
+
             self.get_status_successful.connect(self.parent_statuswindow.injected_dialogs.weblogin.close_browser)
 
         @Slot()
@@ -1205,6 +1210,8 @@ class TreeView(QTreeView):
             if self.running:
                 self.timer.singleShot(1000, self.get_status)
             else:
+                # no more rechecks if the worker is going to stop
+                self.recheck_all_cancel.set()
                 # tell treeview to finish worker_thread
                 self.finish.emit()
 
@@ -1324,7 +1331,8 @@ class TreeView(QTreeView):
             # otherwise there are several calls and not only one as wanted
             if self.server == info_dict['server']:
                 # pass dictionary to server's acknowledge machinery
-                self.server.set_acknowledge(info_dict)
+                self.server.queue_action('acknowledge', info_dict, self.server.set_acknowledge,
+                                         callback=self.action_finished)
 
         @Slot(dict)
         def downtime(self, info_dict):
@@ -1337,7 +1345,8 @@ class TreeView(QTreeView):
             # otherwise there are several calls and not only one as wanted
             if self.server == info_dict['server']:
                 # pass dictionary to server's downtime machinery
-                self.server.set_downtime(info_dict)
+                self.server.queue_action('downtime', info_dict, self.server.set_downtime,
+                                         callback=self.action_finished)
 
         @Slot(dict)
         def submit(self, info_dict):
@@ -1349,8 +1358,9 @@ class TreeView(QTreeView):
             # because all monitors are connected to this slot we must check which one sent the signal,
             # otherwise there are several calls and not only one as wanted
             if self.server == info_dict['server']:
-                # pass dictionary to server's downtime machinery
-                self.server.set_submit_check_result(info_dict)
+                # pass dictionary to server's submit check result machinery
+                self.server.queue_action('submit', info_dict, self.server.set_submit_check_result,
+                                         callback=self.action_finished)
 
         @Slot(dict)
         def recheck(self, info_dict):
@@ -1366,48 +1376,79 @@ class TreeView(QTreeView):
                                       debug='Rechecking service {0} on host {1}'.format(info_dict['service'],
                                                                                         info_dict['host']))
 
-            # call server recheck method
-            self.server.set_recheck(info_dict)
+            # call server recheck method in background
+            self.server.queue_action('recheck', info_dict, self.server.set_recheck, callback=self.action_finished)
+
+        def action_finished(self, action, error):
+            """
+            give feedback about finished background action on server vbox label
+            called from action queue thread, so only signals are used
+            """
+            if error:
+                # kick out line breaks to avoid broken status window
+                self.change_label_status.emit('{0} failed: {1}'.format(action.capitalize(),
+                                                                       error.strip().replace('\n', ' ')), 'error')
+            else:
+                self.change_label_status.emit('{0} done'.format(action.capitalize()), '')
 
         @Slot()
         def recheck_all(self):
             """
-            call server.set_recheck for every single host/service
+            recheck all visible hosts and services in a separate thread to keep the status refresh going
+            triggering it again while rechecking cancels the running recheck
             """
             # only if no already rechecking
             if self.rechecking_all is False:
                 # block rechecking
                 self.rechecking_all = True
+                self.recheck_all_cancel.clear()
                 # change label of server vbox
                 self.change_label_status.emit('Rechecking all...', '')
                 if conf.debug_mode:
                     self.server.debug(server=self.server.name, debug='Start rechecking all')
-                # make a copy to preserve hosts/service to recheck - just in case something changes meanwhile
-                nagitems_filtered = deepcopy(self.server.nagitems_filtered)
-                for status in nagitems_filtered['hosts'].items():
-                    for host in status[1]:
-                        if conf.debug_mode:
-                            self.server.debug(server=self.server.name,
-                                              debug='Rechecking host {0}'.format(host.name))
-                        # call server recheck method
-                        self.server.set_recheck({'host': host.name, 'service': ''})
-                for status in nagitems_filtered['services'].items():
-                    for service in status[1]:
-                        if conf.debug_mode:
-                            self.server.debug(server=self.server.name,
-                                              debug='Rechecking service {0} on host {1}'.format(
-                                                  service.get_service_name(),
-                                                  service.host))
-                        # call server recheck method
-                        self.server.set_recheck({'host': service.host, 'service': service.name})
-                del nagitems_filtered, status
-                # release rechecking lock
-                self.rechecking_all = False
-                # restore server status label
-                self.restore_label_status.emit()
+                # collect names only to preserve hosts/service to recheck - just in case something changes meanwhile
+                items = [(host.name, '')
+                         for hosts in self.server.nagitems_filtered['hosts'].values() for host in hosts]
+                items.extend((service.host, service.name)
+                             for services in self.server.nagitems_filtered['services'].values()
+                             for service in services)
+                Thread(target=self._recheck_all, args=(items,), daemon=True).start()
             else:
                 if conf.debug_mode:
-                    self.server.debug(server=self.server.name, debug='Already rechecking all')
+                    self.server.debug(server=self.server.name, debug='Already rechecking all - cancelling')
+                self.recheck_all_cancel.set()
+
+        def _recheck_all(self, items):
+            """
+            run server.set_recheck_all() and report progress to the server vbox label
+            """
+            try:
+                done, failed = self.server.set_recheck_all(items,
+                                                           progress=self._recheck_all_progress,
+                                                           cancel=self.recheck_all_cancel)
+                if conf.debug_mode:
+                    self.server.debug(server=self.server.name,
+                                      debug='Rechecked {0} of {1} hosts and services, {2} failed'.format(done, len(items),
+                                                                                                        failed))
+                # progress replaced the former label text, so the result is shown until the next refresh
+                if self.recheck_all_cancel.is_set():
+                    self.change_label_status.emit('Recheck all cancelled after {0} of {1}, {2} failed'.format(
+                        done + failed, len(items), failed), '')
+                elif failed:
+                    self.change_label_status.emit('Rechecked {0} of {1}, {2} failed'.format(done, len(items), failed),
+                                                  '')
+                else:
+                    self.change_label_status.emit('Rechecked {0} hosts and services'.format(done), '')
+            finally:
+                # release rechecking lock
+                self.rechecking_all = False
+
+        def _recheck_all_progress(self, done, total):
+            """
+            show recheck all progress, but not for every single item
+            """
+            if done == total or done % 10 == 0:
+                self.change_label_status.emit('Rechecking all... {0}/{1}'.format(done, total), '')
 
         @Slot(str, str)
         def get_start_end(self, server_name, host):
@@ -1432,7 +1473,7 @@ class TreeView(QTreeView):
             # $SERVICE$          - service as in monitor
             # $MONITOR$          - monitor address - not yet clear what exactly for
             # $MONITOR-CGI$      - monitor CGI address - not yet clear what exactly for
-            # $ADDRESS$          - address of host, investigated by Server.GetHost()
+            # $ADDRESS$          - address of host, investigated by Server.get_host()
             # $STATUS-INFO$      - status information
             # $USERNAME$         - username on monitor
             # $PASSWORD$         - username's password on monitor - whatever for
@@ -1447,6 +1488,14 @@ class TreeView(QTreeView):
                 else:
                     cgi_data = ''
 
+                # looking up the address might need a request or reverse DNS so it is done here and not in
+                # the GUI thread, and only if the action uses it at all
+                if info.get('address') is None:
+                    if '$ADDRESS$' in action['string'] or '$ADDRESS$' in str(cgi_data):
+                        info['address'] = self.server.get_host(info['host']).result
+                    else:
+                        info['address'] = ''
+
                 # mapping of variables and values
                 mapping = {'$HOST$': info['host'],
                            '$SERVICE$': info['service'],
@@ -1495,7 +1544,10 @@ class TreeView(QTreeView):
                     if conf.debug_mode is True:
                         self.server.debug(server=self.server.name, host=info['host'], service=info['service'],
                                           debug='ACTION: URL in background ' + string)
-                    servers[info['server']].fetch_url(string)
+                    server = servers[info['server']]
+                    server.queue_action('url', {'host': info['host'], 'service': info['service'], 'url': string},
+                                        lambda info_dict: server.fetch_url(info_dict['url']),
+                                        callback=self.action_finished)
                 # used for example by Op5Monitor.py
                 elif action['type'] == 'url-post':
                     # make string ready for URL
@@ -1504,7 +1556,13 @@ class TreeView(QTreeView):
                     if conf.debug_mode is True:
                         self.server.debug(server=self.server.name, host=info['host'], service=info['service'],
                                           debug='ACTION: URL-POST in background ' + string)
-                    servers[info['server']].fetch_url(string, cgi_data=cgi_data, multipart=True)
+                    server = servers[info['server']]
+                    server.queue_action('url-post', {'host': info['host'], 'service': info['service'],
+                                                     'url': string, 'cgi_data': cgi_data},
+                                        lambda info_dict: server.fetch_url(info_dict['url'],
+                                                                           cgi_data=info_dict['cgi_data'],
+                                                                           multipart=True),
+                                        callback=self.action_finished)
 
                 if action['recheck']:
                     self.recheck(info)
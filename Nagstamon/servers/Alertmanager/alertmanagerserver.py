@@ -1,18 +1,24 @@
 import sys
 import json
 import re
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 from datetime import datetime, timedelta, timezone
+from urllib.parse import urlencode
 
 from Nagstamon.config import conf
 from Nagstamon.objects import (GenericHost, Result)
 from Nagstamon.servers.Generic import GenericServer
 from Nagstamon.helpers import webbrowser_open
 
+import dateutil.parser
+
 from .helpers import (start_logging,
-                      get_duration,
+                      format_duration,
                       convert_timestring_to_utc,
-                      detect_from_labels)
+                      compile_label_mapping)
 
 from .alertmanagerservice import AlertmanagerService
 
@@ -34,10 +40,14 @@ class AlertmanagerServer(GenericServer):
         'history':  '$MONITOR$/#/alerts'
     }
 
-    API_PATH_ALERTS = "/api/v2/alerts?inhibited=false"
+    API_PATH_ALERTS = "/api/v2/alerts"
     API_PATH_SILENCES = "/api/v2/silences"
     API_FILTERS = '&filter='
 
+    # regular expressions which mean the same in Python and in the RE2 syntax of Alertmanager
+    SIMPLE_REGEX = re.compile(r'[\w .,/|^*+?()\[\]-]*')
+    LABEL_NAME = re.compile(r'[a-zA-Z_][a-zA-Z0-9_]*')
+
     # vars specific to alertmanager class
     map_to_hostname = ''
     map_to_servicename = ''
@@ -49,6 +59,17 @@ class AlertmanagerServer(GenericServer):
     map_to_ok = ''
     name = ''
     alertmanager_filter = ''
+    alertmanager_peers = ''
+
+    def __init__(self, **kwds):
+        GenericServer.__init__(self, **kwds)
+
+        # processed alerts by fingerprint - alerts which did not change are not processed again
+        self.alert_cache = {}
+        # mapping config the cached alerts were processed with
+        self.alert_cache_config = None
+        # cluster peer which answered first during last poll, used for silences
+        self.active_peer_url = None
 
 
     def init_http(self):
@@ -80,6 +101,21 @@ class AlertmanagerServer(GenericServer):
         return (str(start.strftime("%Y-%m-%d %H:%M:%S")),
                 str(end.strftime("%Y-%m-%d %H:%M:%S")))
 
+    def get_label_plan(self):
+        """Returns the label mapping plan for the current mapping config
+
+        Returns:
+            LabelMappingPlan: The plan shared by all servers with the same config
+        """
+        return compile_label_mapping(self.map_to_hostname,
+                                     self.map_to_servicename,
+                                     self.map_to_status_information,
+                                     (("UNKNOWN", self.map_to_unknown),
+                                      ("CRITICAL", self.map_to_critical),
+                                      ("WARNING", self.map_to_warning),
+                                      ("DOWN", self.map_to_down),
+                                      ("OK", self.map_to_ok)))
+
     def map_severity(self, the_severity):
         """Maps a severity
 
@@ -89,19 +125,45 @@ class AlertmanagerServer(GenericServer):
         Returns:
             str: The matched Nagstamon severity
         """
-        if the_severity in self.map_to_unknown.split(','):
-            return "UNKNOWN"
-        if the_severity in self.map_to_critical.split(','):
-            return "CRITICAL"
-        if the_severity in self.map_to_warning.split(','):
-            return "WARNING"
-        if the_severity in self.map_to_down.split(','):
-            return "DOWN"
-        if the_severity in self.map_to_ok.split(','):
-            return "OK"
-        return the_severity.upper()
+        return self.get_label_plan().map_severity(the_severity)
 
     def _process_alert(self, alert):
+        """
+        process alert or take it from cache if it did not change since the last poll
+        time dependent fields are always computed fresh from the already parsed timestamps
+        """
+        fingerprint = alert.get("fingerprint")
+        # labels define the fingerprint, so only these can change for the same alert
+        signature = (alert.get("status"), alert.get("annotations"), alert.get("startsAt"))
+        cached = self.alert_cache.get(fingerprint) if fingerprint else None
+        if cached is None or cached['signature'] != signature:
+            record = self._process_alert_uncached(alert)
+            if record:
+                record['starts_at'] = dateutil.parser.parse(alert["startsAt"])
+                record['updated_at'] = dateutil.parser.parse(alert["updatedAt"])
+                record['updated_at_string'] = alert["updatedAt"]
+            cached = {'signature': signature, 'record': record}
+            if fingerprint:
+                self.alert_cache[fingerprint] = cached
+        record = cached['record']
+        if not record:
+            return False
+
+        # only parse updatedAt again if it changed
+        if record['updated_at_string'] != alert["updatedAt"]:
+            record['updated_at'] = dateutil.parser.parse(alert["updatedAt"])
+            record['updated_at_string'] = alert["updatedAt"]
+
+        result = {key: value for key, value in record.items()
+                  if key not in ('starts_at', 'updated_at', 'updated_at_string')}
+        result['duration'] = format_duration(record['starts_at'])
+        result['last_check'] = format_duration(record['updated_at'])
+        return result
+
+    def _process_alert_uncached(self, alert):
+        """
+        process alert without the time dependent fields duration and last_check
+        """
         result = {}
 
         # alertmanager specific extensions
@@ -109,9 +171,10 @@ class AlertmanagerServer(GenericServer):
         fingerprint = alert.get("fingerprint", {})
         log.debug("processing alert with fingerprint '%s':", fingerprint)
 
+        label_plan = self.get_label_plan()
         labels = alert.get("labels", {})
         state = alert.get("status", {"state": "active"})["state"]
-        severity = self.map_severity(labels.get("severity", "unknown"))
+        severity = label_plan.map_severity(labels.get("severity", "unknown"))
 
         # skip alerts with none severity
         if severity == "NONE":
@@ -121,11 +184,11 @@ class AlertmanagerServer(GenericServer):
         log.debug("[%s]: detected detected state '%s' and severity '%s' from labels",
                   fingerprint, state, severity)
 
-        hostname = detect_from_labels(labels,self.map_to_hostname,"unknown")
+        hostname = label_plan.hostname(labels)
         hostname = re.sub(':[0-9]+', '', hostname)
         log.debug("[%s]: detected hostname from labels: '%s'", fingerprint, hostname)
 
-        servicename = detect_from_labels(labels,self.map_to_servicename,"unknown")
+        servicename = label_plan.servicename(labels)
         log.debug("[%s]: detected servicename from labels: '%s'", fingerprint, servicename)
 
         if "status" in alert:
@@ -143,21 +206,17 @@ class AlertmanagerServer(GenericServer):
             acknowledged = False
             log.debug("[%s]: detected status: '%s'", fingerprint, attempt)
 
-        duration = str(get_duration(alert["startsAt"]))
-
         annotations = alert.get("annotations", {})
-        status_information = detect_from_labels(annotations,self.map_to_status_information,'')
+        status_information = label_plan.status_information(annotations)
 
         result['host'] = str(hostname)
         result['name'] = servicename
         result['server'] = self.name
         result['status'] = severity
         result['labels'] = labels
-        result['last_check'] = str(get_duration(alert["updatedAt"]))
         result['attempt'] = attempt
         result['scheduled_downtime'] = scheduled_downtime
         result['acknowledged'] = acknowledged
-        result['duration'] = duration
         result['generatorURL'] = generator_url
         result['fingerprint'] = fingerprint
         result['status_information'] = status_information
@@ -189,35 +248,24 @@ class AlertmanagerServer(GenericServer):
         log.debug("severity config (map_to_ok): '%s'",
                   self.map_to_ok)
 
+        # cached alerts are only valid as long as the mapping config stays the same
+        alert_cache_config = (self.get_label_plan(), self.name)
+        if alert_cache_config != self.alert_cache_config:
+            self.alert_cache = {}
+            self.alert_cache_config = alert_cache_config
+
         # get all alerts from the API server
         try:
-            if self.alertmanager_filter != '':
-                result = self.fetch_url(self.monitor_url + self.API_PATH_ALERTS + self.API_FILTERS
-                                        + self.alertmanager_filter, giveback="raw")
-            else:
-                result = self.fetch_url(self.monitor_url + self.API_PATH_ALERTS,
-                                        giveback="raw")
-
-            if result.status_code == 200:
-                log.debug("received status code '%s' with this content in result.result: \n\
-                           ---------------------------------------------------------------\n\
-                           %s\
-                           ---------------------------------------------------------------",
-                           result.status_code, result.result)
-            else:
-                log.error("received status code '%s'", result.status_code)
-
-            try:
-                data = json.loads(result.result)
-            except json.decoder.JSONDecodeError:
-                data = {}
-            error = result.error
-            status_code = result.status_code
-
-            # check if any error occured
-            errors_occured = self.check_for_error(data, error, status_code)
-            if errors_occured is not None:
-                return errors_occured
+            data, result = self._fetch_alerts(self._get_alerts_path())
+            if data is None:
+                return Result(result=result.result,
+                              error=result.error,
+                              status_code=result.status_code)
+
+            # forget alerts which are gone
+            fingerprints = {alert.get("fingerprint") for alert in data}
+            for fingerprint in set(self.alert_cache) - fingerprints:
+                del self.alert_cache[fingerprint]
 
             for alert in data:
                 alert_data = self._process_alert(alert)
@@ -258,6 +306,126 @@ class AlertmanagerServer(GenericServer):
         # dummy return in case all is OK
         return Result()
 
+    def _get_label_matchers(self):
+        """
+        host regular expression filter as Alertmanager label matcher
+        only pushed down if it can not hide anything the local filter would show: the 'show matching'
+        direction, exactly one host label, no port sensitive pattern and no match for the fallback
+        hostname 'unknown' of alerts without that label
+        the service filter matches the fingerprint which is no label, so it stays local
+        """
+        matchers = []
+        hostname_keys = self.get_label_plan().hostname_keys
+        pattern = conf.re_host_pattern
+        if conf.re_host_enabled and conf.re_host_reverse and len(hostname_keys) == 1 and \
+                self.LABEL_NAME.fullmatch(hostname_keys[0]) and \
+                self.SIMPLE_REGEX.fullmatch(pattern) and not re.search(pattern, 'unknown'):
+            matchers.append('{0}=~"(?s).*(?:{1}).*"'.format(hostname_keys[0], pattern))
+        return matchers
+
+    def _get_alerts_path(self):
+        """
+        alerts query with the active filters pushed down to Alertmanager
+        """
+        query = [('active', 'true')]
+        # silenced and inhibited alerts come as suppressed and are shown as acknowledged and in downtime
+        if conf.filter_acknowledged_hosts_services or conf.filter_hosts_services_maintenance:
+            query.extend((('silenced', 'false'), ('inhibited', 'false')))
+        query.extend(('filter', matcher) for matcher in self._get_label_matchers())
+        path = self.API_PATH_ALERTS + '?' + urlencode(query)
+        if self.alertmanager_filter != '':
+            path += self.API_FILTERS + self.alertmanager_filter
+        return path
+
+    def _get_peer_urls(self):
+        """
+        monitor URL followed by the additional cluster peers
+        """
+        peers = [self.monitor_url]
+        for peer in self.alertmanager_peers.split(','):
+            peer = peer.strip().rstrip('/')
+            if peer and peer not in peers:
+                peers.append(peer)
+        return peers
+
+    def _get_active_peer_url(self):
+        """
+        peer to send silences to - they get gossiped to the whole cluster
+        """
+        return self.active_peer_url or self.monitor_url
+
+    def _fetch_peer(self, peer, path):
+        """
+        get alerts from one peer - gives back (peer, list of alerts or None, result)
+        """
+        result = self.fetch_url(peer + path, giveback="raw")
+        if result.status_code == 200:
+            log.debug("received status code '%s' from peer '%s' with this content in result.result: \n\
+                       ---------------------------------------------------------------\n\
+                       %s\
+                       ---------------------------------------------------------------",
+                      result.status_code, peer, result.result)
+        else:
+            log.error("received status code '%s' from peer '%s'", result.status_code, peer)
+        if result.error != '' or result.status_code >= 400:
+            return peer, None, result
+        try:
+            data = json.loads(result.result)
+        except json.decoder.JSONDecodeError:
+            return peer, None, Result(result=result.result,
+                                      error='Invalid JSON from ' + peer,
+                                      status_code=result.status_code)
+        if not isinstance(data, list):
+            return peer, None, Result(result=result.result,
+                                      error='Unexpected answer from ' + peer,
+                                      status_code=result.status_code)
+        return peer, data, result
+
+    def _fetch_alerts(self, path):
+        """
+        query all cluster peers concurrently - the first good answer wins and answers which
+        arrived at the same time are merged by fingerprint
+        gives back (list of alerts or None, result of last request)
+        """
+        peers = self._get_peer_urls()
+        if len(peers) == 1:
+            peer, data, result = self._fetch_peer(peers[0], path)
+            self.active_peer_url = peer if data is not None else None
+            return data, result
+
+        executor = ThreadPoolExecutor(max_workers=len(peers))
+        answers = []
+        result = Result(error='No Alertmanager peer answered within {0} seconds'.format(self.backend_timeout))
+        deadline = time.monotonic() + self.backend_timeout
+        try:
+            pending = {executor.submit(self._fetch_peer, peer, path) for peer in peers}
+            while pending and not answers:
+                done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()),
+                                     return_when=FIRST_COMPLETED)
+                if not done:
+                    log.error("peers did not answer within %s seconds", self.backend_timeout)
+                    break
+                for future in done:
+                    peer, data, result = future.result()
+                    if data is not None:
+                        answers.append((peer, data))
+        finally:
+            # slow peers must not block the poll
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if not answers:
+            self.active_peer_url = None
+            return None, result
+
+        self.active_peer_url = answers[0][0]
+        if len(answers) == 1:
+            return answers[0][1], Result()
+        merged = {}
+        for _, data in answers:
+            for alert in data:
+                merged.setdefault(alert.get("fingerprint"), alert)
+        return list(merged.values()), Result()
+
     def open_monitor_webpage(self, host, service):
         """
         open monitor from tablewidget context menu
@@ -281,7 +449,7 @@ class AlertmanagerServer(GenericServer):
                       if s.display_name == service), None)
         if alert is None:
             log.error(f'_set_downtime: service "{service}" not found on host "{host}"')
-            return
+            return Result(error=f'Service "{service}" not found on host "{host}"')
 
         # Convert local dates to UTC
         start_time_dt = convert_timestring_to_utc(start_time)
@@ -302,8 +470,8 @@ class AlertmanagerServer(GenericServer):
         silence_data["comment"] = comment or "Nagstamon downtime"
         silence_data["createdBy"] = author or "Nagstamon"
 
-        self.fetch_url(self.monitor_url + self.API_PATH_SILENCES, giveback="raw",
-                       cgi_data=json.dumps(silence_data))
+        return self.fetch_url(self._get_active_peer_url() + self.API_PATH_SILENCES, giveback="raw",
+                              cgi_data=json.dumps(silence_data))
 
 
     # Overwrite function from generic server to add expire_time value
@@ -320,15 +488,15 @@ class AlertmanagerServer(GenericServer):
         #if not info_dict['expire_time']:
         #    info_dict['expire_time'] = None
 
-        self._set_acknowledge(info_dict['host'],
-                              info_dict['service'],
-                              info_dict['author'],
-                              info_dict['comment'],
-                              info_dict['sticky'],
-                              info_dict['notify'],
-                              info_dict['persistent'],
-                              all_services,
-                              info_dict['expire_time'])
+        return self._set_acknowledge(info_dict['host'],
+                                     info_dict['service'],
+                                     info_dict['author'],
+                                     info_dict['comment'],
+                                     info_dict['sticky'],
+                                     info_dict['notify'],
+                                     info_dict['persistent'],
+                                     all_services,
+                                     info_dict['expire_time'])
 
 
     def _post_silence(self, alert, author, comment, starts_at, ends_at):
@@ -343,7 +511,7 @@ class AlertmanagerServer(GenericServer):
             "comment": comment or "Nagstamon silence",
             "createdBy": author or "Nagstamon",
         }
-        return self.fetch_url(self.monitor_url + self.API_PATH_SILENCES, giveback="raw",
+        return self.fetch_url(self._get_active_peer_url() + self.API_PATH_SILENCES, giveback="raw",
                               cgi_data=json.dumps(silence_data))
 
     def _set_acknowledge(self, host, service, author, comment, sticky, notify, persistent,
@@ -354,18 +522,21 @@ class AlertmanagerServer(GenericServer):
                       if s.display_name == service), None)
         if alert is None:
             log.error(f'_set_acknowledge: service "{service}" not found on host "{host}"')
-            return
+            return Result(error=f'Service "{service}" not found on host "{host}"')
 
         starts_at = datetime.now(timezone.utc).isoformat()
         ends_at = convert_timestring_to_utc(expire_time) if expire_time else starts_at
 
-        self._post_silence(alert, author, comment, starts_at, ends_at)
+        result = self._post_silence(alert, author, comment, starts_at, ends_at)
 
         if all_services:
             for svc_name in all_services:
+                if self._action_failed(result):
+                    break
                 svc_alert = next((s for s in self.hosts[host].services.values()
                                   if s.display_name == svc_name), None)
                 if svc_alert is None:
                     log.error(f'_set_acknowledge: service "{svc_name}" not found on host "{host}"')
                     continue
-                self._post_silence(svc_alert, author, comment, starts_at, ends_at)
+                result = self._post_silence(svc_alert, author, comment, starts_at, ends_at)
+        return result
@@ -1,5 +1,6 @@
 import sys
 import logging
+from functools import lru_cache
 import dateutil.parser
 from datetime import datetime, timedelta, timezone
 
@@ -30,7 +31,20 @@ def get_duration(timestring):
     Returns:
         string: A time string in human readable format
     """
-    time_object = dateutil.parser.parse(timestring)
+    return format_duration(dateutil.parser.parse(timestring))
+
+
+def format_duration(time_object):
+    """
+    calculates the duration (delta) from an already parsed timezone aware
+    datetime until now and returns a human friendly string
+
+    Args:
+        time_object (datetime): A timezone aware datetime
+
+    Returns:
+        string: A time string in human readable format
+    """
     duration = datetime.now(timezone.utc) - time_object
     hour = int(duration.seconds / 3600)
     minute = int(duration.seconds % 3600 / 60)
@@ -72,9 +86,100 @@ def detect_from_labels(labels, config_label_list, default_value="", list_delimit
     Returns:
         str: The matched label name or an empty string if there was no match
     """
-    result = default_value
-    for each_label in config_label_list.split(list_delimiter):
-        if each_label in labels:
-            result = labels.get(each_label)
-            break
-    return result
+    return LabelMappingPlan.detect(labels, split_label_list(config_label_list, list_delimiter), default_value)
+
+
+@lru_cache(maxsize=64)
+def split_label_list(config_label_list, list_delimiter=","):
+    """Returns the labels of a delimiter seperated config value as tuple, only split once per value
+
+    Args:
+        config_label_list (str): A delimiter seperated list of labels
+        list_delimiter (str, optional): The delimiter used in the value of `config_label_list`. Defaults to ",".
+
+    Returns:
+        tuple(str): The ordered label names
+    """
+    return tuple(config_label_list.split(list_delimiter))
+
+
+class LabelMappingPlan:
+    """Label mapping config of a Prometheus or Alertmanager server, split once
+    into ordered key tuples and a severity lookup dict
+
+    Args:
+        hostname (str): Comma seperated labels to detect the hostname from
+        servicename (str): Comma seperated labels to detect the servicename from
+        status_information (str): Comma seperated annotations to detect the status information from
+        severities (tuple): Pairs of Nagstamon severity and comma seperated label values mapped to it,
+            earlier pairs win
+    """
+
+    def __init__(self, hostname, servicename, status_information, severities=()):
+        self.hostname_keys = split_label_list(hostname)
+        self.servicename_keys = split_label_list(servicename)
+        self.status_information_keys = split_label_list(status_information)
+        self.severity_map = {}
+        for nagstamon_severity, label_values in severities:
+            for label_value in label_values.split(','):
+                self.severity_map.setdefault(label_value, nagstamon_severity)
+
+    @staticmethod
+    def detect(labels, keys, default_value=""):
+        """Returns the value of the first key in `keys` found in `labels`
+
+        Args:
+            labels (dict): Labels or annotations of an alert
+            keys (tuple(str)): Ordered label names
+            default_value (str, optional): The value to return if there has not been a match. Defaults to "".
+
+        Returns:
+            str: The matched label value or `default_value`
+        """
+        for key in keys:
+            if key in labels:
+                return labels[key]
+        return default_value
+
+    def hostname(self, labels):
+        """Returns the hostname detected from `labels` or "unknown"
+        """
+        return self.detect(labels, self.hostname_keys, "unknown")
+
+    def servicename(self, labels):
+        """Returns the servicename detected from `labels` or "unknown"
+        """
+        return self.detect(labels, self.servicename_keys, "unknown")
+
+    def status_information(self, annotations):
+        """Returns the status information detected from `annotations` or an empty string
+        """
+        return self.detect(annotations, self.status_information_keys, "")
+
+    def map_severity(self, the_severity):
+        """Maps a severity label value to a Nagstamon severity
+
+        Args:
+            the_severity (str): The severity that should be mapped
+
+        Returns:
+            str: The matched Nagstamon severity or the uppercased severity if there was no match
+        """
+        return self.severity_map.get(the_severity) or the_severity.upper()
+
+
+@lru_cache(maxsize=64)
+def compile_label_mapping(hostname, servicename, status_information, severities=()):
+    """Returns the label mapping plan for the given config - servers with the same
+    config share one plan and it is only compiled again if the config changes
+
+    Args:
+        hostname (str): Comma seperated labels to detect the hostname from
+        servicename (str): Comma seperated labels to detect the servicename from
+        status_information (str): Comma seperated annotations to detect the status information from
+        severities (tuple, optional): Pairs of Nagstamon severity and comma seperated label values
+
+    Returns:
+        LabelMappingPlan: The compiled plan
+    """
+    return LabelMappingPlan(hostname, servicename, status_information, severities)
@@ -62,8 +62,12 @@ class CentreonServer(GenericServer):
         # URLs of the Centreon pages
         self.urls_centreon = None
 
-        # limit number of services retrived
-        self.limit_services_number = 9999
+        # number of resources retrieved per request is set by self.page_size
+
+        # (host, service) -> resource ID(s) of the last status poll, used by actions instead of extra lookups
+        # hosts have their ID, services a (host ID, service ID) tuple like get_host_and_service_id() gives back
+        self.object_ids = dict()
+        self.new_object_ids = dict()
 
     def init_config(self):
         '''
@@ -191,6 +195,11 @@ class CentreonServer(GenericServer):
             return Result(result=result, error=error)
 
     def get_host(self, host):
+        # address might be known already from status data or earlier lookups
+        fqdn = self.host_addresses.get(host)
+        if fqdn is not None:
+            return Result(result=fqdn)
+
         # https://demo.centreon.com/centreon/api/latest/monitoring/resources?page=1&limit=30&sort_by={"status_severity_code":"asc","last_status_change":"desc"}&types=["host"]&statuses=["WARNING","DOWN","CRITICAL","UNKNOWN"]
         url_hosts = self.urls_centreon['hosts'] + '?types=["host"]&search={"h.name":"' + host + '"}'
 
@@ -208,6 +217,7 @@ class CentreonServer(GenericServer):
                 return (errors_occured)
 
             fqdn = str(data["result"][0]["fqdn"])
+            self.set_host_address(host, fqdn)
 
             if conf.debug_mode:
                 self.debug(server='[' + self.get_name() + ']',
@@ -224,6 +234,19 @@ class CentreonServer(GenericServer):
             return Result(result=result, error=error)
 
     def get_host_and_service_id(self, host, service=''):
+        # IDs are known from the last status poll - only unknown objects need a lookup
+        object_id = self.object_ids.get((host, service))
+        if object_id is not None:
+            return object_id
+        object_id = self._lookup_host_and_service_id(host, service)
+        if not isinstance(object_id, Result):
+            self.object_ids[(host, service)] = object_id
+        return object_id
+
+    def _lookup_host_and_service_id(self, host, service=''):
+        if conf.debug_mode:
+            self.debug(server='[' + self.get_name() + ']',
+                       debug='ID of Host / Service not indexed, looking up : ' + host + ' / ' + service)
         if service == "":
             # Hosts only
             # https://demo.centreon.com/centreon/api/latest/monitoring/resources?page=1&limit=30&sort_by={"status_severity_code":"asc","last_status_change":"desc"}&types=["host"]&statuses=["WARNING","DOWN","CRITICAL","UNKNOWN"]
@@ -333,68 +356,22 @@ class CentreonServer(GenericServer):
         # Services URL
         # https://demo.centreon.com/centreon/api/latest/monitoring/resources?page=1&limit=30&sort_by={"status_severity_code":"asc","last_status_change":"desc"}&types=["service"]&statuses=["WARNING","DOWN","CRITICAL","UNKNOWN"]
         url_services = self.urls_centreon[
-                           'services'] + '?types=["metaservice","service"]&statuses=["WARNING","DOWN","CRITICAL","UNKNOWN"]' + self.re_service_filter + '&limit=' + str(
-            self.limit_services_number)
+                           'services'] + '?types=["metaservice","service"]&statuses=["WARNING","DOWN","CRITICAL","UNKNOWN"]' + self.re_service_filter
 
         # Hosts URL
         # https://demo.centreon.com/centreon/api/latest/monitoring/resources?page=1&limit=30&sort_by={"status_severity_code":"asc","last_status_change":"desc"}&types=["host"]&statuses=["WARNING","DOWN","CRITICAL","UNKNOWN"]
         url_hosts = self.urls_centreon[
-                        'hosts'] + '?types=["host"]&statuses=["WARNING","DOWN","CRITICAL","UNKNOWN"]' + self.re_host_filter + '&limit=' + str(
-            self.limit_services_number)
+                        'hosts'] + '?types=["host"]&statuses=["WARNING","DOWN","CRITICAL","UNKNOWN"]' + self.re_host_filter
+
+        # IDs get indexed while processing the resources
+        self.new_object_ids = dict()
 
         # Hosts
         try:
-            # Get json
-            result = self.fetch_url(url_hosts, giveback='raw')
-
-            data = json.loads(result.result)
-            error = result.error
-            status_code = result.status_code
-
-            # check if any error occured
-            errors_occured = self.check_for_error(data, error, status_code)
+            errors_occured = self._get_resources(url_hosts, self._process_host)
             if errors_occured is not None:
                 return (errors_occured)
 
-            if data["meta"]["total"] == 0:
-                self.debug(server='[' + self.get_name() + ']', debug='No host down')
-            else:
-                for alerts in data["result"]:
-                    new_host = alerts["name"]
-                    self.new_hosts[new_host] = GenericHost()
-                    self.new_hosts[new_host].name = alerts["name"]
-                    self.new_hosts[new_host].server = self.name
-                    # API inconsistency, even by fixing exact version number, changed starting with 22.04
-                    if self.centreon_version_major == 21 or (self.centreon_version_major == 22 and self.centreon_version_minor == 4):
-                        self.new_hosts[new_host].criticality = alerts["severity_level"]
-                    else:
-                        self.new_hosts[new_host].criticality = alerts["severity"]
-                    self.new_hosts[new_host].status = alerts["status"]["name"]
-                    self.new_hosts[new_host].last_check = alerts["last_check"]
-                    # last_state_change = datetime.strptime(alerts["last_status_change"], '%Y-%m-%dT%H:%M:%S%z').replace(tzinfo=None)
-                    self.new_hosts[new_host].duration = alerts["duration"]
-                    self.new_hosts[new_host].attempt = alerts["tries"]
-                    self.new_hosts[new_host].status_information = alerts["information"]
-                    # Change starting with 23.10
-                    if (self.centreon_version_major >= 23 and self.centreon_version_minor >= 10) or self.centreon_version_major > 23:
-                        self.new_hosts[new_host].passiveonly = alerts["has_passive_checks_enabled"]
-                        self.new_hosts[new_host].notifications_disabled = not alerts["is_notification_enabled"]
-                        self.new_hosts[new_host].acknowledged = alerts["is_acknowledged"]
-                        self.new_hosts[new_host].scheduled_downtime = alerts["is_in_downtime"]
-                    else:
-                        self.new_hosts[new_host].passiveonly = alerts["passive_checks"]
-                        self.new_hosts[new_host].notifications_disabled  = not alerts["notification_enabled"]
-                        self.new_hosts[new_host].acknowledged = alerts["acknowledged"]
-                        self.new_hosts[new_host].scheduled_downtime = alerts["in_downtime"]
-                    # avoid crash if flapping is not configured in Centreon
-                    # according to https://github.com/HenriWahl/Nagstamon/issues/866#issuecomment-1302257034
-                    self.new_hosts[new_host].flapping = alerts.get("flapping", False)
-                    if "(S)" in alerts["tries"]:
-                        self.new_hosts[new_host].status_type = self.HARD_SOFT['(S)']
-                    else:
-                        self.new_hosts[new_host].status_type = self.HARD_SOFT['(H)']
-                    self.debug(server='[' + self.get_name() + ']', debug='Host indexed : ' + new_host)
-
         except:
             traceback.print_exc(file=sys.stdout)
             # set checking flag back to False
@@ -404,71 +381,10 @@ class CentreonServer(GenericServer):
 
         # Services
         try:
-            # Get json
-            result = self.fetch_url(url_services, giveback='raw')
-
-            data = json.loads(result.result)
-            error = result.error
-            status_code = result.status_code
-
-            # check if any error occured
-            errors_occured = self.check_for_error(data, error, status_code)
+            errors_occured = self._get_resources(url_services, self._process_service)
             if errors_occured is not None:
                 return (errors_occured)
 
-            if data["meta"]["total"] == 0:
-                self.debug(server='[' + self.get_name() + ']', debug='No service down')
-            else:
-                for alerts in data["result"]:
-                    if alerts["type"] == "metaservice":
-                        new_host = "Meta_Services"
-                    else:
-                        new_host = alerts["parent"]["name"]
-                    new_service = alerts["name"]
-                    # Needed if non-ok services are on a UP host
-                    if not new_host in self.new_hosts:
-                        self.new_hosts[new_host] = GenericHost()
-                        self.new_hosts[new_host].name = new_host
-                        self.new_hosts[new_host].status = 'UP'
-                    self.new_hosts[new_host].services[new_service] = GenericService()
-                    # Attributs à remplir
-                    self.debug(server='[' + self.get_name() + ']',
-                               debug='Service indexed : ' + new_host + ' / ' + new_service)
-
-                    self.new_hosts[new_host].services[new_service].server = self.name
-                    self.new_hosts[new_host].services[new_service].host = new_host
-                    self.new_hosts[new_host].services[new_service].name = new_service
-                    self.new_hosts[new_host].services[new_service].status = alerts["status"]["name"]
-                    self.new_hosts[new_host].services[new_service].last_check = alerts["last_check"]
-                    # last_state_change = datetime.strptime(alerts["last_state_change"], '%Y-%m-%dT%H:%M:%S%z').replace(tzinfo=None)
-                    # self.new_hosts[new_host].services[new_service].duration = datetime.now() - last_state_change
-                    self.new_hosts[new_host].services[new_service].duration = alerts["duration"]
-                    self.new_hosts[new_host].services[new_service].attempt = alerts["tries"]
-                    self.new_hosts[new_host].services[new_service].status_information = alerts["information"]
-                    # Change starting with 23.10
-                    if (self.centreon_version_major >= 23 and self.centreon_version_minor >= 10) or self.centreon_version_major > 23:
-                        self.new_hosts[new_host].services[new_service].passiveonly = alerts["has_passive_checks_enabled"]
-                        self.new_hosts[new_host].services[new_service].notifications_disabled = not alerts["is_notification_enabled"]
-                        self.new_hosts[new_host].services[new_service].acknowledged = alerts["is_acknowledged"]
-                        self.new_hosts[new_host].services[new_service].scheduled_downtime = alerts["is_in_downtime"]
-                    else:
-                        self.new_hosts[new_host].services[new_service].passiveonly = alerts["passive_checks"]
-                        self.new_hosts[new_host].services[new_service].notifications_disabled = not alerts["notification_enabled"]
-                        self.new_hosts[new_host].services[new_service].acknowledged = alerts["acknowledged"]
-                        self.new_hosts[new_host].services[new_service].scheduled_downtime = alerts["in_downtime"]
-                    # avoid crash if flapping is not configured in Centreon
-                    # according to https://github.com/HenriWahl/Nagstamon/issues/866#issuecomment-1302257034
-                    self.new_hosts[new_host].services[new_service].flapping = alerts.get("flapping", False)
-                    if "(S)" in alerts["tries"]:
-                        self.new_hosts[new_host].services[new_service].status_type = self.HARD_SOFT['(S)']
-                    else:
-                        self.new_hosts[new_host].services[new_service].status_type = self.HARD_SOFT['(H)']
-                    # API inconsistency, even by fixing exact version number, changed starting with 22.04
-                    if self.centreon_version_major == 21 or (self.centreon_version_major == 22 and self.centreon_version_minor == 4):
-                        self.new_hosts[new_host].services[new_service].criticality = alerts["severity_level"]
-                    else:
-                        self.new_hosts[new_host].services[new_service].criticality = alerts["severity"]
-
         except:
             traceback.print_exc(file=sys.stdout)
             # set checking flag back to False
@@ -476,9 +392,156 @@ class CentreonServer(GenericServer):
             result, error = self.error(sys.exc_info())
             return Result(result=result, error=error)
 
+        # index is only replaced if the poll was complete
+        self.object_ids = self.new_object_ids
+
         # return True if all worked well
         return Result()
 
+    def _get_resources(self, url, process_resource):
+        '''
+        Fetch paginated /monitoring/resources results and hand every resource over to process_resource()
+        The first page tells the total number of resources, the remaining pages are fetched concurrently
+        and processed as soon as they arrive
+        '''
+        result = self.fetch_url(f'{url}&page=1&limit={self.page_size}', giveback='raw')
+
+        error = result.error
+        status_code = result.status_code
+
+        # check if any error occured
+        errors_occured = self.check_for_error(result.result, error, status_code)
+        if errors_occured is not None:
+            return errors_occured
+
+        data = json.loads(result.result)
+        del result
+
+        total = data["meta"]["total"]
+        # Centreon might reduce a too large limit, so better trust the value it gives back
+        limit = data["meta"].get("limit") or self.page_size
+        if total == 0:
+            self.debug(server='[' + self.get_name() + ']', debug='No resource with problems found')
+            return None
+
+        for resource in data["result"]:
+            process_resource(resource)
+        del data
+
+        pages = -(-total // limit)
+        if pages > 1:
+            if conf.debug_mode:
+                self.debug(server='[' + self.get_name() + ']',
+                           debug=f'Fetching {pages - 1} more pages of {limit} resources')
+            urls_pages = [f'{url}&page={page}&limit={limit}' for page in range(2, pages + 1)]
+            for index, result in self.fetch_urls(urls_pages, giveback='raw'):
+                errors_occured = self.check_for_error(result.result, result.error, result.status_code)
+                if errors_occured is not None:
+                    return errors_occured
+                for resource in json.loads(result.result)["result"]:
+                    process_resource(resource)
+
+        return None
+
+    def _process_host(self, alerts):
+        '''
+        Create host object from one /monitoring/resources entry
+        '''
+        new_host = alerts["name"]
+        self.new_object_ids[(new_host, '')] = alerts["id"]
+        self.set_host_address(new_host, alerts.get("fqdn"))
+        self.new_hosts[new_host] = GenericHost()
+        self.new_hosts[new_host].name = alerts["name"]
+        self.new_hosts[new_host].server = self.name
+        # API inconsistency, even by fixing exact version number, changed starting with 22.04
+        if self.centreon_version_major == 21 or (self.centreon_version_major == 22 and self.centreon_version_minor == 4):
+            self.new_hosts[new_host].criticality = alerts["severity_level"]
+        else:
+            self.new_hosts[new_host].criticality = alerts["severity"]
+        self.new_hosts[new_host].status = alerts["status"]["name"]
+        self.new_hosts[new_host].last_check = alerts["last_check"]
+        # last_state_change = datetime.strptime(alerts["last_status_change"], '%Y-%m-%dT%H:%M:%S%z').replace(tzinfo=None)
+        self.new_hosts[new_host].duration = alerts["duration"]
+        self.new_hosts[new_host].attempt = alerts["tries"]
+        self.new_hosts[new_host].status_information = alerts["information"]
+        # Change starting with 23.10
+        if (self.centreon_version_major >= 23 and self.centreon_version_minor >= 10) or self.centreon_version_major > 23:
+            self.new_hosts[new_host].passiveonly = alerts["has_passive_checks_enabled"]
+            self.new_hosts[new_host].notifications_disabled = not alerts["is_notification_enabled"]
+            self.new_hosts[new_host].acknowledged = alerts["is_acknowledged"]
+            self.new_hosts[new_host].scheduled_downtime = alerts["is_in_downtime"]
+        else:
+            self.new_hosts[new_host].passiveonly = alerts["passive_checks"]
+            self.new_hosts[new_host].notifications_disabled  = not alerts["notification_enabled"]
+            self.new_hosts[new_host].acknowledged = alerts["acknowledged"]
+            self.new_hosts[new_host].scheduled_downtime = alerts["in_downtime"]
+        # avoid crash if flapping is not configured in Centreon
+        # according to https://github.com/HenriWahl/Nagstamon/issues/866#issuecomment-1302257034
+        self.new_hosts[new_host].flapping = alerts.get("flapping", False)
+        if "(S)" in alerts["tries"]:
+            self.new_hosts[new_host].status_type = self.HARD_SOFT['(S)']
+        else:
+            self.new_hosts[new_host].status_type = self.HARD_SOFT['(H)']
+        self.debug(server='[' + self.get_name() + ']', debug='Host indexed : ' + new_host)
+
+    def _process_service(self, alerts):
+        '''
+        Create service object from one /monitoring/resources entry
+        '''
+        if alerts["type"] == "metaservice":
+            new_host = "Meta_Services"
+            host_id = 0
+        else:
+            new_host = alerts["parent"]["name"]
+            host_id = alerts["parent"]["id"]
+            # hosts which are UP are not part of the host resources
+            self.new_object_ids.setdefault((new_host, ''), host_id)
+        new_service = alerts["name"]
+        self.new_object_ids[(new_host, new_service)] = (host_id, alerts["id"])
+        # Needed if non-ok services are on a UP host
+        if not new_host in self.new_hosts:
+            self.new_hosts[new_host] = GenericHost()
+            self.new_hosts[new_host].name = new_host
+            self.new_hosts[new_host].status = 'UP'
+        self.new_hosts[new_host].services[new_service] = GenericService()
+        # Attributs à remplir
+        self.debug(server='[' + self.get_name() + ']',
+                   debug='Service indexed : ' + new_host + ' / ' + new_service)
+
+        self.new_hosts[new_host].services[new_service].server = self.name
+        self.new_hosts[new_host].services[new_service].host = new_host
+        self.new_hosts[new_host].services[new_service].name = new_service
+        self.new_hosts[new_host].services[new_service].status = alerts["status"]["name"]
+        self.new_hosts[new_host].services[new_service].last_check = alerts["last_check"]
+        # last_state_change = datetime.strptime(alerts["last_state_change"], '%Y-%m-%dT%H:%M:%S%z').replace(tzinfo=None)
+        # self.new_hosts[new_host].services[new_service].duration = datetime.now() - last_state_change
+        self.new_hosts[new_host].services[new_service].duration = alerts["duration"]
+        self.new_hosts[new_host].services[new_service].attempt = alerts["tries"]
+        self.new_hosts[new_host].services[new_service].status_information = alerts["information"]
+        # Change starting with 23.10
+        if (self.centreon_version_major >= 23 and self.centreon_version_minor >= 10) or self.centreon_version_major > 23:
+            self.new_hosts[new_host].services[new_service].passiveonly = alerts["has_passive_checks_enabled"]
+            self.new_hosts[new_host].services[new_service].notifications_disabled = not alerts["is_notification_enabled"]
+            self.new_hosts[new_host].services[new_service].acknowledged = alerts["is_acknowledged"]
+            self.new_hosts[new_host].services[new_service].scheduled_downtime = alerts["is_in_downtime"]
+        else:
+            self.new_hosts[new_host].services[new_service].passiveonly = alerts["passive_checks"]
+            self.new_hosts[new_host].services[new_service].notifications_disabled = not alerts["notification_enabled"]
+            self.new_hosts[new_host].services[new_service].acknowledged = alerts["acknowledged"]
+            self.new_hosts[new_host].services[new_service].scheduled_downtime = alerts["in_downtime"]
+        # avoid crash if flapping is not configured in Centreon
+        # according to https://github.com/HenriWahl/Nagstamon/issues/866#issuecomment-1302257034
+        self.new_hosts[new_host].services[new_service].flapping = alerts.get("flapping", False)
+        if "(S)" in alerts["tries"]:
+            self.new_hosts[new_host].services[new_service].status_type = self.HARD_SOFT['(S)']
+        else:
+            self.new_hosts[new_host].services[new_service].status_type = self.HARD_SOFT['(H)']
+        # API inconsistency, even by fixing exact version number, changed starting with 22.04
+        if self.centreon_version_major == 21 or (self.centreon_version_major == 22 and self.centreon_version_minor == 4):
+            self.new_hosts[new_host].services[new_service].criticality = alerts["severity_level"]
+        else:
+            self.new_hosts[new_host].services[new_service].criticality = alerts["severity"]
+
     def _set_acknowledge(self, host, service, author, comment, sticky, notify, persistent, all_services=None):
         try:
 
@@ -515,63 +578,52 @@ class CentreonServer(GenericServer):
                     }
 
                 acknowledgements["resources"].append(new_resource)
-
-                # Post json
-                json_string = json.dumps(acknowledgements)
-                # {protocol}://{server}:{port}/centreon/api/{version}/monitoring/hosts/{host_id}/acknowledgements
-                result = self.fetch_url(self.urls_centreon['resources'] + '/acknowledge', cgi_data=json_string,
-                                        giveback='raw')
-
-                error = result.error
-                status_code = result.status_code
-
                 if conf.debug_mode:
                     self.debug(server='[' + self.get_name() + ']',
-                               debug="Set Ack on Host, status code : " + str(status_code))
+                               debug="Stack ack for Host (" + host + ")")
 
-            # Service
-            if service != '' or all_services:
-                if not all_services:
-                    all_services = [service]
-
-                for s in all_services:
-                    host_id, service_id = self.get_host_and_service_id(host, service)
-
-                    if host == "Meta_Services":
-                        new_resource = {
-                            "type": "metaservice",
-                            "id": service_id,
-                            "parent": {
-                                "id": None
-                            }
+            # Services - all of them go into the same resource list
+            services = ([service] if service else []) + [s for s in all_services or [] if s != service]
+            for s in services:
+                host_id, service_id = self.get_host_and_service_id(host, s)
+
+                if host == "Meta_Services":
+                    new_resource = {
+                        "type": "metaservice",
+                        "id": service_id,
+                        "parent": {
+                            "id": None
                         }
+                    }
 
-                    else:
-                        new_resource = {
-                            "type": "service",
-                            "id": service_id,
-                            "parent": {
-                                "id": host_id
-                            }
+                else:
+                    new_resource = {
+                        "type": "service",
+                        "id": service_id,
+                        "parent": {
+                            "id": host_id
                         }
+                    }
+
+                acknowledgements["resources"].append(new_resource)
+                if conf.debug_mode:
+                    self.debug(server='[' + self.get_name() + ']',
+                               debug="Stack ack for Host (" + host + ") / Service (" + s + ")")
 
-                    acknowledgements["resources"].append(new_resource)
-                    if conf.debug_mode:
-                        self.debug(server='[' + self.get_name() + ']',
-                                   debug="Stack ack for Host (" + host + ") / Service (" + service + ")")
+            # Post json - one request for host and services
+            json_string = json.dumps(acknowledgements)
+            # {protocol}://{server}:{port}/centreon/api/{version}/monitoring/resources/acknowledge
+            result = self.fetch_url(self.urls_centreon['resources'] + '/acknowledge', cgi_data=json_string,
+                                    giveback='raw')
 
-                # Post json
-                json_string = json.dumps(acknowledgements)
-                # {protocol}://{server}:{port}/centreon/api/{version}/monitoring/services/acknowledgements
-                result = self.fetch_url(self.urls_centreon['resources'] + '/acknowledge', cgi_data=json_string,
-                                        giveback='raw')
+            error = result.error
+            status_code = result.status_code
 
-                error = result.error
-                status_code = result.status_code
+            if conf.debug_mode:
+                self.debug(server='[' + self.get_name() + ']',
+                           debug="Set Acks, status code : " + str(status_code))
 
-                if conf.debug_mode:
-                    self.debug(server='[' + self.get_name() + ']',
-                               debug="Set Acks, status code : " + str(status_code))
+            return result
 
         except:
             traceback.print_exc(file=sys.stdout)
@@ -655,6 +707,8 @@ class CentreonServer(GenericServer):
                                debug="Reckeck on Host (" + host + ") / Service (" + service + "), status code : " + str(
                                    status_code))
 
+            return result
+
         except:
             traceback.print_exc(file=sys.stdout)
             # set checking flag back to False
@@ -756,6 +810,7 @@ class CentreonServer(GenericServer):
                                debug="Downtime on Host (" + host + ") / Service (" + service + "), status code : " + str(
                                    status_code))
 
+            return result
 
         except:
             traceback.print_exc(file=sys.stdout)
@@ -20,10 +20,13 @@
 import urllib.request
 import urllib.parse
 import urllib.error
-import socket
 import sys
 import re
 import copy
+import io
+from xml.etree import ElementTree
+
+from bs4 import BeautifulSoup
 
 from datetime import datetime, timedelta
 
@@ -70,6 +73,10 @@ class CentreonServer(GenericServer):
         self.limit_services_number = 9999
         # default value, applies to version 2.2 and others
         self.XML_PATH = 'xml'
+        # (host, service) -> IDs of the last status poll, taken from <hid> and <svc_id> of the XML records
+        # hosts have their ID, services a (host ID, service ID) tuple - saves parsing HTML pages for actions
+        self.object_ids = dict()
+        self.new_object_ids = dict()
 
     def init_config(self):
         '''
@@ -340,6 +347,11 @@ class CentreonServer(GenericServer):
         if conf.connect_by_host == True or host == '':
             return Result(result=host)
 
+        # address might be known already from status data or earlier lookups
+        ip = self.host_addresses.get(host)
+        if ip is not None:
+            return Result(result=self.resolve_address(ip))
+
         # do a web interface search limited to only one result - the hostname
         cgi_data = {'sid': self.SID,
                     'search': host,
@@ -362,18 +374,9 @@ class CentreonServer(GenericServer):
 
         if len(xmlobj) != 0:
             ip = str(xmlobj.l.a.text)
-            # when connection by DNS is not configured do it by IP
             try:
-                if conf.connect_by_dns:
-                   # try to get DNS name for ip (reverse DNS), if not available use ip
-                    try:
-                        address = socket.gethostbyaddr(ip)[0]
-                    except:
-                        if conf.debug_mode:
-                            self.debug(server=self.get_name(), debug='Unable to do a reverse DNS lookup on IP: ' + ip)
-                        address = ip
-                else:
-                    address = ip
+                self.set_host_address(host, ip)
+                address = self.resolve_address(ip)
             except:
                 result, error = self.error(sys.exc_info())
                 return Result(result=result, error=error)
@@ -494,8 +497,11 @@ class CentreonServer(GenericServer):
 
     def _get_host_id(self, host):
         '''
-        get host_id via parsing raw html
+        get host_id from last status poll or via parsing raw html
         '''
+        if (host, '') in self.object_ids:
+            return self.object_ids[(host, '')]
+
         if self.centreon_version < 2.7:
             cgi_data = {'p': 20102, 'o': 'hd', 'host_name': host, 'sid': self.SID}
         else:
@@ -521,6 +527,7 @@ class CentreonServer(GenericServer):
             if int(host_id):
                 if conf.debug_mode:
                     self.debug(server=self.get_name(), host=host, debug='Host ID is ' + host_id)
+                self.object_ids[(host, '')] = host_id
                 return host_id
             else:
                 return ''
@@ -530,8 +537,11 @@ class CentreonServer(GenericServer):
 
     def _get_host_and_service_id(self, host, service):
         '''
-        parse a ton of html to get a host and a service id...
+        parse a ton of html to get a host and a service id... if they are not known from last status poll
         '''
+        if (host, service) in self.object_ids:
+            return self.object_ids[(host, service)]
+
         cgi_data = {'p':'20201',\
                     'host_name':host,\
                     'service_description':service,\
@@ -559,6 +569,7 @@ class CentreonServer(GenericServer):
             if int(host_id) and int(svc_id):
                 if conf.debug_mode:
                     self.debug(server=self.get_name(), host=host, service=service, debug='- Host & Service ID are valid (int)')
+                self.object_ids[(host, service)] = (host_id, svc_id)
                 return host_id,svc_id
             else:
                 return '',''
@@ -597,82 +608,11 @@ class CentreonServer(GenericServer):
         # unfortunately the hosts status page has a different structure so
         # hosts must be analyzed separately
         try:
-            result = self.fetch_url(nagcgiurl_hosts, giveback='xml')
-            xmlobj, error, status_code = result.result, result.error, result.status_code
-
-            # check if any error occured
-            errors_occured = self.check_for_error(xmlobj, error, status_code)
-
-            # if there are errors return them
-            if errors_occured is not None:
-                return errors_occured
-
-            # Check if the result is not empty
-            if len(xmlobj) == 0:
-                if conf.debug_mode:
-                    self.debug(server=self.get_name(), debug='Empty host XML result')
-                return Result(result=None, error="Empty host XML result")
-
-            # in case there are no children session ID is expired
-            if xmlobj.text.lower() == 'bad session id':
-                del xmlobj
-                if conf.debug_mode:
-                    self.debug(server=self.get_name(), debug='Bad session ID, retrieving new one...')
-
-                # try again...
-                self.SID = self._get_sid().result
-                result = self.fetch_url(nagcgiurl_hosts, giveback='xml')
-                xmlobj, error, status_code = result.result, result.error, result.status_code
-                errors_occured = self.check_for_error(xmlobj, error, status_code)
-                # if there are errors return them
-                if errors_occured is not None:
-                    return errors_occured
-
-                # a second time a bad session id should raise an error
-                if xmlobj.text.lower() == 'bad session id':
-                    if conf.debug_mode:
-                        self.debug(server=self.get_name(), debug='Even after renewing session ID, unable to get the XML')
-                    return Result(result='ERROR',
-                                  error='Bad session ID',
-                                  status_code=status_code)
-
-            for l in xmlobj.findAll('l'):
-                try:
-                    # host objects contain service objects
-                    if not l.hn.text in self.new_hosts:
-                        self.new_hosts[str(l.hn.text)] = GenericHost()
-                        self.new_hosts[str(l.hn.text)].name =  str(l.hn.text)
-                        self.new_hosts[str(l.hn.text)].server = self.name
-                        self.new_hosts[str(l.hn.text)].status = str(l.cs.text)
-                        # disgusting workaround for https://github.com/HenriWahl/Nagstamon/issues/91
-                        if self.new_hosts[str(l.hn.text)].status in self.TRANSLATIONS:
-                            self.new_hosts[str(l.hn.text)].status = self.TRANSLATIONS[self.new_hosts[str(l.hn.text)].status]
-                        self.new_hosts[str(l.hn.text)].attempt, self.new_hosts[str(l.hn.text)].status_type  = str(l.tr.text).split(' ')
-                        self.new_hosts[str(l.hn.text)].status_type = self.HARD_SOFT[self.new_hosts[str(l.hn.text)].status_type]
-                        self.new_hosts[str(l.hn.text)].last_check = str(l.lc.text)
-                        self.new_hosts[str(l.hn.text)].duration = str(l.lsc.text)
-                        self.new_hosts[str(l.hn.text)].status_information = str(l.ou.text).replace('\n', ' ').strip()
-                        if l.find('cih') != None:
-                            self.new_hosts[str(l.hn.text)].criticality = str(l.cih.text)
-                        else:
-                            self.new_hosts[str(l.hn.text)].criticality = ''
-                        self.new_hosts[str(l.hn.text)].acknowledged = bool(int(str(l.ha.text)))
-                        self.new_hosts[str(l.hn.text)].scheduled_downtime = bool(int(str(l.hdtm.text)))
-                        if l.find('is') != None:
-                            self.new_hosts[str(l.hn.text)].flapping = bool(int(str(l.find('is').text)))
-                        else:
-                            self.new_hosts[str(l.hn.text)].flapping = False
-                        self.new_hosts[str(l.hn.text)].notifications_disabled = not bool(int(str(l.ne.text)))
-                        self.new_hosts[str(l.hn.text)].passiveonly = not bool(int(str(l.ace.text)))
-                except:
-                    import traceback
-                    traceback.print_exc(file=sys.stdout)
-                    # set checking flag back to False
-                    self.isChecking = False
-                    result, error = self.error(sys.exc_info())
-                    return Result(result=result, error=error)
-
-            del xmlobj
+            result = self._get_xml(nagcgiurl_hosts, 'host')
+            if isinstance(result, Result):
+                return result
+            # every document comes with the function processing its records
+            documents = [(result, self._process_host_record)]
 
         except:
             import traceback
@@ -684,40 +624,10 @@ class CentreonServer(GenericServer):
 
         # services
         try:
-            result = self.fetch_url(nagcgiurl_services, giveback='xml')
-            xmlobj, error, status_code = result.result, result.error, result.status_code
-
-            # check if any error occured
-            errors_occured = self.check_for_error(xmlobj, error, status_code)
-            # if there are errors return them
-            if errors_occured is not None:
-                return errors_occured
-
-            # Check if the result is not empty
-            if len(xmlobj) == 0:
-                if conf.debug_mode:
-                    self.debug(server=self.get_name(), debug='Empty service XML result')
-                return Result(result=None, error="Empty service XML result")
-
-            # in case there are no children session id is invalid
-            if xmlobj.text.lower() == 'bad session id':
-                # debug
-                if conf.debug_mode:
-                    self.debug(server=self.get_name(), debug='Bad session ID, retrieving new one...')
-                # try again...
-                self.SID = self._get_sid().result
-                result = self.fetch_url(nagcgiurl_services, giveback='xml')
-                xmlobj, error, status_code = result.result, result.error, result.status_code
-                errors_occured = self.check_for_error(xmlobj, error, status_code)
-                # if there are errors return them
-                if errors_occured is not None:
-                    return errors_occured
-
-                # a second time a bad session id should raise an error
-                if xmlobj.text.lower() == 'bad session id':
-                    return Result(result='ERROR',
-                                  error='Bad session ID',
-                                  status_code=status_code)
+            result = self._get_xml(nagcgiurl_services, 'service')
+            if isinstance(result, Result):
+                return result
+            documents.append((result, self._process_service_record))
 
             # In Centreon 2.8, Meta are merged with regular services
             if self.centreon_version < 2.8:
@@ -728,18 +638,18 @@ class CentreonServer(GenericServer):
                     nagcgiurl_meta_services = self.urls_centreon['xml_meta'] + '?' + urllib.parse.urlencode({'num':0, 'limit':self.limit_services_number, 'o':'meta', 'sort_type':'status', 'sid':self.SID})
 
                 # retrive meta-services xml STATUS
-                result_meta = self.fetch_url(nagcgiurl_meta_services, giveback='xml')
-                xmlobj_meta, error_meta, status_code_meta = result_meta.result, result_meta.error, result_meta.status_code
+                result_meta = self.fetch_url(nagcgiurl_meta_services, giveback='bytes')
+                xml_meta, error_meta, status_code_meta = result_meta.result, result_meta.error, result_meta.status_code
 
                 # check if any error occured
-                errors_occured = self.check_for_error(xmlobj_meta, error_meta, status_code_meta)
+                errors_occured = self.check_for_error(xml_meta, error_meta, status_code_meta)
 
                 # if there are errors return them
                 if errors_occured is not None:
                     return errors_occured
 
                 # a second time a bad session id should raise an error
-                if xmlobj_meta.text.lower() == 'bad session id':
+                if self._is_bad_session_id(xml_meta):
                     if conf.debug_mode:
                         self.debug(server=self.get_name(), debug='Even after renewing session ID, unable to get the XML')
 
@@ -747,90 +657,24 @@ class CentreonServer(GenericServer):
                                   error='Bad session ID',
                                   status_code=status_code_meta)
 
-                # INSERT META-services xml at the end of the services xml
-                try:
-                        xmlobj.append(xmlobj_meta.reponse)
-                except:
-                        import traceback
-                        traceback.print_exc(file=sys.stdout)
-                        # set checking flag back to False
-                        self.isChecking = False
-                        result, error = self.error(sys.exc_info())
-                        return Result(result=result, error=error)
-                # do some cleanup
-                del xmlobj_meta
-
-            for l in xmlobj.findAll('l'):
-                try:
-                    # host objects contain service objects
-                    ###if not self.new_hosts.has_key(str(l.hn.text)):
-                    if not l.hn.text in self.new_hosts:
-                        self.new_hosts[str(l.hn.text)] = GenericHost()
-                        self.new_hosts[str(l.hn.text)].name = str(l.hn.text)
-                        self.new_hosts[str(l.hn.text)].status = 'UP'
-                    # if a service does not exist create its object
-                    if not l.sd.text in self.new_hosts[str(l.hn.text)].services:
-                        self.new_hosts[str(l.hn.text)].services[str(l.sd.text)] = GenericService()
-                        self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].host = str(l.hn.text)
-                        self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].name = str(l.sd.text)
-                        self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].server = self.name
-                        self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].status = str(l.cs.text)
-
-                        if self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].host == '_Module_Meta':
-                            # ajusting service name for Meta services
-                            if self.centreon_version < 2.8:
-                                self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].name = '{} ({})'.format(str(l.sd.text), l.rsd.text)
-                                self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].attempt = str(l.ca.text)
-                            else:
-                                self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].name = '{} ({})'.format(str(l.sdn.text), l.sdl.text)
-                                self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].attempt, \
-                                self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].status_type = str(l.ca.text).split(' ')
-                        else:
-                            self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].attempt, \
-                            self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].status_type = str(l.ca.text).split(' ')
-
-                        # disgusting workaround for https://github.com/HenriWahl/Nagstamon/issues/91
-                        # Still needed in Centreon 2.8 at least : https://github.com/HenriWahl/Nagstamon/issues/344
-                        # Need enhancement, we can do service state matching with this field <sc>service_unknown</sc>
-                        #if self.centreon_version < 2.66:
-                        if self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].status in self.TRANSLATIONS:
-                            self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].status = self.TRANSLATIONS[\
-                            self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].status]
-
-                        if not (self.centreon_version < 2.8 and self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].host == '_Module_Meta'):
-                            self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].status_type =\
-                            self.HARD_SOFT[self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].status_type]
+                # META-services are processed after the services
+                documents.append((xml_meta, self._process_service_record))
+                del xml_meta
 
-                        if conf.debug_mode:
-                            self.debug(server=self.get_name(), debug='Parsing service XML (Host/Service/Status_type) ' + self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].host + '/' + self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].name + '/' + self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].status_type)
-                        self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].last_check = str(l.lc.text)
-                        self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].duration = str(l.d.text)
-                        self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].status_information = str(l.po.text).replace('\n', ' ').strip()
-
-                        if l.find('cih') != None:
-                            self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].criticality = str(l.cih.text)
-                        else:
-                            self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].criticality = ''
-
-                        self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].acknowledged = bool(int(str(l.pa.text)))
-                        self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].notifications_disabled = not bool(int(str(l.ne.text)))
-
-                        # for features not available in centreon < 2.8 and meta services
-                        if not (self.centreon_version < 2.8 and self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].host == '_Module_Meta'):
-                            self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].scheduled_downtime = bool(int(str(l.dtm.text)))
-                            self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].flapping = bool(int(str(l.find('is').text)))
-                            self.new_hosts[str(l.hn.text)].services[str(l.sd.text)].passiveonly = not bool(int(str(l.ac.text)))
-
-                except:
-                    import traceback
-                    traceback.print_exc(file=sys.stdout)
-                    # set checking flag back to False
-                    self.isChecking = False
-                    result, error = self.error(sys.exc_info())
-                    return Result(result=result, error=error)
-
-            # do some cleanup
-            del xmlobj
+            del result
+
+        except:
+            import traceback
+            traceback.print_exc(file=sys.stdout)
+            # set checking flag back to False
+            self.isChecking = False
+            result, error = self.error(sys.exc_info())
+            return Result(result=result, error=error)
+
+        # hosts first, services and meta-services afterwards
+        try:
+            self._process_xml_documents(documents)
+            del documents
 
         except:
             import traceback
@@ -840,10 +684,202 @@ class CentreonServer(GenericServer):
             result, error = self.error(sys.exc_info())
             return Result(result=result, error=error)
 
+        # index is only replaced if the poll was complete
+        self.object_ids = self.new_object_ids
+
         # return True if all worked well
         return Result()
 
 
+    @staticmethod
+    def _is_bad_session_id(xml_content):
+        '''
+        Centreon answers with plain text instead of XML if the session ID is invalid
+        '''
+        return xml_content.strip().lower() == b'bad session id'
+
+    def _get_xml(self, url, kind):
+        '''
+        Fetch XML of hosts or services as bytes and retry once with a new session ID if needed
+        Gives back the XML bytes or a Result in case of an error
+        '''
+        result = self.fetch_url(url, giveback='bytes')
+        xml_content, error, status_code = result.result, result.error, result.status_code
+
+        # check if any error occured
+        errors_occured = self.check_for_error(xml_content, error, status_code)
+        # if there are errors return them
+        if errors_occured is not None:
+            return errors_occured
+
+        # Check if the result is not empty
+        if len(xml_content.strip()) == 0:
+            if conf.debug_mode:
+                self.debug(server=self.get_name(), debug=f'Empty {kind} XML result')
+            return Result(result=None, error=f'Empty {kind} XML result')
+
+        # in case there are no children session ID is expired
+        if self._is_bad_session_id(xml_content):
+            if conf.debug_mode:
+                self.debug(server=self.get_name(), debug='Bad session ID, retrieving new one...')
+
+            # try again... with new session ID in URL
+            self.SID = self._get_sid().result
+            url = re.sub(r'sid=[^&]*', 'sid=' + urllib.parse.quote(str(self.SID)), url)
+            result = self.fetch_url(url, giveback='bytes')
+            xml_content, error, status_code = result.result, result.error, result.status_code
+            errors_occured = self.check_for_error(xml_content, error, status_code)
+            # if there are errors return them
+            if errors_occured is not None:
+                return errors_occured
+
+            # a second time a bad session id should raise an error
+            if self._is_bad_session_id(xml_content):
+                if conf.debug_mode:
+                    self.debug(server=self.get_name(), debug='Even after renewing session ID, unable to get the XML')
+                return Result(result='ERROR',
+                              error='Bad session ID',
+                              status_code=status_code)
+
+        return xml_content
+
+    def _process_xml_documents(self, documents):
+        '''
+        Hand every <l> record of the given (XML, processing function) pairs to its function as soon as it is parsed
+        If any document is not well-formed the hosts and IDs built so far are dropped and all documents
+        are processed again from BeautifulSoup, so no record gets lost or processed twice
+        '''
+        # IDs get indexed while processing the records
+        self.new_object_ids = dict()
+        try:
+            for xml_content, process_record in documents:
+                for l in self._parse_xml_records(xml_content):
+                    process_record(l)
+        except ElementTree.ParseError:
+            if conf.debug_mode:
+                self.debug(server=self.get_name(), debug='XML not well-formed, falling back to BeautifulSoup')
+            self.new_hosts = dict()
+            self.new_object_ids = dict()
+            for xml_content, process_record in documents:
+                for l in self._parse_xml_records_fallback(xml_content):
+                    process_record(l)
+
+    @staticmethod
+    def _parse_xml_records(xml_content):
+        '''
+        Stream-parse Centreon XML and yield every <l> record as dict of its child tags and their texts
+        Elements are freed as soon as they are processed so no complete tree of up to 9999 services is built
+        Raises ElementTree.ParseError if the XML is not well-formed, after the records before the error were yielded
+        '''
+        root = None
+        for event, element in ElementTree.iterparse(io.BytesIO(xml_content), events=('start', 'end')):
+            if root is None:
+                root = element
+            elif event == 'end' and element.tag == 'l':
+                yield {child.tag: ''.join(child.itertext()) for child in element}
+                # free already processed elements
+                root.clear()
+
+    def _parse_xml_records_fallback(self, xml_content):
+        '''
+        Parse not well-formed Centreon XML as a whole by BeautifulSoup and give back all <l> records
+        '''
+        xmlobj = BeautifulSoup(xml_content, self.PARSER)
+        records = [{child.name: child.text for child in l.find_all(recursive=False)} for l in xmlobj.find_all('l')]
+        xmlobj.decompose()
+        return records
+
+    def _process_host_record(self, l):
+        '''
+        Create host object from one <l> record of the hosts XML
+        '''
+        # not every Centreon version delivers the host ID
+        if l.get('hid'):
+            self.new_object_ids[(l['hn'], '')] = l['hid']
+        # down hosts come with their address
+        self.set_host_address(l['hn'], l.get('a'))
+        # host objects contain service objects
+        if not l['hn'] in self.new_hosts:
+            self.new_hosts[l['hn']] = GenericHost()
+            self.new_hosts[l['hn']].name = l['hn']
+            self.new_hosts[l['hn']].server = self.name
+            self.new_hosts[l['hn']].status = l['cs']
+            # disgusting workaround for https://github.com/HenriWahl/Nagstamon/issues/91
+            if self.new_hosts[l['hn']].status in self.TRANSLATIONS:
+                self.new_hosts[l['hn']].status = self.TRANSLATIONS[self.new_hosts[l['hn']].status]
+            self.new_hosts[l['hn']].attempt, self.new_hosts[l['hn']].status_type = l['tr'].split(' ')
+            self.new_hosts[l['hn']].status_type = self.HARD_SOFT[self.new_hosts[l['hn']].status_type]
+            self.new_hosts[l['hn']].last_check = l['lc']
+            self.new_hosts[l['hn']].duration = l['lsc']
+            self.new_hosts[l['hn']].status_information = l['ou'].replace('\n', ' ').strip()
+            self.new_hosts[l['hn']].criticality = l.get('cih', '')
+            self.new_hosts[l['hn']].acknowledged = bool(int(l['ha']))
+            self.new_hosts[l['hn']].scheduled_downtime = bool(int(l['hdtm']))
+            if 'is' in l:
+                self.new_hosts[l['hn']].flapping = bool(int(l['is']))
+            else:
+                self.new_hosts[l['hn']].flapping = False
+            self.new_hosts[l['hn']].notifications_disabled = not bool(int(l['ne']))
+            self.new_hosts[l['hn']].passiveonly = not bool(int(l['ace']))
+
+    def _process_service_record(self, l):
+        '''
+        Create service object from one <l> record of the services XML
+        '''
+        # not every Centreon version delivers host and service IDs
+        if l.get('hid') and l.get('svc_id'):
+            self.new_object_ids.setdefault((l['hn'], ''), l['hid'])
+            self.new_object_ids[(l['hn'], l['sd'])] = (l['hid'], l['svc_id'])
+        # host objects contain service objects
+        if not l['hn'] in self.new_hosts:
+            self.new_hosts[l['hn']] = GenericHost()
+            self.new_hosts[l['hn']].name = l['hn']
+            self.new_hosts[l['hn']].status = 'UP'
+        # if a service does not exist create its object
+        if not l['sd'] in self.new_hosts[l['hn']].services:
+            new_service = GenericService()
+            self.new_hosts[l['hn']].services[l['sd']] = new_service
+            new_service.host = l['hn']
+            new_service.name = l['sd']
+            new_service.server = self.name
+            new_service.status = l['cs']
+
+            if new_service.host == '_Module_Meta':
+                # ajusting service name for Meta services
+                if self.centreon_version < 2.8:
+                    new_service.name = '{} ({})'.format(l['sd'], l['rsd'])
+                    new_service.attempt = l['ca']
+                else:
+                    new_service.name = '{} ({})'.format(l['sdn'], l['sdl'])
+                    new_service.attempt, new_service.status_type = l['ca'].split(' ')
+            else:
+                new_service.attempt, new_service.status_type = l['ca'].split(' ')
+
+            # disgusting workaround for https://github.com/HenriWahl/Nagstamon/issues/91
+            # Still needed in Centreon 2.8 at least : https://github.com/HenriWahl/Nagstamon/issues/344
+            # Need enhancement, we can do service state matching with this field <sc>service_unknown</sc>
+            #if self.centreon_version < 2.66:
+            if new_service.status in self.TRANSLATIONS:
+                new_service.status = self.TRANSLATIONS[new_service.status]
+
+            if not (self.centreon_version < 2.8 and new_service.host == '_Module_Meta'):
+                new_service.status_type = self.HARD_SOFT[new_service.status_type]
+
+            if conf.debug_mode:
+                self.debug(server=self.get_name(), debug='Parsing service XML (Host/Service/Status_type) ' + new_service.host + '/' + new_service.name + '/' + new_service.status_type)
+            new_service.last_check = l['lc']
+            new_service.duration = l['d']
+            new_service.status_information = l['po'].replace('\n', ' ').strip()
+            new_service.criticality = l.get('cih', '')
+            new_service.acknowledged = bool(int(l['pa']))
+            new_service.notifications_disabled = not bool(int(l['ne']))
+
+            # for features not available in centreon < 2.8 and meta services
+            if not (self.centreon_version < 2.8 and new_service.host == '_Module_Meta'):
+                new_service.scheduled_downtime = bool(int(l['dtm']))
+                new_service.flapping = bool(int(l['is']))
+                new_service.passiveonly = not bool(int(l['ac']))
+
     def _set_acknowledge(self, host, service, author, comment, sticky, notify, persistent, all_services=None):
         # decision about host or service - they have different URLs
         try:
@@ -868,8 +904,9 @@ class CentreonServer(GenericServer):
                     cgi_data['centreon_token'] = self.centreon_token
 
                 # Post
-                raw = self.fetch_url(self.urls_centreon['main'], cgi_data=cgi_data, giveback='raw')
-                del raw
+                result = self.fetch_url(self.urls_centreon['main'], cgi_data=cgi_data, giveback='raw')
+                if self._action_failed(result):
+                    return result
 
             # if host is acknowledged and all services should be to or if a service is acknowledged
             # (and all other on this host too)
@@ -917,10 +954,13 @@ class CentreonServer(GenericServer):
                                 cgi_data['service_description'] = rsd
 
                     # POST, for some strange reason only working if giveback is 'raw'
-                    raw = self.fetch_url(self.urls_centreon['main'], cgi_data=cgi_data, giveback='raw')
-                    del raw
+                    result = self.fetch_url(self.urls_centreon['main'], cgi_data=cgi_data, giveback='raw')
+                    if self._action_failed(result):
+                        return result
+            return Result()
         except:
-            self.error(sys.exc_info())
+            result, error = self.error(sys.exc_info())
+            return Result(result=result, error=error)
 
 
     def _set_recheck(self, host, service):
@@ -972,15 +1012,14 @@ class CentreonServer(GenericServer):
 
             if self.centreon_version < 19.04:
                 # execute GET request
-                raw = self.fetch_url(url, giveback='raw')
-                del raw
+                return self.fetch_url(url, giveback='raw')
             else:
                 # running remote cgi command with POST method, for some strange reason only working if
                 # giveback is 'raw'
-                raw = self.fetch_url(self.urls_centreon['xml_serviceSendCommand'], cgi_data=cgi_data, giveback='raw')
-                del raw
+                return self.fetch_url(self.urls_centreon['xml_serviceSendCommand'], cgi_data=cgi_data, giveback='raw')
         except:
-            self.error(sys.exc_info())
+            result, error = self.error(sys.exc_info())
+            return Result(result=result, error=error)
 
 
     def _set_downtime(self, host, service, author, comment, fixed, start_time, end_time, hours, minutes):
@@ -1065,16 +1104,15 @@ class CentreonServer(GenericServer):
 
             if self.centreon_version < 19.04:
                 # This request must be done in a GET, so just encode the parameters and fetch
-                raw = self.fetch_url(self.urls_centreon['external_cmd_cmdPopup'] + '?' + urllib.parse.urlencode(cgi_data), giveback="raw")
-                del raw
+                return self.fetch_url(self.urls_centreon['external_cmd_cmdPopup'] + '?' + urllib.parse.urlencode(cgi_data), giveback="raw")
             # Starting from 19.04, must be POST
             else:
                 # Do it in POST
-                raw = self.fetch_url(self.urls_centreon['external_cmd_cmdPopup'], cgi_data=cgi_data, giveback='raw')
-                del raw
+                return self.fetch_url(self.urls_centreon['external_cmd_cmdPopup'], cgi_data=cgi_data, giveback='raw')
 
         except:
-            self.error(sys.exc_info())
+            result, error = self.error(sys.exc_info())
+            return Result(result=result, error=error)
 
 
     def _check_session(self):
@@ -17,6 +17,8 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
 from collections import OrderedDict
+from concurrent.futures import (as_completed,
+                                ThreadPoolExecutor)
 import copy
 import datetime
 import json
@@ -53,6 +55,9 @@ from Nagstamon.helpers import (attempt_is_filtered_out_by_re,
                                service_is_filtered_out_by_re,
                                status_information_is_filtered_out_by_re,
                                STATES,
+                               ActionQueue,
+                               TokenBucket,
+                               TTLCache,
                                USER_AGENT,
                                webbrowser_open)
 from Nagstamon.objects import (GenericService,
@@ -156,6 +161,21 @@ class GenericServer:
     # see https://github.com/HenriWahl/Nagstamon/issues/431
     PARSER = 'lxml'
 
+    # hidden inputs of web command forms which are valid for the whole session and can be reused
+    FORM_TEMPLATE_INPUTS = ('CSRFToken', 'formUID', 'btn_submit')
+    FORM_TEMPLATE_TTL = 600
+
+    # addresses of hosts and their reverse DNS names are cached for actions using $ADDRESS$
+    HOST_ADDRESS_CACHE_SIZE = 5000
+    HOST_ADDRESS_CACHE_TTL = 3600
+
+    # errors of actions which are worth to be tried again - only those where the request did not reach the monitor,
+    # because acknowledgements or custom POST actions must not be sent twice
+    TRANSIENT_ERRORS = ('requests.exceptions.ConnectTimeout',)
+    # connection errors also happen after sending, for example when the connection was reset - only these causes
+    # mean that no connection has been established
+    TRANSIENT_CONNECTION_ERRORS = ('NewConnectionError', 'NameResolutionError', 'Failed to establish a new connection')
+
     def __init__(self, **kwds):
         # add all keywords to object, every mode searchs inside for its favorite arguments/keywords
         for k in kwds:
@@ -203,6 +223,22 @@ class GenericServer:
         self.has_error = False
         self.timeout = 30
 
+        # number of items per request for monitors with paginated APIs
+        self.page_size = 1000
+        # maximum number of parallel requests when fetching several pages or backends at once
+        self.max_concurrent_requests = 4
+        # maximum number of rechecks per second when rechecking all hosts and services
+        self.recheck_rate = 10
+        # actions like acknowledge or downtime run in the background, independent of status polling
+        self.action_queue = ActionQueue(name='{0}-actions'.format(kwds.get('name', '')),
+                                        is_transient=self._is_transient_error)
+        # hidden inputs of command forms per form, see _submit_command_form()
+        self.form_templates = TTLCache(maxsize=32, ttl=self.FORM_TEMPLATE_TTL)
+        # host -> address as known by monitor, filled by status polls where possible and by get_host()
+        self.host_addresses = TTLCache(maxsize=self.HOST_ADDRESS_CACHE_SIZE, ttl=self.HOST_ADDRESS_CACHE_TTL)
+        # address -> DNS name, see resolve_address()
+        self.reverse_dns = TTLCache(maxsize=self.HOST_ADDRESS_CACHE_SIZE, ttl=self.HOST_ADDRESS_CACHE_TTL)
+
         # The events_* are recycled from GUI.py
         # history of events to track status changes for notifications
         # events that came in
@@ -277,8 +313,13 @@ class GenericServer:
         # IcingaDBWeb custom filter
         self.custom_filter = ''
 
+        # Icinga2API
+        self.use_event_stream = False
+
         # Thruk
         self.disabled_backends = None
+        self.use_rest_api = False
+        self.backend_timeout = 10
 
         # Browser login
         #self.bridge_to_qt = BridgeToQt()
@@ -323,9 +364,12 @@ class GenericServer:
                 return False
             elif self.session is None:
                 self.session = self.create_session()
+                # tokens of cached command forms belong to the old session
+                self.form_templates.clear()
                 return True
         elif not self.session:
             self.session = self.create_session()
+            self.form_templates.clear()
             return True
 
     def create_session(self):
@@ -438,7 +482,188 @@ class GenericServer:
         pass
 
     def set_recheck(self, info_dict):
-        self._set_recheck(info_dict['host'], info_dict['service'])
+        return self._set_recheck(info_dict['host'], info_dict['service'])
+
+    def queue_action(self, action, info_dict, function, callback=None):
+        """
+        run action like function=self.set_acknowledge with info_dict in the background action queue
+        an identical action which is still pending is not queued again
+        after success the affected hosts and services get refreshed
+        callback(action, error) is called when the action is done, error is '' in case of success
+        gives back False if the action got merged into a pending one
+        """
+        key = (action,) + tuple(sorted((k, repr(v)) for k, v in info_dict.items() if k != 'server'))
+
+        def done(error):
+            if error:
+                if conf.debug_mode:
+                    self.debug(server=self.get_name(), host=info_dict.get('host', ''),
+                               service=info_dict.get('service', ''),
+                               debug='Action {0} failed: {1}'.format(action, error.strip()))
+            else:
+                self.refresh_objects(self._get_action_objects(info_dict))
+            if callback:
+                callback(action, error)
+
+        return self.action_queue.submit(key, function, info_dict, callback=done)
+
+    def _is_transient_error(self, error):
+        """
+        failed connection attempts might succeed with next try, everything else will not or is not safe to repeat
+        """
+        if error.startswith(self.TRANSIENT_ERRORS):
+            return True
+        return error.startswith('requests.exceptions.ConnectionError') and \
+            any(cause in error for cause in self.TRANSIENT_CONNECTION_ERRORS)
+
+    @staticmethod
+    def _action_failed(result):
+        """
+        check if Result of an action request is an error or got refused by the monitor
+        """
+        return result.error != '' or (result.status_code or 0) >= 400
+
+    @staticmethod
+    def _get_action_objects(info_dict):
+        """
+        (host, service) items affected by an action, service is '' for hosts
+        """
+        host = info_dict.get('host', '')
+        items = [(host, info_dict.get('service', ''))]
+        if info_dict.get('acknowledge_all_services'):
+            items.extend((host, service) for service in info_dict.get('all_services') or [])
+        return items
+
+    def refresh_objects(self, items):
+        """
+        refresh (host, service) items after an action changed them
+        most monitors cannot cheaply query single objects so the next status poll is brought forward
+        """
+        self.thread_counter = conf.update_interval_seconds
+
+    def _get_form_template(self, form_url, form_selector):
+        """
+        hidden inputs like CSRF token of the command form matching CSS form_selector
+        taken from cache or from the page at form_url - gives back a Result in case of an error
+        """
+        template = self.form_templates.get(form_selector)
+        if template is not None:
+            return template
+
+        result = self.fetch_url(form_url, giveback='raw')
+        if result.error != '':
+            return result
+        formtag = BeautifulSoup(result.result, 'html.parser').select_one(form_selector)
+        if formtag is None:
+            # usually authentication expired and some login page came back
+            return Result(result=result.result, error='Command form not found (authentication expired?)')
+        if conf.debug_mode:
+            self.debug(server=self.get_name(), debug='Retrieved command form {0} from {1}'.format(form_selector,
+                                                                                                  form_url))
+        template = {}
+        for name in self.FORM_TEMPLATE_INPUTS:
+            form_input = formtag.find(['input', 'button'], {'name': name})
+            # some pages render the form elements after the form tag, but formUID belongs to each form
+            if form_input is None and name != 'formUID':
+                form_input = formtag.findNext(['input', 'button'], {'name': name})
+            if form_input is not None and form_input.get('value') is not None:
+                template[name] = form_input['value']
+        if 'CSRFToken' not in template:
+            return Result(result=result.result, error='No valid CSRFToken available')
+        self.form_templates.set(form_selector, template)
+        return template
+
+    def _submit_command_form(self, form_url, form_selector, cgi_data, url=None):
+        """
+        post cgi_data together with the hidden inputs of the command form to url, which defaults to form_url
+        cached hidden inputs are only fetched again if the monitor rejected them
+        gives back a Result only in case of an error
+        """
+        for _ in range(2):
+            template = self._get_form_template(form_url, form_selector)
+            if isinstance(template, Result):
+                if conf.debug_mode:
+                    self.debug(server=self.get_name(), debug='{0}: {1}'.format(form_url, template.error))
+                return template
+            result = self.fetch_url(url or form_url, giveback='raw', cgi_data=dict(template, **cgi_data))
+            if conf.debug_mode:
+                self.debug(server=self.get_name(),
+                           debug='Submitted command form to {0} - status code: {1}'.format(url or form_url,
+                                                                                          result.status_code))
+            if not self._command_form_rejected(result):
+                return None
+            # tokens might have become invalid
+            self.form_templates.pop(form_selector)
+        if result.error == '':
+            result.error = 'Command form rejected'
+        return result
+
+    @staticmethod
+    def _command_form_rejected(result):
+        """
+        invalid tokens lead to an error status or to the form being shown again with an error message
+        """
+        return GenericServer._action_failed(result) or 'Invalid CSRF token' in str(result.result)
+
+    def set_recheck_all(self, items, progress=None, cancel=None):
+        """
+        recheck all (host, service) items - service is '' for hosts
+        uses _set_recheck_bulk() if the monitor supports it, otherwise runs up to self.max_concurrent_requests
+        rechecks in parallel but not more than self.recheck_rate per second
+        progress(finished, total) is called after every finished recheck, cancel is a threading.Event
+        gives back numbers of successfully rechecked and of failed items
+        """
+        items = list(items)
+        total = len(items)
+        if total == 0:
+            return 0, 0
+        result = self._set_recheck_bulk(items)
+        if result is not False:
+            failed = isinstance(result, Result) and self._action_failed(result)
+            if progress:
+                progress(total, total)
+            return (0, total) if failed else (total, 0)
+
+        bucket = TokenBucket(rate=self.recheck_rate, burst=self.max_concurrent_requests)
+
+        def recheck(item):
+            """
+            gives back None if cancelled, otherwise if the recheck succeeded
+            """
+            if not bucket.acquire(cancel):
+                return None
+            try:
+                result = self.set_recheck({'host': item[0], 'service': item[1]})
+            except Exception:
+                self.error(sys.exc_info())
+                return False
+            # passive only services are skipped without Result
+            return not (isinstance(result, Result) and self._action_failed(result))
+
+        done = failed = 0
+        executor = ThreadPoolExecutor(max_workers=min(max(1, self.max_concurrent_requests), total))
+        try:
+            for future in as_completed([executor.submit(recheck, item) for item in items]):
+                succeeded = future.result()
+                if succeeded is not None:
+                    if succeeded:
+                        done += 1
+                    else:
+                        failed += 1
+                    if progress:
+                        progress(done + failed, total)
+                if cancel is not None and cancel.is_set():
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return done, failed
+
+    def _set_recheck_bulk(self, items):
+        """
+        recheck many (host, service) items with native multi-object requests
+        gives back False if the monitor has no such API and items have to be rechecked one by one
+        """
+        return False
 
     def _set_recheck(self, host, service):
         if service != '':
@@ -449,6 +674,8 @@ class GenericServer:
             # get start time from Nagios as HTML to use same timezone setting like the locally installed Nagios
             result = self.fetch_url(
                 self.monitor_cgi_url + '/cmd.cgi?' + urllib.parse.urlencode({'cmd_typ': '96', 'host': host}))
+            if result.error != '':
+                return result
             start_time_element = result.result.find(attrs={'name': 'start_time'})
             if start_time_element is None:
                 # element missing usually means the user lacks permission to schedule rechecks
@@ -471,9 +698,11 @@ class GenericServer:
                                                ('force_check', 'on'),
                                                ('btnSubmit', 'Commit')])
             # execute POST request
-            self.fetch_url(self.monitor_cgi_url + '/cmd.cgi', giveback='raw', cgi_data=cgi_data)
+            return self.fetch_url(self.monitor_cgi_url + '/cmd.cgi', giveback='raw', cgi_data=cgi_data)
         except:
             traceback.print_exc(file=sys.stdout)
+            result, error = self.error(sys.exc_info())
+            return Result(result=result, error=error)
 
     def set_acknowledge(self, info_dict):
         """
@@ -483,14 +712,14 @@ class GenericServer:
             all_services = info_dict['all_services']
         else:
             all_services = []
-        self._set_acknowledge(info_dict['host'],
-                              info_dict['service'],
-                              info_dict['author'],
-                              info_dict['comment'],
-                              info_dict['sticky'],
-                              info_dict['notify'],
-                              info_dict['persistent'],
-                              all_services)
+        return self._set_acknowledge(info_dict['host'],
+                                     info_dict['service'],
+                                     info_dict['author'],
+                                     info_dict['comment'],
+                                     info_dict['sticky'],
+                                     info_dict['notify'],
+                                     info_dict['persistent'],
+                                     all_services)
 
 
     def _set_acknowledge(self, host, service, author, comment, sticky, notify, persistent, all_services=None):
@@ -530,28 +759,31 @@ class GenericServer:
         if sticky is True:
             cgi_data['sticky_ack'] = 'on'
 
-        self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+        result = self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
 
         # acknowledge all services on a host
         if all_services:
             for s in all_services:
+                if self._action_failed(result):
+                    break
                 cgi_data['cmd_typ'] = '34'
                 cgi_data['service'] = s
-                self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+                result = self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+        return result
 
     def set_downtime(self, info_dict):
         """
         different monitors might have different implementations of _set_downtime
         """
-        self._set_downtime(info_dict['host'],
-                           info_dict['service'],
-                           info_dict['author'],
-                           info_dict['comment'],
-                           info_dict['fixed'],
-                           info_dict['start_time'],
-                           info_dict['end_time'],
-                           info_dict['hours'],
-                           info_dict['minutes'])
+        return self._set_downtime(info_dict['host'],
+                                  info_dict['service'],
+                                  info_dict['author'],
+                                  info_dict['comment'],
+                                  info_dict['fixed'],
+                                  info_dict['start_time'],
+                                  info_dict['end_time'],
+                                  info_dict['hours'],
+                                  info_dict['minutes'])
 
     def _set_downtime(self, host, service, author, comment, fixed, start_time, end_time, hours, minutes):
         """
@@ -581,18 +813,18 @@ class GenericServer:
         cgi_data['btnSubmit'] = 'Commit'
 
         # running remote cgi command
-        self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+        return self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
 
     def set_submit_check_result(self, info_dict):
         """
         start specific submission part
         """
-        self._set_submit_check_result(info_dict['host'],
-                                      info_dict['service'],
-                                      info_dict['state'],
-                                      info_dict['comment'],
-                                      info_dict['check_output'],
-                                      info_dict['performance_data'])
+        return self._set_submit_check_result(info_dict['host'],
+                                             info_dict['service'],
+                                             info_dict['state'],
+                                             info_dict['comment'],
+                                             info_dict['check_output'],
+                                             info_dict['performance_data'])
 
     def _set_submit_check_result(self, host, service, state, comment, check_output, performance_data):
         """
@@ -607,7 +839,7 @@ class GenericServer:
                                                ('plugin_state', {'up': '0', 'down': '1', 'unreachable': '2'}[state]),
                                                ('plugin_output', check_output),
                                                ('performance_data', performance_data), ('btnSubmit', 'Commit')])
-            self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+            return self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
 
         if service != '':
             # service @ host
@@ -617,7 +849,7 @@ class GenericServer:
                  ('plugin_output', check_output),
                  ('performance_data', performance_data), ('btnSubmit', 'Commit')])
             # running remote cgi command
-            self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+            return self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
 
     def get_start_end(self, host):
         """
@@ -1487,6 +1719,7 @@ class GenericServer:
         'obj' fetch_url() gives back a dict full of miserable hosts/services,
         'xml' giving back as objectified xml
         'raw' it gives back pure HTML - useful for finding out IP or new version
+        'bytes' gives back the undecoded response body, for example for streaming XML parsers
         'json' gives back JSON data
         existence of cgi_data forces urllib to use POST instead of GET requests
         NEW: gives back a list containing result and, if necessary, a more clear error description
@@ -1610,6 +1843,11 @@ class GenericServer:
                 return Result(result=response.text,
                               status_code=response.status_code)
 
+            # give back undecoded bytes, for example for streaming parsers
+            if giveback == 'bytes':
+                return Result(result=response.content,
+                              status_code=response.status_code)
+
             # objectified HTML
             if giveback == 'obj':
                 yummysoup = BeautifulSoup(response.text, self.PARSER)
@@ -1634,6 +1872,40 @@ class GenericServer:
         result, error = self.error(sys.exc_info())
         return Result(result=result, error=error, status_code=response.status_code)
 
+    def fetch_urls(self, urls, giveback='obj', headers=None):
+        """
+        fetch several URLs concurrently with up to self.max_concurrent_requests parallel requests
+        urls may contain plain URLs or (url, cgi_data) tuples for POST requests
+        generator yields (index, Result) tuples as soon as each request has finished, so the caller
+        can process results incrementally - the order is not guaranteed
+        """
+        urls = list(urls)
+        # no need for threads if there is only one request
+        if len(urls) < 2 or self.max_concurrent_requests < 2:
+            for index, url in enumerate(urls):
+                yield index, self._fetch_url_item(url, giveback, headers)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_concurrent_requests, len(urls)))
+        try:
+            futures = {executor.submit(self._fetch_url_item, url, giveback, headers): index
+                       for index, url in enumerate(urls)}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # if caller stops early because of an error, do not wait for the remaining requests
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch_url_item(self, url, giveback, headers):
+        """
+        helper for fetch_urls() - item is either an URL or an (url, cgi_data) tuple
+        """
+        if isinstance(url, tuple):
+            url, cgi_data = url
+        else:
+            cgi_data = None
+        return self.fetch_url(url, giveback=giveback, cgi_data=cgi_data, headers=headers)
+
     def get_host(self, host):
         """
         find out ip or hostname of given host to access hosts/devices which do not appear in DNS but
@@ -1644,8 +1916,10 @@ class GenericServer:
         if conf.connect_by_host is True or host == '':
             return Result(result=host)
 
-        # initialize ip string
-        ip = ''
+        # address might be known already
+        ip = self.host_addresses.get(host)
+        if ip is not None:
+            return Result(result=self.resolve_address(ip))
 
         # glue nagios cgi url and hostinfo
         cgiurl_host = self.monitor_cgi_url + '/extinfo.cgi?type=1&host=' + host
@@ -1670,15 +1944,8 @@ class GenericServer:
             # print IP in debug mode
             if conf.debug_mode is True:
                 self.debug(server=self.get_name(), host=host, debug='IP of %s:' % (host) + ' ' + ip)
-            # when connection by DNS is not configured do it by IP
-            if conf.connect_by_dns is True:
-                # try to get DNS name for ip, if not available use ip
-                try:
-                    address = socket.gethostbyaddr(ip)[0]
-                except socket.error:
-                    address = ip
-            else:
-                address = ip
+            self.set_host_address(host, ip)
+            address = self.resolve_address(ip)
         except Exception:
             result, error = self.error(sys.exc_info())
             return Result(result=result, error=error)
@@ -1689,6 +1956,33 @@ class GenericServer:
         # give back host or ip
         return Result(result=address)
 
+    def set_host_address(self, host, address):
+        """
+        remember address of host, for example if the status data already contains it
+        """
+        if address:
+            self.host_addresses.set(host, address)
+
+    def resolve_address(self, ip):
+        """
+        give back DNS name of ip if connection by DNS is configured, otherwise ip
+        reverse lookups might be slow so results are cached
+        """
+        # when connection by DNS is not configured do it by IP
+        if conf.connect_by_dns is not True or not ip:
+            return ip
+        address = self.reverse_dns.get(ip)
+        if address is None:
+            # try to get DNS name for ip, if not available use ip
+            try:
+                address = socket.gethostbyaddr(ip)[0]
+            except (socket.error, UnicodeError, ValueError):
+                if conf.debug_mode:
+                    self.debug(server=self.get_name(), debug='Unable to do a reverse DNS lookup on IP: ' + ip)
+                address = ip
+            self.reverse_dns.set(ip, address)
+        return address
+
     def get_items_generator(self):
         """
         Generator for plain listing of all filtered items, used in qui for tableview
@@ -1728,6 +2022,14 @@ class GenericServer:
 
         return ['ERROR', traceback.format_exception_only(error[0], error[1])[0]]
 
+    def debug_request_timing(self, method, url, status_code, duration):
+        """
+        timing hook for thirdparty API clients which do not use fetch_url()
+        """
+        if conf.debug_mode:
+            self.debug(server=self.get_name(),
+                       debug='{0} {1} -> {2} in {3:.0f} ms'.format(method, url, status_code, duration * 1000))
+
     def debug(self, server='', host='', service='', debug='', head='DEBUG'):
         """
         centralized debugging
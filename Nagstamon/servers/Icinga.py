@@ -612,6 +612,8 @@ class IcingaServer(GenericServer):
                 return
         # get start time from Nagios as HTML to use same timezone setting like the locally installed Nagios
         result = self.fetch_url(self.monitor_cgi_url + '/cmd.cgi?' + urllib.parse.urlencode({'cmd_typ': '96', 'host':host}))
+        if result.error != '':
+            return result
         self.start_time = dict(result.result.find(attrs={'name':'start_time'}).attrs)['value']
 
         # decision about host or service - they have different URLs
@@ -631,7 +633,7 @@ class IcingaServer(GenericServer):
                                      ('com_data', 'Recheck by %s' % self.username), \
                                      ('btnSubmit', 'Commit')])
         # execute POST request
-        self.fetch_url(self.monitor_cgi_url + '/cmd.cgi', giveback='raw', cgi_data=cgi_data)
+        return self.fetch_url(self.monitor_cgi_url + '/cmd.cgi', giveback='raw', cgi_data=cgi_data)
 
 
     def _set_acknowledge(self, host, service, author, comment, sticky, notify, persistent, all_services=None):
@@ -677,13 +679,16 @@ class IcingaServer(GenericServer):
         if sticky:
             cgi_data['sticky_ack'] = '1'
 
-        self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+        result = self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
 
         # acknowledge all services on a host
         if all_services:
             for s in all_services:
+                if self._action_failed(result):
+                    break
                 cgi_data['cmd_typ'] = '34'
                 cgi_data['service'] = s
-                self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+                result = self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+        return result
 
 
@@ -23,6 +23,8 @@ import datetime
 import json
 import logging
 import sys
+import threading
+import uuid
 import dateutil.parser
 import urllib.parse
 
@@ -47,6 +49,23 @@ class Icinga2APIServer(GenericServer):
                          'services' : {'OK': 0, 'WARNING': 1, 'CRITICAL': 2, 'UNKNOWN': 3}}
     BROWSER_URLS = {}
 
+    # only attributes used by _process_host() and _process_service() are requested
+    HOST_ATTRS = ['name', 'state', 'state_type', 'check_attempt', 'max_check_attempts', 'last_check',
+                  'previous_state_change', 'last_check_result', 'enable_active_checks', 'enable_notifications',
+                  'flapping', 'acknowledgement', 'downtime_depth']
+    SERVICE_ATTRS = HOST_ATTRS + ['host_name']
+    SERVICE_JOINS = ['host.name', 'host.state']
+    # longer query strings are sent as POST with X-HTTP-Method-Override
+    MAX_URL_LENGTH = 2048
+
+    # event stream types which change what Nagstamon shows
+    EVENT_STREAM_TYPES = ['CheckResult', 'StateChange', 'AcknowledgementSet', 'AcknowledgementCleared',
+                          'DowntimeStarted', 'DowntimeRemoved']
+    # recoveries come as StateChange so only check results of problems are needed
+    EVENT_STREAM_FILTER = 'event.type != "CheckResult" || event.check_result.state != 0'
+    # Icinga sends no keepalives - if the stream is quiet for this long it gets resynced
+    EVENT_STREAM_READ_TIMEOUT = 300
+
 
     def __init__(self, **kwds):
         """
@@ -58,6 +77,24 @@ class Icinga2APIServer(GenericServer):
         self.username = conf.servers[self.get_name()].username
         self.password = conf.servers[self.get_name()].password
 
+        # event stream mode retains the problem objects of the last full query and applies
+        # deltas from /v1/events to them
+        self.event_stream_lock = threading.Lock()
+        self.event_stream_thread = None
+        self.event_stream_resync = True
+        # set once /v1/events accepted the subscription
+        self.event_stream_connected = threading.Event()
+        # set once /v1/events answered at all or the stream thread ended, seeding waits for it
+        self.event_stream_answered = threading.Event()
+        # error message if /v1/events refused the subscription - polling falls back to full queries then
+        self.event_stream_refused = None
+        # events which arrive while seeding get replayed afterwards
+        self.event_stream_buffer = None
+        # problem objects known from events only, fetched in one go with next status poll
+        self.event_stream_missing = set()
+        self.api_hosts = dict()
+        self.api_services = dict()
+
     def _insert_service_to_hosts(self, service: GenericService):
         """
         We want to create hosts for faulty services as GenericService requires
@@ -78,39 +115,16 @@ class Icinga2APIServer(GenericServer):
         # new_hosts dictionary
         self.new_hosts = dict()
 
+        if self.use_event_stream and self.event_stream_refused is None:
+            return self._get_status_event_stream()
+
         # hosts - the down ones
         try:
             # We ask icinga for hosts which are not doing well
             hosts = self._get_host_events()
             assert isinstance(hosts, list), "Fail to list hosts"
             for host in hosts:
-                host_name = host['attrs']['name']
-                if host_name not in self.new_hosts:
-                    self.new_hosts[host_name] = GenericHost()
-                    self.new_hosts[host_name].name = host_name
-                    self.new_hosts[host_name].site = self.name
-                    try:
-                        self.new_hosts[host_name].status = self.STATES_MAPPING['hosts'].get(host['attrs']['state'])
-                    except KeyError:
-                        self.new_hosts[host_name].status = 'UNKNOWN'
-                    if int(host['attrs']['state_type']) > 0:  # if state is not SOFT, icinga does not report attempts properly
-                        self.new_hosts[host_name].attempt = "{}/{}".format(
-                            int(host['attrs']['max_check_attempts']),
-                            int(host['attrs']['max_check_attempts']))
-                    else:
-                        self.new_hosts[host_name].attempt = "{}/{}".format(
-                            int(host['attrs']['check_attempt']),
-                            int(host['attrs']['max_check_attempts']))
-                    self.new_hosts[host_name].last_check = arrow.get(host['attrs']['last_check']).humanize()
-                    self.new_hosts[host_name].duration = arrow.get(host['attrs']['previous_state_change']).humanize()
-                    self.new_hosts[host_name].status_information = host['attrs']['last_check_result']['output']
-                    self.new_hosts[host_name].passiveonly = not(host['attrs']['enable_active_checks'])
-                    self.new_hosts[host_name].notifications_disabled = not(host['attrs']['enable_notifications'])
-                    self.new_hosts[host_name].flapping = host['attrs']['flapping']
-                    self.new_hosts[host_name].acknowledged = bool(host['attrs']['acknowledgement'])
-                    self.new_hosts[host_name].scheduled_downtime = bool(host['attrs']['downtime_depth'])
-                    self.new_hosts[host_name].status_type = {0: "soft", 1: "hard"}[host['attrs']['state_type']]
-                del host_name
+                self._process_host(host)
             del hosts
 
         except Exception as e:
@@ -124,34 +138,7 @@ class Icinga2APIServer(GenericServer):
         try:
             services = self._get_service_events()
             for service in services:
-                new_service = GenericService()
-                new_service.host = service['attrs']['host_name']
-                new_service.name = service['attrs']['name']
-                try:
-                    new_service.status = self.STATES_MAPPING['services'].get(service['attrs']['state'])
-                except KeyError:
-                    new_service.status = 'UNKNOWN'
-                if int(service['attrs']['state_type']) > 0:  # if state is not SOFT, icinga does not report attempts properly
-                    new_service.attempt = "{}/{}".format(
-                        int(service['attrs']['max_check_attempts']),
-                        int(service['attrs']['max_check_attempts']))
-                else:
-                    new_service.attempt = "{}/{}".format(
-                        int(service['attrs']['check_attempt']),
-                        int(service['attrs']['max_check_attempts']))
-                if service['attrs']['last_check_result'] is None:
-                    new_service.status_information = 'UNKNOWN'
-                else:
-                    new_service.status_information = service['attrs']['last_check_result']['output']
-                new_service.last_check = arrow.get(service['attrs']['last_check']).humanize()
-                new_service.duration = arrow.get(service['attrs']['previous_state_change']).humanize()
-                new_service.passiveonly = not(service['attrs']['enable_active_checks'])
-                new_service.notifications_disabled = not(service['attrs']['enable_notifications'])
-                new_service.flapping = service['attrs']['flapping']
-                new_service.acknowledged = bool(service['attrs']['acknowledgement'])
-                new_service.scheduled_downtime = bool(service['attrs']['downtime_depth'])
-                new_service.status_type = {0: "soft", 1: "hard"}[service['attrs']['state_type']]
-                self._insert_service_to_hosts(new_service)
+                self._process_service(service)
             del services
 
         except Exception as e:
@@ -164,12 +151,321 @@ class Icinga2APIServer(GenericServer):
         # dummy return in case all is OK
         return Result()
 
+    def _process_host(self, host):
+        """
+        add host from API result to self.new_hosts
+        """
+        host_name = host['attrs']['name']
+        if host_name not in self.new_hosts:
+            self.new_hosts[host_name] = GenericHost()
+            self.new_hosts[host_name].name = host_name
+            self.new_hosts[host_name].site = self.name
+            try:
+                self.new_hosts[host_name].status = self.STATES_MAPPING['hosts'].get(host['attrs']['state'])
+            except KeyError:
+                self.new_hosts[host_name].status = 'UNKNOWN'
+            if int(host['attrs']['state_type']) > 0:  # if state is not SOFT, icinga does not report attempts properly
+                self.new_hosts[host_name].attempt = "{}/{}".format(
+                    int(host['attrs']['max_check_attempts']),
+                    int(host['attrs']['max_check_attempts']))
+            else:
+                self.new_hosts[host_name].attempt = "{}/{}".format(
+                    int(host['attrs']['check_attempt']),
+                    int(host['attrs']['max_check_attempts']))
+            self.new_hosts[host_name].last_check = arrow.get(host['attrs']['last_check']).humanize()
+            self.new_hosts[host_name].duration = arrow.get(host['attrs']['previous_state_change']).humanize()
+            self.new_hosts[host_name].status_information = host['attrs']['last_check_result']['output']
+            self.new_hosts[host_name].passiveonly = not(host['attrs']['enable_active_checks'])
+            self.new_hosts[host_name].notifications_disabled = not(host['attrs']['enable_notifications'])
+            self.new_hosts[host_name].flapping = host['attrs']['flapping']
+            self.new_hosts[host_name].acknowledged = bool(host['attrs']['acknowledgement'])
+            self.new_hosts[host_name].scheduled_downtime = bool(host['attrs']['downtime_depth'])
+            self.new_hosts[host_name].status_type = {0: "soft", 1: "hard"}[host['attrs']['state_type']]
+
+    def _process_service(self, service):
+        """
+        add service from API result to self.new_hosts
+        """
+        new_service = GenericService()
+        new_service.host = service['attrs']['host_name']
+        new_service.name = service['attrs']['name']
+        try:
+            new_service.status = self.STATES_MAPPING['services'].get(service['attrs']['state'])
+        except KeyError:
+            new_service.status = 'UNKNOWN'
+        if int(service['attrs']['state_type']) > 0:  # if state is not SOFT, icinga does not report attempts properly
+            new_service.attempt = "{}/{}".format(
+                int(service['attrs']['max_check_attempts']),
+                int(service['attrs']['max_check_attempts']))
+        else:
+            new_service.attempt = "{}/{}".format(
+                int(service['attrs']['check_attempt']),
+                int(service['attrs']['max_check_attempts']))
+        if service['attrs']['last_check_result'] is None:
+            new_service.status_information = 'UNKNOWN'
+        else:
+            new_service.status_information = service['attrs']['last_check_result']['output']
+        new_service.last_check = arrow.get(service['attrs']['last_check']).humanize()
+        new_service.duration = arrow.get(service['attrs']['previous_state_change']).humanize()
+        new_service.passiveonly = not(service['attrs']['enable_active_checks'])
+        new_service.notifications_disabled = not(service['attrs']['enable_notifications'])
+        new_service.flapping = service['attrs']['flapping']
+        new_service.acknowledged = bool(service['attrs']['acknowledgement'])
+        new_service.scheduled_downtime = bool(service['attrs']['downtime_depth'])
+        new_service.status_type = {0: "soft", 1: "hard"}[service['attrs']['state_type']]
+        self._insert_service_to_hosts(new_service)
+        # hosts only known from their services get their state from the joined host attributes
+        host_joined = service.get('joins', {}).get('host', {})
+        if not self.new_hosts[new_service.host].status and 'state' in host_joined:
+            self.new_hosts[new_service.host].status = self.STATES_MAPPING['hosts'].get(host_joined['state'], 'UNKNOWN')
+
+    def _get_status_event_stream(self):
+        """
+        Build status from retained objects which are kept up to date by the event stream
+        a full query is only done initially and after the stream broke
+        """
+        try:
+            if self.event_stream_resync or \
+                    self.event_stream_thread is None or \
+                    not self.event_stream_thread.is_alive():
+                errors_occured = self._seed_event_stream()
+                if errors_occured is not None:
+                    return errors_occured
+
+            with self.event_stream_lock:
+                missing = self.event_stream_missing
+                self.event_stream_missing = set()
+            if missing:
+                self._fetch_missing_objects(missing)
+
+            with self.event_stream_lock:
+                hosts = list(self.api_hosts.values())
+                services = list(self.api_services.values())
+            for host in hosts:
+                self._process_host(host)
+            for service in services:
+                self._process_service(service)
+
+        except Exception as e:
+            log.exception(e)
+            # set checking flag back to False
+            self.isChecking = False
+            result, error = self.error(sys.exc_info())
+            return Result(result=result, error=error)
+
+        return Result()
+
+    def _seed_event_stream(self):
+        """
+        (re)connect event stream and seed retained objects with one full query
+        """
+        if conf.debug_mode:
+            self.debug(server=self.get_name(), debug='Resyncing event stream with full query')
+        with self.event_stream_lock:
+            self.event_stream_buffer = []
+            self.event_stream_missing = set()
+            self.event_stream_resync = False
+        # subscription has to be active before the full query so no event gets lost in between
+        if self.event_stream_thread is None or not self.event_stream_thread.is_alive():
+            self.event_stream_connected.clear()
+            self.event_stream_answered.clear()
+            self.event_stream_thread = threading.Thread(target=self._run_event_stream, daemon=True)
+            self.event_stream_thread.start()
+        if self.event_stream_answered.wait(self.timeout) and self.event_stream_refused is not None:
+            # no stream for this API user - following polls use full queries
+            with self.event_stream_lock:
+                self.event_stream_buffer = None
+            self.isChecking = False
+            return Result(result='ERROR', error=self.event_stream_refused)
+        if not self.event_stream_connected.is_set():
+            # stream thread will flag resync when giving up so seeding is repeated with next poll
+            if conf.debug_mode:
+                self.debug(server=self.get_name(), debug='Event stream not connected yet, seeding anyway')
+
+        hosts = self._get_host_events()
+        services = self._get_service_events()
+        for objects in hosts, services:
+            if not isinstance(objects, list):
+                with self.event_stream_lock:
+                    self.event_stream_buffer = None
+                    self.event_stream_resync = True
+                return objects
+
+        with self.event_stream_lock:
+            self.api_hosts = {host['attrs']['name']: host for host in hosts}
+            self.api_services = {(service['attrs']['host_name'], service['attrs']['name']): service
+                                 for service in services}
+            missing = [self._apply_event(event) for event in self.event_stream_buffer]
+            self.event_stream_buffer = None
+        missing = set(filter(None, missing))
+        if missing:
+            self._fetch_missing_objects(missing)
+        return None
+
+    def _run_event_stream(self):
+        """
+        thread reading /v1/events until stream breaks, which triggers resync with next status poll
+        """
+        try:
+            response = self.session.post(f'{self.url}/events',
+                                         headers={'Accept': 'application/json'},
+                                         json={'queue': f'nagstamon-{uuid.uuid4()}',
+                                               'types': self.EVENT_STREAM_TYPES,
+                                               'filter': self.EVENT_STREAM_FILTER},
+                                         stream=True,
+                                         timeout=(self.timeout, self.EVENT_STREAM_READ_TIMEOUT))
+            if response.status_code != 200:
+                self.event_stream_refused = f'Event stream refused (status={response.status_code})'
+                if conf.debug_mode:
+                    self.debug(server=self.get_name(), debug=self.event_stream_refused)
+                response.close()
+                return
+            self.event_stream_connected.set()
+            self.event_stream_answered.set()
+            for line in response.iter_lines():
+                # leave if server got disabled or mode got switched off
+                if not self.enabled or not self.use_event_stream:
+                    break
+                if line:
+                    self._handle_event(json.loads(line))
+            response.close()
+        except Exception as e:
+            log.exception(e)
+            if conf.debug_mode:
+                self.debug(server=self.get_name(), debug=f'Event stream broke: {e}')
+        finally:
+            self.event_stream_connected.clear()
+            # wake up seeding in any case instead of letting it wait for the timeout
+            self.event_stream_answered.set()
+            with self.event_stream_lock:
+                self.event_stream_resync = True
+
+    def _handle_event(self, event):
+        """
+        apply event to retained objects or buffer it while seeding
+        unknown problem objects are left to the next status poll so the stream thread does not block
+        """
+        with self.event_stream_lock:
+            if self.event_stream_buffer is not None:
+                self.event_stream_buffer.append(event)
+                return
+            missing = self._apply_event(event)
+            if missing:
+                self.event_stream_missing.add(missing)
+
+    def _apply_event(self, event):
+        """
+        apply single event to retained objects - must be called with event_stream_lock held
+        returns (host, service) if a problem object is not known yet and has to be fetched
+        """
+        event_type = event.get('type')
+        if event_type in ('DowntimeStarted', 'DowntimeRemoved'):
+            host = event['downtime']['host_name']
+            service = event['downtime'].get('service_name') or None
+        else:
+            host = event.get('host')
+            service = event.get('service')
+        if service:
+            retained, key = self.api_services, (host, service)
+        else:
+            retained, key = self.api_hosts, host
+
+        if event_type in ('CheckResult', 'StateChange'):
+            check_result = event.get('check_result') or {}
+            vars_after = check_result.get('vars_after') or {}
+            if 'state' in event:
+                state = event['state']
+            else:
+                state = vars_after.get('state', check_result.get('state'))
+                # check results carry the raw check state (0-3) - hosts only know UP and DOWN
+                if not service and state is not None:
+                    state = 1 if state else 0
+            # recovered objects are not shown anymore
+            if state == 0:
+                retained.pop(key, None)
+                return None
+            if key not in retained:
+                return host, service
+            attrs = retained[key]['attrs']
+            attrs['state'] = state
+            attrs['state_type'] = event.get('state_type', vars_after.get('state_type', attrs['state_type']))
+            attrs['check_attempt'] = vars_after.get('attempt', attrs['check_attempt'])
+            if check_result:
+                attrs['last_check_result'] = {'output': check_result.get('output', '')}
+                attrs['last_check'] = check_result.get('execution_end', event.get('timestamp', attrs['last_check']))
+            if event_type == 'StateChange':
+                attrs['previous_state_change'] = event.get('timestamp', attrs['previous_state_change'])
+        elif key in retained:
+            attrs = retained[key]['attrs']
+            if event_type == 'AcknowledgementSet':
+                attrs['acknowledgement'] = 1
+            elif event_type == 'AcknowledgementCleared':
+                attrs['acknowledgement'] = 0
+            elif event_type == 'DowntimeStarted':
+                attrs['downtime_depth'] = attrs['downtime_depth'] + 1
+            elif event_type == 'DowntimeRemoved':
+                attrs['downtime_depth'] = max(0, attrs['downtime_depth'] - 1)
+        return None
+
+    def _fetch_missing_objects(self, items):
+        """
+        events do not contain every attribute so new problem objects are fetched - at most one query
+        for hosts and one for services
+        also used to refresh objects after actions - objects which are OK now are dropped
+        """
+        hosts = sorted(host for host, service in items if not service)
+        services = sorted((host, service) for host, service in items if service)
+        if hosts:
+            objects = self._list_objects('hosts', 'host.name in {0}'.format(json.dumps(hosts)))
+            if isinstance(objects, list):
+                self._replace_retained(self.api_hosts, hosts, objects,
+                                       lambda item: item['attrs']['name'])
+        if services:
+            objects = self._list_objects('services',
+                                         ' || '.join('(host.name=={0} && service.name=={1})'.format(json.dumps(host),
+                                                                                                   json.dumps(service))
+                                                     for host, service in services))
+            if isinstance(objects, list):
+                self._replace_retained(self.api_services, services, objects,
+                                       lambda item: (item['attrs']['host_name'], item['attrs']['name']))
+
+    def _replace_retained(self, retained, keys, objects, get_key):
+        """
+        replace retained objects of keys by fetched objects which are still problems
+        """
+        with self.event_stream_lock:
+            for key in keys:
+                retained.pop(key, None)
+            for item in objects:
+                if item['attrs']['state'] != 0:
+                    retained[get_key(item)] = item
+
+    def refresh_objects(self, items):
+        """
+        with event stream the affected objects are fetched again and the status gets rebuilt from
+        the retained objects, otherwise it is up to the next full poll
+        """
+        if self.use_event_stream and not self.event_stream_resync:
+            self._fetch_missing_objects(set(items))
+        GenericServer.refresh_objects(self, items)
+
     def _list_objects(self, object_type, filter):
         """List objects"""
-        result = self.fetch_url(
-            f'{self.url}/objects/{object_type}?{urllib.parse.urlencode({"filter": filter})}',
-            giveback='raw'
-        )
+        if object_type == 'hosts':
+            query = {'filter': filter, 'attrs': self.HOST_ATTRS}
+        else:
+            query = {'filter': filter, 'attrs': self.SERVICE_ATTRS, 'joins': self.SERVICE_JOINS}
+        url = f'{self.url}/objects/{object_type}?{urllib.parse.urlencode(query, doseq=True)}'
+        if len(url) <= self.MAX_URL_LENGTH:
+            result = self.fetch_url(url, giveback='raw')
+        else:
+            # Icinga accepts query parameters as JSON body if told to treat POST as GET
+            result = self.fetch_url(f'{self.url}/objects/{object_type}',
+                                    giveback='raw',
+                                    cgi_data=json.dumps(query),
+                                    headers={'Accept': 'application/json',
+                                             'Content-Type': 'application/json',
+                                             'X-HTTP-Method-Override': 'GET'})
         # purify JSON result of unnecessary control sequence \n
         jsonraw, error, status_code = copy.deepcopy(result.result.replace('\n', '')),\
                                       copy.deepcopy(result.error),\
@@ -198,7 +494,7 @@ class Icinga2APIServer(GenericServer):
 
 
     def _trigger_action(self, action, **data):
-        """Trigger on action using Icinga2 API"""
+        """Trigger on action using Icinga2 API, gives back a Result"""
         action_data = {k: v for k, v in data.items() if v is not None}
         self.debug(server=self.get_name(), debug=f"Trigger action {action} with data={action_data}")
         try:
@@ -206,6 +502,7 @@ class Icinga2APIServer(GenericServer):
                 f'{self.url}/actions/{action}',
                 headers={'Accept': 'application/json'},
                 json=action_data,
+                timeout=self.timeout,
             )
             self.debug(
                 server=self.get_name(),
@@ -213,17 +510,24 @@ class Icinga2APIServer(GenericServer):
                 f"{response.text}"
             )
             if 200 <= response.status_code <= 299:
-                return True
-            self.error(f"Fail to trigger action {action}: {response.json().get('status', 'Unknown error')}")
-        except IOError as err:
+                return Result(result=response.text, status_code=response.status_code)
+            try:
+                status = response.json().get('status', 'Unknown error')
+            except ValueError:
+                status = 'Unknown error'
+            return Result(result=response.text,
+                          error=f"Fail to trigger action {action}: {status}",
+                          status_code=response.status_code)
+        except IOError:
             log.exception("Fail to trigger action %s with data %s", action, data)
-            self.error(f"Fail to trigger action {action}: {err}")
+            result, error = self.error(sys.exc_info())
+            return Result(result=result, error=error)
 
     def _set_recheck(self, host, service):
         """
         Please check again Icinga!
         """
-        self._trigger_action(
+        return self._trigger_action(
             "reschedule-check",
             type="Service" if service else "Host",
             filter=(
@@ -236,6 +540,36 @@ class Icinga2APIServer(GenericServer):
             ),
         )
 
+    def _set_recheck_bulk(self, items):
+        """
+        Reschedule all hosts with one action and the services of every host with one action each
+        """
+        hosts = []
+        services = {}
+        for host, service in items:
+            if service:
+                services.setdefault(host, []).append(service)
+            else:
+                hosts.append(host)
+        result = Result()
+        if hosts:
+            result = self._trigger_action(
+                "reschedule-check",
+                type="Host",
+                filter='host.name in host_names',
+                filter_vars={'host_names': hosts},
+            )
+        for host, service_names in services.items():
+            if self._action_failed(result):
+                break
+            result = self._trigger_action(
+                "reschedule-check",
+                type="Service",
+                filter='host.name == host_name && service.name in service_names',
+                filter_vars={'host_name': host, 'service_names': service_names},
+            )
+        return result
+
     # Overwrite function from generic server to add expire_time value
     def set_acknowledge(self, info_dict):
         '''
@@ -250,22 +584,22 @@ class Icinga2APIServer(GenericServer):
         #if not info_dict['expire_time']:
         #    info_dict['expire_time'] = None
 
-        self._set_acknowledge(info_dict['host'],
-                              info_dict['service'],
-                              info_dict['author'],
-                              info_dict['comment'],
-                              info_dict['sticky'],
-                              info_dict['notify'],
-                              info_dict['persistent'],
-                              all_services,
-                              info_dict['expire_time'])
+        return self._set_acknowledge(info_dict['host'],
+                                     info_dict['service'],
+                                     info_dict['author'],
+                                     info_dict['comment'],
+                                     info_dict['sticky'],
+                                     info_dict['notify'],
+                                     info_dict['persistent'],
+                                     all_services,
+                                     info_dict['expire_time'])
 
     def _set_acknowledge(self, host, service, author, comment, sticky,
                          notify, persistent, all_services=None, expire_time=None):
         '''
         Send acknowledge to monitor server
         '''
-        self._trigger_action(
+        result = self._trigger_action(
             "acknowledge-problem",
             type="Service" if service else "Host",
             filter=(
@@ -287,17 +621,32 @@ class Icinga2APIServer(GenericServer):
             persistent=persistent,
         )
 
-        if len(all_services) > 0:
-            for s in all_services:
-                # cheap, recursive solution...
-                self._set_acknowledge(host, s, author, comment, sticky, notify, persistent, [], expire_time)
+        # all services of the host at once with one filter
+        services = [s for s in all_services or [] if s != service]
+        if services and not self._action_failed(result):
+            result = self._trigger_action(
+                "acknowledge-problem",
+                type="Service",
+                filter='host.name == host_name && service.name in service_names',
+                filter_vars={'host_name': host, 'service_names': services},
+                author=author,
+                comment=comment,
+                sticky=sticky,
+                notify=notify,
+                expiry=(
+                    dateutil.parser.parse(expire_time).timestamp()
+                    if expire_time else None
+                ),
+                persistent=persistent,
+            )
+        return result
 
     def _set_submit_check_result(self, host, service, state, comment,
                                  check_output, performance_data):
         '''
         Submit check results
         '''
-        self._trigger_action(
+        return self._trigger_action(
             "process-check-result",
             type="Service" if service else "Host",
             filter=(
@@ -318,7 +667,7 @@ class Icinga2APIServer(GenericServer):
         """
         Submit downtime
         """
-        self._trigger_action(
+        return self._trigger_action(
             "schedule-downtime",
             type="Service" if service else "Host",
             filter=(
@@ -37,7 +37,6 @@ import copy
 import json
 import datetime
 from datetime import timezone
-import socket
 import warnings
 
 from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
@@ -74,6 +73,9 @@ class IcingaDBWebServer(GenericServer):
                     'hosts': '$MONITOR-CGI$/icingadb/hosts',
                     'services': '$MONITOR-CGI$/icingadb/services',
                     'history': '$MONITOR-CGI$/icingadb/history'}
+    # command forms by command - their hidden inputs get cached by _submit_command_form()
+    COMMAND_FORMS = {command: 'form[action*="{0}"]'.format(command)
+                     for command in ('check-now', 'acknowledge', 'process-checkresult', 'schedule-downtime')}
 
 
     def init_config(self):
@@ -283,6 +285,8 @@ class IcingaDBWebServer(GenericServer):
                         # extra Icinga properties to solve https://github.com/HenriWahl/Nagstamon/issues/192
                         # acknowledge needs host_description and no display name
                         self.new_hosts[host_name].real_name = h['name']
+                        # status data contains the address already, saves a request for $ADDRESS$ later
+                        self.set_host_address(h['name'], h.get('address'))
 
                         # Icinga only updates the attempts for soft states. When hard state is reached, a flag is set and
                         # attemt is set to 1/x.
@@ -439,45 +443,14 @@ class IcingaDBWebServer(GenericServer):
         self.session.headers['X-Requested-With'] = 'XMLHttpRequest'
         self.session.headers.update({'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'})
 
-        # First retrieve the info page for this host/service
+        # the info page for this host/service contains the check-now form
         if service == '':
-            url = '{0}/icingadb/host?name={1}'.format(self.monitor_cgi_url, self.hosts[host].real_name)
+            form_url = '{0}/icingadb/host?name={1}'.format(self.monitor_cgi_url, self.hosts[host].real_name)
         else:
-            url = '{0}/icingadb/service?name={1}&host.name={2}'.format(self.monitor_cgi_url,
+            form_url = '{0}/icingadb/service?name={1}&host.name={2}'.format(self.monitor_cgi_url,
                                                                                            self.hosts[host].services[service].real_name,
                                                                                            self.hosts[host].real_name
                                                                                            )
-        result = self.fetch_url(url, giveback='raw')
-
-        if result.error != '':
-            return result
-        else:
-            pageraw = result.result
-
-        pagesoup = BeautifulSoup(pageraw, 'html.parser')
-
-        # Extract the relevant form element values
-        formtag = pagesoup.select_one('form[action*="check-now"]')
-
-        if formtag is None:
-            # This typically happens when authentication expired and we got redirected HTML,
-            # or the page layout changed.
-            if conf.debug_mode:
-                self.debug(server=self.get_name(), host=host, service=service,
-                        debug=f'[Recheck] Could not find check-now form. URL={url}. Possibly not authenticated or page changed.')
-            return Result(result=pageraw, error='Recheck form not found (authentication expired?)')
-
-        if conf.debug_mode:
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug='[Recheck] Retrieve html form from {0}: \n{1}'.format(url,formtag.prettify()))
-
-        btn_submit = formtag.findNext('button', {'name':'btn_submit'})['value']
-        CSRFToken = formtag.findNext('input', {'name':'CSRFToken'})['value']
-
-        # Pass these values to the check-now URL as cgi_data
-        cgi_data = {}
-        cgi_data['CSRFToken'] = CSRFToken
-        cgi_data['btn_submit'] = btn_submit
 
         if service == '':
             url = '{0}/icingadb/host/check-now?name={1}'.format(self.monitor_cgi_url, self.hosts[host].real_name)
@@ -486,25 +459,9 @@ class IcingaDBWebServer(GenericServer):
                                                                                            self.hosts[host].services[service].real_name,
                                                                                            self.hosts[host].real_name
                                                                                            )
-        
-        response = self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
-
-        # Some debug data
-        data = response.result
-        error = response.error
-        status_code = response.status_code
-        if conf.debug_mode:
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug='Recheck response')
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- response: {0}".format(response))
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- data: {0}".format(data))
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- error: {0}".format(error))
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- status_code: {0}".format(status_code))
 
+        # hidden form inputs like CSRFToken are cached and reused for every object
+        return self._submit_command_form(form_url, self.COMMAND_FORMS['check-now'], {}, url=url)
 
     # Overwrite function from generic server to add expire_time value
     def set_acknowledge(self, info_dict):
@@ -521,15 +478,15 @@ class IcingaDBWebServer(GenericServer):
         #    info_dict['expire_time'] = None
 
         try:
-            self._set_acknowledge(info_dict['host'],
-                                  info_dict['service'],
-                                  info_dict['author'],
-                                  info_dict['comment'],
-                                  info_dict['sticky'],
-                                  info_dict['notify'],
-                                  info_dict['persistent'],
-                                  all_services,
-                                  info_dict['expire_time'])
+            return self._set_acknowledge(info_dict['host'],
+                                         info_dict['service'],
+                                         info_dict['author'],
+                                         info_dict['comment'],
+                                         info_dict['sticky'],
+                                         info_dict['notify'],
+                                         info_dict['persistent'],
+                                         all_services,
+                                         info_dict['expire_time'])
         except:
             import traceback
             traceback.print_exc(file=sys.stdout)
@@ -552,29 +509,7 @@ class IcingaDBWebServer(GenericServer):
                                                                                            self.hosts[host].real_name
                                                                                            )
 
-        result = self.fetch_url(url, giveback='raw')
-
-        if result.error != '':
-            return result
-        else:
-            pageraw = result.result
-
-        pagesoup = BeautifulSoup(pageraw, 'html.parser')
-
-        # Extract the relevant form element values
-        formtag = pagesoup.select_one('form[action*="acknowledge"]')
-
-        if conf.debug_mode:
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug='[Acknowledge] Retrieve html form from {0}: \n{1}'.format(url,formtag.prettify()))
-                
-        btn_submit = formtag.findNext('input', {'name':'btn_submit'})['value']
-        CSRFToken = formtag.findNext('input', {'name':'CSRFToken'})['value']
-
-        # Pass these values to the same URL as cgi_data
         cgi_data = {}
-        cgi_data['CSRFToken'] = CSRFToken
-        cgi_data['btn_submit'] = btn_submit
         cgi_data['comment'] = comment
         cgi_data['persistent'] = str(persistent).replace('True', 'y').replace('False', 'n')
         cgi_data['sticky'] = str(sticky).replace('True', 'y').replace('False', 'n')
@@ -585,23 +520,10 @@ class IcingaDBWebServer(GenericServer):
         else:
             cgi_data['expire'] = 'n'
 
-        response = self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
-
-        # Some debug data
-        data = response.result
-        error = response.error
-        status_code = response.status_code
-        if conf.debug_mode:
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug='Achnowledgement response')
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- response: {0}".format(response))
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- data: {0}".format(data))
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- error: {0}".format(error))
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- status_code: {0}".format(status_code))
+        # hidden form inputs like CSRFToken are cached and reused for every object
+        result = self._submit_command_form(url, self.COMMAND_FORMS['acknowledge'], cgi_data)
+        if result is not None:
+            return result
 
         if len(all_services) > 0:
             for s in all_services:
@@ -626,52 +548,12 @@ class IcingaDBWebServer(GenericServer):
                                                                                            )
             status = self.STATES_MAPPING_REV['services'][state.upper()]
 
-        result = self.fetch_url(url, giveback='raw')
-
-        if result.error != '':
-            return result
-        else:
-            pageraw = result.result
-
-        pagesoup = BeautifulSoup(pageraw, 'html.parser')
-
-        # Extract the relevant form element values
-        formtag = pagesoup.select_one('form[action*="process-checkresult"]')
-
-        if conf.debug_mode:
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug='[Submit check result] Retrieve html form from {0}: \n{1}'.format(url,formtag.prettify()))
-
-        btn_submit = formtag.findNext('input', {'name':'btn_submit'})['value']
-        CSRFToken = formtag.findNext('input', {'name':'CSRFToken'})['value']
-        
-        # Pass these values to the same URL as cgi_data
         cgi_data = {}
-        cgi_data['CSRFToken'] = CSRFToken
-        cgi_data['btn_submit'] = btn_submit
-
         cgi_data['status'] = status
         cgi_data['output'] = check_output
         cgi_data['perfdata'] = performance_data
 
-        response = self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
-
-        # Some debug data
-        data = response.result
-        error = response.error
-        status_code = response.status_code
-        if conf.debug_mode:
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug='Achnowledgement response')
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- response: {0}".format(response))
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- data: {0}".format(data))
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- error: {0}".format(error))
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- status_code: {0}".format(status_code))
-
+        return self._submit_command_form(url, self.COMMAND_FORMS['process-checkresult'], cgi_data)
 
     def _set_downtime(self, host, service, author, comment, fixed, start_time, end_time, hours, minutes):
         # Set correct headers
@@ -687,30 +569,8 @@ class IcingaDBWebServer(GenericServer):
                                                                                            self.hosts[host].services[service].real_name,
                                                                                            self.hosts[host].real_name
                                                                                            )
-                    
-        result = self.fetch_url(url, giveback='raw')
-
-        if result.error != '':
-            return result
-        else:
-            pageraw = result.result
-
-        pagesoup = BeautifulSoup(pageraw, 'html.parser')
-
-        # Extract the relevant form element values
-        formtag = pagesoup.select_one('form[action*="schedule-downtime"]')
-
-        if conf.debug_mode:
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug='[Set downtime] Retrieve html form from {0}: \n{1}'.format(url,formtag.prettify()))
-        
-        btn_submit = formtag.findNext('input', {'name':'btn_submit'})['value']
-        CSRFToken = formtag.findNext('input', {'name':'CSRFToken'})['value']
 
-        # Pass these values to the same URL as cgi_data
         cgi_data = {}
-        cgi_data['CSRFToken'] = CSRFToken
-        cgi_data['btn_submit'] = btn_submit
         cgi_data['comment'] = comment
         if fixed:
             cgi_data['flexible'] = 'n'
@@ -730,24 +590,7 @@ class IcingaDBWebServer(GenericServer):
         cgi_data['start'] = start
         cgi_data['end'] = end
 
-        response = self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
-
-        # Some debug data
-        data = response.result
-        error = response.error
-        status_code = response.status_code
-        if conf.debug_mode:
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug='Achnowledgement response')
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- response: {0}".format(response))
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- data: {0}".format(data))
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- error: {0}".format(error))
-            self.debug(server=self.get_name(), host=host, service=service,
-                       debug="- status_code: {0}".format(status_code))
-
+        return self._submit_command_form(url, self.COMMAND_FORMS['schedule-downtime'], cgi_data)
 
     def get_start_end(self, host):
         '''
@@ -830,9 +673,10 @@ class IcingaDBWebServer(GenericServer):
         if conf.connect_by_host is True or host == '':
             return Result(result=host)
 
-        # initialize ip string
-        ip = ''
-        address = ''
+        # address might be known already from status data or earlier lookups
+        ip = self.host_addresses.get(host)
+        if ip is not None:
+            return Result(result=self.resolve_address(ip))
 
         # glue nagios cgi url and hostinfo
         cgiurl_host = self.monitor_cgi_url + '/icingadb/hosts?name={0}&columns=host.address&format=json'.format(host)
@@ -850,15 +694,8 @@ class IcingaDBWebServer(GenericServer):
             if conf.debug_mode is True:
                 self.debug(server=self.get_name(), host=host, debug='IP of %s:' % (host) + ' ' + ip)
 
-            # when connection by DNS is not configured do it by IP
-            if conf.connect_by_dns is True:
-                # try to get DNS name for ip, if not available use ip
-                try:
-                    address = socket.gethostbyaddr(ip)[0]
-                except socket.error:
-                    address = ip
-            else:
-                address = ip
+            self.set_host_address(host, ip)
+            address = self.resolve_address(ip)
         except Exception:
             result, error = self.error(sys.exc_info())
             return Result(result=result, error=error)
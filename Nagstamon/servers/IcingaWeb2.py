@@ -36,7 +36,6 @@ import sys
 import copy
 import json
 import datetime
-import socket
 
 from bs4 import BeautifulSoup
 from Nagstamon.objects import (GenericHost,
@@ -68,6 +67,15 @@ class IcingaWeb2Server(GenericServer):
                     'hosts': '$MONITOR-CGI$/monitoring/list/hosts', \
                     'services': '$MONITOR-CGI$/monitoring/list/services', \
                     'history': '$MONITOR-CGI$/monitoring/list/eventhistory?timestamp>=-7 days'}
+    # multi-object command URLs longer than this are split
+    MAX_URL_LENGTH = 2048
+    # command forms by command - their hidden inputs get cached by _submit_command_form()
+    COMMAND_FORMS = {command: 'form[name="IcingaModuleMonitoringFormsCommandObject{0}CommandForm"]'.format(form)
+                     for command, form in (('check-now', 'CheckNow'),
+                                           ('acknowledge-problem', 'AcknowledgeProblem'),
+                                           ('process-check-result', 'ProcessCheckResult'),
+                                           ('schedule-host-downtime', 'ScheduleHostDowntime'),
+                                           ('schedule-service-downtime', 'ScheduleServiceDowntime'))}
 
 
     def init_config(self):
@@ -219,6 +227,8 @@ class IcingaWeb2Server(GenericServer):
                         # extra Icinga properties to solve https://github.com/HenriWahl/Nagstamon/issues/192
                         # acknowledge needs host_description and no display name
                         self.new_hosts[host_name].real_name = h['host_name']
+                        # status data might contain the address already, saves a request for $ADDRESS$ later
+                        self.set_host_address(h['host_name'], h.get('host_address'))
 
                         # Icinga only updates the attempts for soft states. When hard state is reached, a flag is set and
                         # attemt is set to 1/x.
@@ -359,33 +369,8 @@ class IcingaWeb2Server(GenericServer):
             url = self.monitor_cgi_url + \
                   '/monitoring/service/show?host=' + self.hosts[host].real_name + \
                   '&service=' + urllib.parse.quote(self.hosts[host].services[service].real_name)
-        result = self.fetch_url(url, giveback='raw')
-
-        if result.error != '':
-            return result
-        else:
-            pageraw = result.result
-
-        pagesoup = BeautifulSoup(pageraw, 'html.parser')
-
-        # Extract the relevant form element values
-        # try-except needed in case the CSRFToken will not be found
-        try:
-            formtag = pagesoup.find('form', {'name':'IcingaModuleMonitoringFormsCommandObjectCheckNowCommandForm'})
-            CSRFToken = formtag.findNext('input', {'name':'CSRFToken'})['value']
-            formUID = formtag.findNext('input', {'name':'formUID'})['value']
-            btn_submit = formtag.findNext('button', {'name':'btn_submit'})['value']
-
-            # Pass these values to the same URL as cgi_data
-            cgi_data = {}
-            cgi_data['CSRFToken'] = CSRFToken
-            cgi_data['formUID'] = formUID
-            cgi_data['btn_submit'] = btn_submit
-            self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
-        except AttributeError:
-            if conf.debug_mode:
-                self.debug(server=self.get_name(), host=host, service=service,
-                           debug='No valid CSRFToken available')
+        # hidden form inputs like CSRFToken are cached and reused for every object
+        return self._submit_command_form(url, self.COMMAND_FORMS['check-now'], {})
 
     # Overwrite function from generic server to add expire_time value
     def set_acknowledge(self, info_dict):
@@ -401,15 +386,15 @@ class IcingaWeb2Server(GenericServer):
         #if not info_dict['expire_time']:
         #    info_dict['expire_time'] = None
 
-        self._set_acknowledge(info_dict['host'],
-                              info_dict['service'],
-                              info_dict['author'],
-                              info_dict['comment'],
-                              info_dict['sticky'],
-                              info_dict['notify'],
-                              info_dict['persistent'],
-                              all_services,
-                              info_dict['expire_time'])
+        return self._set_acknowledge(info_dict['host'],
+                                     info_dict['service'],
+                                     info_dict['author'],
+                                     info_dict['comment'],
+                                     info_dict['sticky'],
+                                     info_dict['notify'],
+                                     info_dict['persistent'],
+                                     all_services,
+                                     info_dict['expire_time'])
 
 
     def _set_acknowledge(self, host, service, author, comment, sticky, notify, persistent, all_services=None, expire_time=None):
@@ -422,49 +407,47 @@ class IcingaWeb2Server(GenericServer):
             url = '{0}/monitoring/service/acknowledge-problem?host={1}&service={2}'.format(self.monitor_cgi_url,
                                                                                            self.hosts[host].real_name,
                                                                                            urllib.parse.quote(self.hosts[host].services[service].real_name))
-        result = self.fetch_url(url, giveback='raw')
-
-        if result.error != '':
+        result = self._post_acknowledge_form(url, host, service, comment, sticky, notify, persistent, expire_time)
+        if result is not None:
             return result
-        else:
-            pageraw = result.result
 
-        pagesoup = BeautifulSoup(pageraw, 'html.parser')
+        # all services of the host at once via the multi-object form, split only if the URL gets too long
+        services = [s for s in all_services or [] if s != service]
+        for url in self._get_services_urls('acknowledge-problem', host, services):
+            self._post_acknowledge_form(url, host, '', comment, sticky, notify, persistent, expire_time)
 
-        # Extract the relevant form element values
-        # try-except needed in case the CSRFToken will not be found
-        try:
-            formtag = pagesoup.find('form', {'name':'IcingaModuleMonitoringFormsCommandObjectAcknowledgeProblemCommandForm'})
-
-            CSRFToken = formtag.findNext('input', {'name':'CSRFToken'})['value']
-            formUID = formtag.findNext('input', {'name':'formUID'})['value']
-            btn_submit = formtag.findNext('input', {'name':'btn_submit'})['value']
-
-            # Pass these values to the same URL as cgi_data
-            cgi_data = {}
-            cgi_data['CSRFToken'] = CSRFToken
-            cgi_data['formUID'] = formUID
-            cgi_data['btn_submit'] = btn_submit
-            cgi_data['comment'] = comment
-            cgi_data['persistent'] = int(persistent)
-            cgi_data['sticky'] = int(sticky)
-            cgi_data['notify'] = int(notify)
-            cgi_data['comment'] = comment
-            if expire_time:
-                cgi_data['expire'] = 1
-                cgi_data['expire_time'] = expire_time
-
-            self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
-
-        except AttributeError:
-            if conf.debug_mode:
-                self.debug(server=self.get_name(), host=host, service=service,
-                           debug='No valid CSRFToken available')
-
-        if len(all_services) > 0:
-            for s in all_services:
-                # cheap, recursive solution...
-                self._set_acknowledge(host, s, author, comment, sticky, notify, persistent, [], expire_time)
+    def _get_services_urls(self, command, host, services):
+        """
+            URLs of multi-object command forms which filter for the given services of one host
+        """
+        base_url = '{0}/monitoring/services/{1}?host={2}&'.format(self.monitor_cgi_url,
+                                                                  command,
+                                                                  urllib.parse.quote(self.hosts[host].real_name))
+        service_filters = []
+        for service in services:
+            service_filter = 'service=' + urllib.parse.quote(self.hosts[host].services[service].real_name, safe='')
+            if service_filters and \
+                    len(base_url) + len('|'.join(service_filters + [service_filter])) + 2 > self.MAX_URL_LENGTH:
+                yield base_url + '(' + '|'.join(service_filters) + ')'
+                service_filters = []
+            service_filters.append(service_filter)
+        if service_filters:
+            yield base_url + '(' + '|'.join(service_filters) + ')'
+
+    def _post_acknowledge_form(self, url, host, service, comment, sticky, notify, persistent, expire_time):
+        """
+            fill and submit acknowledgement form found at url, gives back a Result only in case of an error
+        """
+        cgi_data = {}
+        cgi_data['comment'] = comment
+        cgi_data['persistent'] = int(persistent)
+        cgi_data['sticky'] = int(sticky)
+        cgi_data['notify'] = int(notify)
+        if expire_time:
+            cgi_data['expire'] = 1
+            cgi_data['expire_time'] = expire_time
+
+        return self._submit_command_form(url, self.COMMAND_FORMS['acknowledge-problem'], cgi_data)
 
 
     def _set_submit_check_result(self, host, service, state, comment, check_output, performance_data):
@@ -479,39 +462,12 @@ class IcingaWeb2Server(GenericServer):
                   '&service=' + urllib.parse.quote(self.hosts[host].services[service].real_name)
             status = self.STATES_MAPPING_REV['services'][state.upper()]
 
-        result = self.fetch_url(url, giveback='raw')
-
-        if result.error != '':
-            return result
-        else:
-            pageraw = result.result
-
-        pagesoup = BeautifulSoup(pageraw, 'html.parser')
-
-        # Extract the relevant form element values
-        # try-except needed in case the CSRFToken will not be found
-        try:
-            formtag = pagesoup.find('form', {'name':'IcingaModuleMonitoringFormsCommandObjectProcessCheckResultCommandForm'})
-            CSRFToken = formtag.findNext('input', {'name':'CSRFToken'})['value']
-            formUID = formtag.findNext('input', {'name':'formUID'})['value']
-            btn_submit = formtag.findNext('input', {'name':'btn_submit'})['value']
-
-            # Pass these values to the same URL as cgi_data
-            cgi_data = {}
-            cgi_data['CSRFToken'] = CSRFToken
-            cgi_data['formUID'] = formUID
-            cgi_data['btn_submit'] = btn_submit
-
-            cgi_data['status'] = status
-            cgi_data['output'] = check_output
-            cgi_data['perfdata'] = performance_data
-
-            self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+        cgi_data = {}
+        cgi_data['status'] = status
+        cgi_data['output'] = check_output
+        cgi_data['perfdata'] = performance_data
 
-        except AttributeError:
-            if conf.debug_mode:
-                self.debug(server=self.get_name(), host=host, service=service,
-                           debug='No valid CSRFToken available')
+        return self._submit_command_form(url, self.COMMAND_FORMS['process-check-result'], cgi_data)
 
     def _set_downtime(self, host, service, author, comment, fixed, start_time, end_time, hours, minutes):
         # First retrieve the info page for this host/service
@@ -522,57 +478,31 @@ class IcingaWeb2Server(GenericServer):
                   '/monitoring/service/schedule-downtime?host=' + self.hosts[host].real_name + \
                   '&service=' + urllib.parse.quote(self.hosts[host].services[service].real_name)
 
-        result = self.fetch_url(url, giveback='raw')
-
-        if result.error != '':
-            return result
+        cgi_data = {}
+        cgi_data['comment'] = comment
+        if fixed:
+            cgi_data['type'] = 'fixed'
+        else:
+            cgi_data['type'] = 'flexible'
+            cgi_data['hours'] = hours
+            cgi_data['minutes'] = minutes
+        if start_time == '' or start_time == 'n/a':
+            start = datetime.datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+        else:
+            start = start_time
+        if end_time == '' or end_time == 'n/a':
+            end = (datetime.datetime.now() + datetime.timedelta(hours=hours, minutes=minutes)).strftime('%Y-%m-%dT%H:%M:%S')
         else:
-            pageraw = result.result
+            end = end_time
 
-        pagesoup = BeautifulSoup(pageraw, 'html.parser')
+        cgi_data['start'] = start
+        cgi_data['end'] = end
 
-        # Extract the relevant form element values
-        # try-except needed in case the CSRFToken will not be found
-        try:
-            if service == '':
-                formtag = pagesoup.find('form', {'name':'IcingaModuleMonitoringFormsCommandObjectScheduleHostDowntimeCommandForm'})
-            else:
-                formtag = pagesoup.find('form', {'name':'IcingaModuleMonitoringFormsCommandObjectScheduleServiceDowntimeCommandForm'})
-
-            CSRFToken = formtag.findNext('input', {'name':'CSRFToken'})['value']
-            formUID = formtag.findNext('input', {'name':'formUID'})['value']
-            btn_submit = formtag.findNext('input', {'name':'btn_submit'})['value']
-
-            # Pass these values to the same URL as cgi_data
-            cgi_data = {}
-            cgi_data['CSRFToken'] = CSRFToken
-            cgi_data['formUID'] = formUID
-            cgi_data['btn_submit'] = btn_submit
-            cgi_data['comment'] = comment
-            if fixed:
-                cgi_data['type'] = 'fixed'
-            else:
-                cgi_data['type'] = 'flexible'
-                cgi_data['hours'] = hours
-                cgi_data['minutes'] = minutes
-            if start_time == '' or start_time == 'n/a':
-                start = datetime.datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
-            else:
-                start = start_time
-            if end_time == '' or end_time == 'n/a':
-                end = (datetime.datetime.now() + datetime.timedelta(hours=hours, minutes=minutes)).strftime('%Y-%m-%dT%H:%M:%S')
-            else:
-                end = end_time
-
-            cgi_data['start'] = start
-            cgi_data['end'] = end
-
-            self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
-
-        except AttributeError:
-            if conf.debug_mode:
-                self.debug(server=self.get_name(), host=host, service=service,
-                           debug='No valid CSRFToken available')
+        if service == '':
+            form_selector = self.COMMAND_FORMS['schedule-host-downtime']
+        else:
+            form_selector = self.COMMAND_FORMS['schedule-service-downtime']
+        return self._submit_command_form(url, form_selector, cgi_data)
 
     def get_start_end(self, host):
         '''
@@ -624,9 +554,10 @@ class IcingaWeb2Server(GenericServer):
         if conf.connect_by_host is True or host == '':
             return Result(result=host)
 
-        # initialize ip string
-        ip = ''
-        address = ''
+        # address might be known already from status data or earlier lookups
+        ip = self.host_addresses.get(host)
+        if ip is not None:
+            return Result(result=self.resolve_address(ip))
 
         # glue nagios cgi url and hostinfo
         cgiurl_host = self.monitor_cgi_url + '/monitoring/list/hosts?host={0}&addColumns=host_address&format=json'.format(host)
@@ -644,15 +575,8 @@ class IcingaWeb2Server(GenericServer):
             if conf.debug_mode is True:
                 self.debug(server=self.get_name(), host=host, debug='IP of %s:' % (host) + ' ' + ip)
 
-            # when connection by DNS is not configured do it by IP
-            if conf.connect_by_dns is True:
-                # try to get DNS name for ip, if not available use ip
-                try:
-                    address = socket.gethostbyaddr(ip)[0]
-                except socket.error:
-                    address = ip
-            else:
-                address = ip
+            self.set_host_address(host, ip)
+            address = self.resolve_address(ip)
         except Exception:
             result, error = self.error(sys.exc_info())
             return Result(result=result, error=error)
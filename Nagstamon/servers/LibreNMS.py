@@ -29,13 +29,15 @@
 import sys
 import json
 from datetime import datetime
+import time
 
 from Nagstamon.config import conf
 from Nagstamon.objects import (GenericHost,
                                GenericService,
                                Result)
 from Nagstamon.servers.Generic import GenericServer
-from Nagstamon.helpers import webbrowser_open
+from Nagstamon.helpers import (TTLCache,
+                               webbrowser_open)
 
 
 class LibreNMSServer(GenericServer):
@@ -56,6 +58,14 @@ class LibreNMSServer(GenericServer):
     # API paths
     API_PATH_ALERTS = "/api/v0/alerts"
     API_PATH_DEVICES = "/api/v0/devices"
+    API_PATH_SERVICES = "/api/v0/services"
+
+    # metadata like device names changes rarely so it is kept for some minutes
+    # and the devices are fetched with one batch request instead of one request per alert
+    METADATA_CACHE_TTL = 600
+    METADATA_CACHE_SIZE = 10000
+    # services carry status so they are refreshed about once per poll
+    SERVICES_CACHE_TTL = 55
 
     # Status mapping from LibreNMS severity to Nagios-style states
     # LibreNMS severities: ok, warning, critical
@@ -69,10 +79,13 @@ class LibreNMSServer(GenericServer):
         GenericServer.__init__(self, **kwds)
 
         # Store device information for alert enrichment
-        self.devices = {}
+        self.devices = TTLCache(maxsize=self.METADATA_CACHE_SIZE, ttl=self.METADATA_CACHE_TTL)
+        # timestamp of last batch prefetch of all devices
+        self.devices_prefetched = 0
 
-        # Cache for services (by device_id)
+        # Cache for services (by device_id), refreshed as a whole
         self.services_cache = {}
+        self.services_cache_timestamp = 0
 
         # Option to treat service status as alerts
         # When enabled, non-OK services will be shown even without alert rules
@@ -99,13 +112,51 @@ class LibreNMSServer(GenericServer):
         """
         pass
 
+    @staticmethod
+    def _device_display_name(device_data, hostname_fallback):
+        """
+        Try different fields in order of preference
+        display > sysName > hostname
+        """
+        return (device_data.get('display') or
+                device_data.get('sysName') or
+                device_data.get('hostname') or
+                hostname_fallback)
+
+    def _prefetch_devices(self):
+        """
+        Fetch all devices with one request and put them into the device cache
+        Done at most once per METADATA_CACHE_TTL, single devices are still fetched on cache miss
+        """
+        if self.devices_prefetched and \
+                time.monotonic() - self.devices_prefetched < self.METADATA_CACHE_TTL:
+            return
+
+        try:
+            result = self.fetch_url(self.monitor_url + self.API_PATH_DEVICES, giveback="json")
+
+            if result.result and result.result.get('status') == 'ok':
+                self.devices.update({device.get('device_id'): device
+                                     for device in result.result.get('devices', [])
+                                     if device.get('device_id') is not None})
+                self.devices_prefetched = time.monotonic()
+
+                if conf.debug_mode:
+                    self.debug(server=self.get_name(),
+                              debug=f"Prefetched {len(result.result.get('devices', []))} devices")
+        except Exception:
+            if conf.debug_mode:
+                self.debug(server=self.get_name(),
+                          debug="Could not prefetch devices")
+
     def _get_device_display_name(self, device_id, hostname_fallback):
         """
         Get the display name for a device from cache or API
         """
         # Check if we already have this device cached
-        if device_id in self.devices:
-            return self.devices[device_id].get('display', hostname_fallback)
+        device_data = self.devices.get(device_id)
+        if device_data is not None:
+            return self._device_display_name(device_data, hostname_fallback)
 
         # Fetch device details from API
         try:
@@ -117,14 +168,9 @@ class LibreNMSServer(GenericServer):
             if result.result and result.result.get('status') == 'ok':
                 device_data = result.result.get('devices', [{}])[0]
                 # Cache the device info
-                self.devices[device_id] = device_data
+                self.devices.set(device_id, device_data)
 
-                # Try different fields in order of preference
-                # display > sysName > hostname
-                display_name = (device_data.get('display') or
-                               device_data.get('sysName') or
-                               device_data.get('hostname') or
-                               hostname_fallback)
+                display_name = self._device_display_name(device_data, hostname_fallback)
 
                 if conf.debug_mode:
                     self.debug(server=self.get_name(),
@@ -138,93 +184,50 @@ class LibreNMSServer(GenericServer):
 
         return hostname_fallback
 
-    def _get_alert_details(self, alert_id):
+    def _prefetch_services(self):
         """
-        Get detailed alert information including rule name
+        Fetch services of all devices with one request and build a device_id -> services mapping
+        Refreshed at most once per SERVICES_CACHE_TTL, returns False if services could not be fetched
         """
+        if self.services_cache_timestamp and \
+                time.monotonic() - self.services_cache_timestamp < self.SERVICES_CACHE_TTL:
+            return True
+
         try:
             result = self.fetch_url(
-                f"{self.monitor_url}/api/v0/alerts/{alert_id}",
+                self.monitor_url + self.API_PATH_SERVICES,
                 giveback="json"
             )
 
             if result.result and result.result.get('status') == 'ok':
-                alerts = result.result.get('alerts', [])
-                if alerts:
-                    return alerts[0]
-        except Exception:
-            if conf.debug_mode:
-                self.debug(server=self.get_name(),
-                          debug=f"Could not fetch alert details for {alert_id}")
-
-        return None
+                services = result.result.get('services', [])
 
-    def _get_rule_name(self, rule_id):
-        """
-        Get the rule name from cache or API
-        """
-        # Use a rules cache dictionary
-        if not hasattr(self, 'rules_cache'):
-            self.rules_cache = {}
-
-        # Check cache first
-        if rule_id in self.rules_cache:
-            return self.rules_cache[rule_id]
-
-        # Fetch rule details from API
-        try:
-            result = self.fetch_url(
-                f"{self.monitor_url}/api/v0/rules/{rule_id}",
-                giveback="json"
-            )
+                # Build a device_id -> services mapping
+                services_cache = {}
+                for svc_list in services:
+                    for svc in svc_list:
+                        services_cache.setdefault(svc.get('device_id'), []).append(svc)
+                self.services_cache = services_cache
+                self.services_cache_timestamp = time.monotonic()
 
-            if result.result and result.result.get('status') == 'ok':
-                rules = result.result.get('rules', [])
-                if rules:
-                    rule_name = rules[0].get('name', f'Rule {rule_id}')
-                    # Cache it
-                    self.rules_cache[rule_id] = rule_name
-                    return rule_name
+                if conf.debug_mode:
+                    self.debug(server=self.get_name(),
+                              debug=f"Cached services for all devices")
+                return True
         except Exception:
             if conf.debug_mode:
                 self.debug(server=self.get_name(),
-                          debug=f"Could not fetch rule {rule_id}")
-
-        return f"Rule {rule_id}"
+                          debug=f"Could not fetch services")
+        return False
 
     def _get_service_details(self, device_id, service_name):
         """
         Find a matching service for the alert and return its details
         Returns service_message if found
         """
-        # Check if we have services cached for this device
-        if device_id not in self.services_cache:
-            # Fetch services for this device
-            try:
-                result = self.fetch_url(
-                    f"{self.monitor_url}/api/v0/services",
-                    giveback="json"
-                )
-
-                if result.result and result.result.get('status') == 'ok':
-                    services = result.result.get('services', [])
-
-                    # Build a device_id -> services mapping
-                    for svc_list in services:
-                        for svc in svc_list:
-                            dev_id = svc.get('device_id')
-                            if dev_id not in self.services_cache:
-                                self.services_cache[dev_id] = []
-                            self.services_cache[dev_id].append(svc)
-
-                    if conf.debug_mode:
-                        self.debug(server=self.get_name(),
-                                  debug=f"Cached services for all devices")
-            except Exception:
-                if conf.debug_mode:
-                    self.debug(server=self.get_name(),
-                              debug=f"Could not fetch services")
-                return None
+        # Services of all devices are fetched at once - a device without services has no entry
+        if not self._prefetch_services():
+            return None
 
         # Now find matching service by name
         device_services = self.services_cache.get(device_id, [])
@@ -267,6 +270,10 @@ class LibreNMSServer(GenericServer):
             # Process each alert
             alerts = data.get('alerts', [])
 
+            # Batch prefetch metadata so the alerts below do not need one request each
+            if alerts:
+                self._prefetch_devices()
+
             for alert in alerts:
                 # Skip alerts that are in "ok" state (state=0)
                 # state: 0=ok, 1=alert, 2=acknowledged
@@ -417,27 +424,15 @@ class LibreNMSServer(GenericServer):
             for service_name in host_obj.services.keys():
                 existing_alerts.add((host_obj.name, service_name))
 
-        # Fetch all services if not cached
-        if not self.services_cache:
-            try:
-                result = self.fetch_url(
-                    f"{self.monitor_url}/api/v0/services",
-                    giveback="json"
-                )
-
-                if result.result and result.result.get('status') == 'ok':
-                    services = result.result.get('services', [])
-                    for svc_list in services:
-                        for svc in svc_list:
-                            dev_id = svc.get('device_id')
-                            if dev_id not in self.services_cache:
-                                self.services_cache[dev_id] = []
-                            self.services_cache[dev_id].append(svc)
-            except Exception:
-                if conf.debug_mode:
-                    self.debug(server=self.get_name(),
-                              debug="Could not fetch services for treat_services_as_alerts")
-                return
+        # Fetch all services if not cached or outdated
+        if not self._prefetch_services():
+            if conf.debug_mode:
+                self.debug(server=self.get_name(),
+                          debug="Could not fetch services for treat_services_as_alerts")
+            return
+
+        # Device names are needed for the services too
+        self._prefetch_devices()
 
         # Process non-OK services
         for device_id, services_list in self.services_cache.items():
@@ -24,7 +24,6 @@
 # Status/TODOs:
 #
 
-import copy
 import datetime
 import json
 import logging
@@ -145,148 +144,28 @@ class Monitos4xServer(GenericServer):
         if self.use_autologin is True:
             if self.cgiurl_hosts is None:
                 # hosts (up, down, unreachable)
-                self.cgiurl_hosts = self.monitor_cgi_url + '/api/host?include=status,configuration&limit=100&filter[states]=0,1,2&filter[onlysyncenabled]' + '&authtoken=' + self.autologin_key
+                self.cgiurl_hosts = self.monitor_cgi_url + '/api/host?include=status,configuration&limit=' + str(self.page_size) + '&filter[states]=0,1,2&filter[onlysyncenabled]' + '&authtoken=' + self.autologin_key
 
             if self.cgiurl_services is None:
                 # services (warning, critical, unknown)
                 self.cgiurl_services = self.monitor_cgi_url + \
-                                       '/api/serviceinstance?include=status,configuration&limit=100&filter[states]=1,2,3&filter[onlysyncenabled]' + '&authtoken=' + self.autologin_key
+                                       '/api/serviceinstance?include=status,configuration&limit=' + str(self.page_size) + '&filter[states]=1,2,3&filter[onlysyncenabled]' + '&authtoken=' + self.autologin_key
         else:
             if self.cgiurl_hosts is None:
                 # hosts (up, down, unreachable)
-                self.cgiurl_hosts = self.monitor_cgi_url + '/api/host?include=status,configuration&limit=100&filter[states]=0,1,2&filter[onlysyncenabled]'
+                self.cgiurl_hosts = self.monitor_cgi_url + '/api/host?include=status,configuration&limit=' + str(self.page_size) + '&filter[states]=0,1,2&filter[onlysyncenabled]'
 
             if self.cgiurl_services is None:
                 # services (warning, critical, unknown)
-                self.cgiurl_services = self.monitor_cgi_url + '/api/serviceinstance?include=status,configuration&limit=100&filter[states]=1,2,3&filter[onlysyncenabled]'
+                self.cgiurl_services = self.monitor_cgi_url + '/api/serviceinstance?include=status,configuration&limit=' + str(self.page_size) + '&filter[states]=1,2,3&filter[onlysyncenabled]'
 
         self.new_hosts = dict()
 
         # hosts
         try:
-            page = 1
-
-            # loop trough all api pages
-            while True:
-                cgiurl_hosts_page = self.cgiurl_hosts + '&page=' + str(page)
-
-                result = self.fetch_url(
-                    cgiurl_hosts_page, giveback='raw', cgi_data=None)
-
-                # authentication errors get a status code 200 too
-                if result.status_code < 400 and \
-                        result.result.startswith('<'):
-                    # in case of auth error reset HTTP session and try again
-                    self.reset_http()
-                    result = self.fetch_url(
-                        cgiurl_hosts_page, giveback='raw', cgi_data=None)
-
-                    if result.status_code < 400 and \
-                            result.result.startswith('<'):
-                        self.refresh_authentication = True
-                        return Result(result=result.result,
-                                      error='Authentication error',
-                                      status_code=result.status_code)
-
-                # purify JSON result
-                jsonraw = copy.deepcopy(result.result.replace('\n', ''))
-                error = copy.deepcopy(result.error)
-                status_code = result.status_code
-
-                if error != '' or status_code >= 400:
-                    return Result(result=jsonraw,
-                                  error=error,
-                                  status_code=status_code)
-
-                self.check_for_error(jsonraw, error, status_code)
-
-                hosts = json.loads(jsonraw)
-                if not hosts['data']:
-                    break
-
-                page+=1
-
-                for host in hosts['data']:
-                    h = dict(host)
-
-                    # Skip if host is disabled
-                    if h['syncEnabled'] is not None:
-                        if not int(h['syncEnabled']):
-                            continue
-
-                    # host
-                    host_name = h['name']
-
-                    if conf.debug_mode:
-                        self.debug(server=self.get_name(), debug=time.strftime('%a %H:%M:%S') + ' host_name is: ' + host_name)
-
-                    # If a host does not exist, create its object
-                    if host_name not in self.new_hosts:
-                        self.new_hosts[host_name] = GenericHost()
-                        self.new_hosts[host_name].name = host_name
-                        self.new_hosts[host_name].uuid = h['uuid']
-                        self.new_hosts[host_name].server = 'monitos'
-
-                        try:
-                            self.new_hosts[host_name].status = self.STATES_MAPPING['hosts'][int(
-                                h['status']['currentState'])]
-                        except:
-                            pass
-
-                        try:
-                            self.new_hosts[host_name].last_check = datetime.datetime.fromtimestamp(
-                                int(h['status']['lastCheck']))
-                        except:
-                            pass
-
-                        self.new_hosts[host_name].attempt = h['configuration']['maxCheckAttempts']
-
-                        try:
-                            self.new_hosts[host_name].status_information = BeautifulSoup(h['status']['output'].replace('\n', ' ').strip(), 'html.parser').text
-                        except:
-                            self.new_hosts[host_name].services[service_name].status_information = 'Cant parse output'
-
-                        self.new_hosts[host_name].passiveonly = not (
-                            int(h['status']['checksEnabled']))
-
-                        try:
-                            self.new_hosts[host_name].notifications_disabled = not (int(s['status']['notificationsEnabled']))
-                        except:
-                            self.new_hosts[host_name].notifications_disabled = False
-
-                        try:
-                            self.new_hosts[host_name].flapping = (int(h['status']['isFlapping']))
-                        except:
-                            self.new_hosts[host_name].flapping = False
-
-                        if h['status']['acknowleged'] is None:
-                            self.new_hosts[host_name].acknowledged = False
-                        else:
-                            if h['status']['acknowleged'] != 0:
-                                self.new_hosts[host_name].acknowledged = True
-
-                        try:
-                            if int(h['status']['scheduledDowntimeDepth']) != 0:
-                                self.new_hosts[host_name].scheduled_downtime = True
-                        except:
-                            self.new_hosts[host_name].scheduled_downtime = False
-
-                        try:
-                            self.new_hosts[host_name].status_type = 'soft' if int(h['status']['stateType']) == 0 else 'hard'
-                        except:
-                            self.new_hosts[host_name].status_type = 'hard'
-
-                        # extra duration needed for calculation
-                        if h['status']['lastStateChange'] is None:
-                            self.debug(server=self.get_name(), debug=time.strftime('%a %H:%M:%S') + 'Host has wrong lastStateChange - host_name is: ' + host_name)
-                        else:
-                            duration = datetime.datetime.now(
-                            ) - datetime.datetime.fromtimestamp(int(h['status']['lastStateChange']))
-                            self.new_hosts[host_name].duration = strfdelta(
-                                duration, '{days}d {hours}h {minutes}m {seconds}s')
-
-                    del h, host_name
-                del hosts
+            errors_occured = self._get_pages(self.cgiurl_hosts, self._process_host, check_authentication=True)
+            if errors_occured is not None:
+                return errors_occured
         except:
             import traceback
             traceback.print_exc(file=sys.stdout)
@@ -298,125 +177,9 @@ class Monitos4xServer(GenericServer):
 
         # services
         try:
-            page = 1
-
-            # loop trough all api pages
-            while True:
-                cgiurl_services_page = self.cgiurl_services + '&page=' + str(page)
-
-                result = self.fetch_url(cgiurl_services_page,
-                                        giveback='raw', cgi_data=None)
-
-                # purify JSON result
-                jsonraw = copy.deepcopy(result.result.replace('\n', ''))
-                error = copy.deepcopy(result.error)
-                status_code = result.status_code
-
-                if error != '' or status_code >= 400:
-                    return Result(result=jsonraw,
-                                  error=error,
-                                  status_code=status_code)
-
-                self.check_for_error(jsonraw, error, status_code)
-
-                services = json.loads(jsonraw)
-                if not services['data']:
-                    break
-
-                page+=1
-
-                for service in services['data']:
-                    s = dict(service)
-
-                    # Skip if host is disabled
-                    if s['syncEnabled'] is not None:
-                        if not int(s['syncEnabled']):
-                            continue
-
-                    # host and service
-                    host_name = s['configuration']['hostName']
-                    service_name = s['configuration']['serviceDescription']
-
-                    if conf.debug_mode:
-                        self.debug(server=self.get_name(), debug=time.strftime('%a %H:%M:%S') + ' host_name is: ' + host_name + ' service_name is: ' + service_name)
-
-                    # If host not in problem list, create it
-                    if host_name not in self.new_hosts:
-                        self.new_hosts[host_name] = GenericHost()
-                        self.new_hosts[host_name].name = host_name
-                        self.new_hosts[host_name].uuid = s['configuration']['host']['uuid']
-                        self.new_hosts[host_name].status = self.STATES_MAPPING['services'][0]
-
-                    # If a service does not exist, create its object
-                    if service_name not in self.new_hosts[host_name].services:
-                        self.new_hosts[host_name].services[service_name] = GenericService(
-                        )
-                        self.new_hosts[host_name].services[service_name].host = s['configuration']['hostName']
-                        self.new_hosts[host_name].services[service_name].uuid = s['uuid']
-                        self.new_hosts[host_name].services[service_name].name = service_name
-                        self.new_hosts[host_name].services[service_name].server = 'monitos'
-
-                        try:
-                            self.new_hosts[host_name].services[service_name].status = self.STATES_MAPPING['services'][int(
-                                s['status']['currentState'])]
-                        except:
-                            pass
-
-                        try:
-                            self.new_hosts[host_name].services[service_name].last_check = datetime.datetime.fromtimestamp(
-                                int(s['status']['lastCheck']))
-                        except:
-                            pass
-
-                        self.new_hosts[host_name].services[service_name].attempt = s['configuration']['maxCheckAttempts']
-
-                        try:
-                            self.new_hosts[host_name].services[service_name].status_information = BeautifulSoup(s['status']['output'].replace('\n', ' ').strip(), 'html.parser').text
-                        except:
-                            self.new_hosts[host_name].services[service_name].status_information = 'Cant parse output'
-
-                        self.new_hosts[host_name].services[service_name].passiveonly = not (int(s['status']['checksEnabled']))
-
-                        try:
-                            self.new_hosts[host_name].services[service_name].notifications_disabled = not (
-                                int(s['status']['notificationsEnabled']))
-                        except:
-                            self.new_hosts[host_name].services[service_name].notifications_disabled = False
-
-                        try:
-                            self.new_hosts[host_name].services[service_name].flapping = (int(s['status']['isFlapping']))
-                        except:
-                            self.new_hosts[host_name].services[service_name].flapping = False
-
-                        if s['status']['acknowleged'] is None:
-                            self.new_hosts[host_name].services[service_name].acknowledged  = False
-                        else:
-                            if s['status']['acknowleged'] != 0:
-                                self.new_hosts[host_name].services[service_name].acknowledged = True
-
-                        try:
-                            if int(s['status']['scheduledDowntimeDepth']) != 0:
-                                self.new_hosts[host_name].services[service_name].scheduled_downtime = True
-                        except:
-                            self.new_hosts[host_name].services[service_name].scheduled_downtime = False
-
-                        try:
-                            self.new_hosts[host_name].services[service_name].status_type = 'soft' if int(s['status']['stateType']) == 0 else 'hard'
-                        except:
-                            self.new_hosts[host_name].services[service_name].status_type = 'hard'
-
-                        # extra duration needed for calculation
-                        if s['status']['lastStateChange'] is None:
-                            self.debug(server=self.get_name(), debug=time.strftime('%a %H:%M:%S')
-                                                                     + 'Service has wrong lastStateChange - host_name is ' + host_name + ' service_name is: ' + service_name)
-                        else:
-                            duration = datetime.datetime.now(
-                            ) - datetime.datetime.fromtimestamp(int(s['status']['lastStateChange']))
-                            self.new_hosts[host_name].services[service_name].duration = strfdelta(
-                                duration, '{days}d {hours}h {minutes}m {seconds}s')
-
-                    del s, host_name, service_name
-                del services
+            errors_occured = self._get_pages(self.cgiurl_services, self._process_service)
+            if errors_occured is not None:
+                return errors_occured
         except:
             import traceback
             traceback.print_exc(file=sys.stdout)
@@ -426,11 +189,291 @@ class Monitos4xServer(GenericServer):
             result, error = self.error(sys.exc_info())
             return Result(result=result, error=error)
 
-        del jsonraw, error, hosts
-
         # dummy return in case all is OK
         return Result()
 
+    @staticmethod
+    def _get_total(json_data):
+        """
+            Find total number of items in API response - None if the API does not tell
+            The monitos 4 API does not document where the total is reported, so these keys are
+            unverified guesses and _get_pages() does not rely on them for completeness
+        """
+        meta = json_data.get('meta')
+        if isinstance(meta, dict):
+            for key in ('total', 'count', 'totalCount'):
+                if isinstance(meta.get(key), int):
+                    return meta[key]
+        for key in ('total', 'count', 'totalCount'):
+            if isinstance(json_data.get(key), int):
+                return json_data[key]
+        return None
+
+    def _get_page(self, cgiurl, page):
+        """
+            Fetch one API page, gives back the decoded JSON or a Result in case of an error
+        """
+        result = self.fetch_url(cgiurl + '&page=' + str(page), giveback='raw', cgi_data=None)
+        return self._decode_page(result)
+
+    @staticmethod
+    def _decode_page(result):
+        """
+            Decode one API page, gives back the decoded JSON or a Result in case of an error
+        """
+        if result.error != '' or result.status_code >= 400:
+            return Result(result=result.result,
+                          error=result.error,
+                          status_code=result.status_code)
+        # purify JSON result
+        return json.loads(result.result.replace('\n', ''))
+
+    def _get_pages(self, cgiurl, process_item, check_authentication=False):
+        """
+            Retrieve all API pages of hosts or services and process their items as the pages arrive
+            The first page tells the total count so the remaining pages can be fetched concurrently
+        """
+        result = self.fetch_url(cgiurl + '&page=1', giveback='raw', cgi_data=None)
+
+        # authentication errors get a status code 200 too
+        if check_authentication and \
+                result.status_code < 400 and \
+                result.result.startswith('<'):
+            # in case of auth error reset HTTP session and try again
+            self.reset_http()
+            result = self.fetch_url(cgiurl + '&page=1', giveback='raw', cgi_data=None)
+
+            if result.status_code < 400 and \
+                    result.result.startswith('<'):
+                self.refresh_authentication = True
+                return Result(result=result.result,
+                              error='Authentication error',
+                              status_code=result.status_code)
+
+        data = self._decode_page(result)
+        if isinstance(data, Result):
+            return data
+        del result
+
+        if not data['data']:
+            return None
+
+        for item in data['data']:
+            process_item(dict(item))
+
+        total = self._get_total(data)
+        page_size = len(data['data'])
+        del data
+
+        page = 2
+        if total is not None:
+            # fetch all remaining pages at once
+            pages = -(-total // page_size)
+            if conf.debug_mode:
+                self.debug(server=self.get_name(), debug=time.strftime('%a %H:%M:%S') + ' fetching ' + str(pages - 1) + ' more pages')
+            urls_pages = [cgiurl + '&page=' + str(page) for page in range(2, pages + 1)]
+            last_page_size = page_size
+            for index, result in self.fetch_urls(urls_pages, giveback='raw'):
+                data = self._decode_page(result)
+                if isinstance(data, Result):
+                    return data
+                for item in data['data']:
+                    process_item(dict(item))
+                if index == len(urls_pages) - 1:
+                    last_page_size = len(data['data'])
+            # total is only a hint - only a last page shorter than the pages the server actually
+            # delivers means all items are there, the server might cap the limit below self.page_size
+            if last_page_size < page_size:
+                return None
+            page = pages + 1
+
+        # API does not tell the total count or there might be more - loop through pages until a short one comes
+        while True:
+            data = self._get_page(cgiurl, page)
+            if isinstance(data, Result):
+                return data
+            for item in data['data']:
+                process_item(dict(item))
+            if len(data['data']) < page_size:
+                break
+            page += 1
+
+        return None
+
+    def _process_host(self, h):
+        """
+            Create host object from one API item
+        """
+        # Skip if host is disabled
+        if h['syncEnabled'] is not None:
+            if not int(h['syncEnabled']):
+                return
+
+        # host
+        host_name = h['name']
+
+        if conf.debug_mode:
+            self.debug(server=self.get_name(), debug=time.strftime('%a %H:%M:%S') + ' host_name is: ' + host_name)
+
+        # If a host does not exist, create its object
+        if host_name not in self.new_hosts:
+            self.new_hosts[host_name] = GenericHost()
+            self.new_hosts[host_name].name = host_name
+            self.new_hosts[host_name].uuid = h['uuid']
+            self.new_hosts[host_name].server = 'monitos'
+
+            try:
+                self.new_hosts[host_name].status = self.STATES_MAPPING['hosts'][int(
+                    h['status']['currentState'])]
+            except:
+                pass
+
+            try:
+                self.new_hosts[host_name].last_check = datetime.datetime.fromtimestamp(
+                    int(h['status']['lastCheck']))
+            except:
+                pass
+
+            self.new_hosts[host_name].attempt = h['configuration']['maxCheckAttempts']
+
+            try:
+                self.new_hosts[host_name].status_information = BeautifulSoup(h['status']['output'].replace('\n', ' ').strip(), 'html.parser').text
+            except:
+                self.new_hosts[host_name].status_information = 'Cant parse output'
+
+            self.new_hosts[host_name].passiveonly = not (
+                int(h['status']['checksEnabled']))
+
+            try:
+                self.new_hosts[host_name].notifications_disabled = not (int(h['status']['notificationsEnabled']))
+            except:
+                self.new_hosts[host_name].notifications_disabled = False
+
+            try:
+                self.new_hosts[host_name].flapping = (int(h['status']['isFlapping']))
+            except:
+                self.new_hosts[host_name].flapping = False
+
+            if h['status']['acknowleged'] is None:
+                self.new_hosts[host_name].acknowledged = False
+            else:
+                if h['status']['acknowleged'] != 0:
+                    self.new_hosts[host_name].acknowledged = True
+
+            try:
+                if int(h['status']['scheduledDowntimeDepth']) != 0:
+                    self.new_hosts[host_name].scheduled_downtime = True
+            except:
+                self.new_hosts[host_name].scheduled_downtime = False
+
+            try:
+                self.new_hosts[host_name].status_type = 'soft' if int(h['status']['stateType']) == 0 else 'hard'
+            except:
+                self.new_hosts[host_name].status_type = 'hard'
+
+            # extra duration needed for calculation
+            if h['status']['lastStateChange'] is None:
+                self.debug(server=self.get_name(), debug=time.strftime('%a %H:%M:%S') + 'Host has wrong lastStateChange - host_name is: ' + host_name)
+            else:
+                duration = datetime.datetime.now(
+                ) - datetime.datetime.fromtimestamp(int(h['status']['lastStateChange']))
+                self.new_hosts[host_name].duration = strfdelta(
+                    duration, '{days}d {hours}h {minutes}m {seconds}s')
+
+
+    def _process_service(self, s):
+        """
+            Create service object from one API item
+        """
+        # Skip if host is disabled
+        if s['syncEnabled'] is not None:
+            if not int(s['syncEnabled']):
+                return
+
+        # host and service
+        host_name = s['configuration']['hostName']
+        service_name = s['configuration']['serviceDescription']
+
+        if conf.debug_mode:
+            self.debug(server=self.get_name(), debug=time.strftime('%a %H:%M:%S') + ' host_name is: ' + host_name + ' service_name is: ' + service_name)
+
+        # If host not in problem list, create it
+        if host_name not in self.new_hosts:
+            self.new_hosts[host_name] = GenericHost()
+            self.new_hosts[host_name].name = host_name
+            self.new_hosts[host_name].uuid = s['configuration']['host']['uuid']
+            self.new_hosts[host_name].status = self.STATES_MAPPING['services'][0]
+
+        # If a service does not exist, create its object
+        if service_name not in self.new_hosts[host_name].services:
+            self.new_hosts[host_name].services[service_name] = GenericService(
+            )
+            self.new_hosts[host_name].services[service_name].host = s['configuration']['hostName']
+            self.new_hosts[host_name].services[service_name].uuid = s['uuid']
+            self.new_hosts[host_name].services[service_name].name = service_name
+            self.new_hosts[host_name].services[service_name].server = 'monitos'
+
+            try:
+                self.new_hosts[host_name].services[service_name].status = self.STATES_MAPPING['services'][int(
+                    s['status']['currentState'])]
+            except:
+                pass
+
+            try:
+                self.new_hosts[host_name].services[service_name].last_check = datetime.datetime.fromtimestamp(
+                    int(s['status']['lastCheck']))
+            except:
+                pass
+
+            self.new_hosts[host_name].services[service_name].attempt = s['configuration']['maxCheckAttempts']
+
+            try:
+                self.new_hosts[host_name].services[service_name].status_information = BeautifulSoup(s['status']['output'].replace('\n', ' ').strip(), 'html.parser').text
+            except:
+                self.new_hosts[host_name].services[service_name].status_information = 'Cant parse output'
+
+            self.new_hosts[host_name].services[service_name].passiveonly = not (int(s['status']['checksEnabled']))
+
+            try:
+                self.new_hosts[host_name].services[service_name].notifications_disabled = not (
+                    int(s['status']['notificationsEnabled']))
+            except:
+                self.new_hosts[host_name].services[service_name].notifications_disabled = False
+
+            try:
+                self.new_hosts[host_name].services[service_name].flapping = (int(s['status']['isFlapping']))
+            except:
+                self.new_hosts[host_name].services[service_name].flapping = False
+
+            if s['status']['acknowleged'] is None:
+                self.new_hosts[host_name].services[service_name].acknowledged  = False
+            else:
+                if s['status']['acknowleged'] != 0:
+                    self.new_hosts[host_name].services[service_name].acknowledged = True
+
+            try:
+                if int(s['status']['scheduledDowntimeDepth']) != 0:
+                    self.new_hosts[host_name].services[service_name].scheduled_downtime = True
+            except:
+                self.new_hosts[host_name].services[service_name].scheduled_downtime = False
+
+            try:
+                self.new_hosts[host_name].services[service_name].status_type = 'soft' if int(s['status']['stateType']) == 0 else 'hard'
+            except:
+                self.new_hosts[host_name].services[service_name].status_type = 'hard'
+
+            # extra duration needed for calculation
+            if s['status']['lastStateChange'] is None:
+                self.debug(server=self.get_name(), debug=time.strftime('%a %H:%M:%S')
+                                                         + 'Service has wrong lastStateChange - host_name is ' + host_name + ' service_name is: ' + service_name)
+            else:
+                duration = datetime.datetime.now(
+                ) - datetime.datetime.fromtimestamp(int(s['status']['lastStateChange']))
+                self.new_hosts[host_name].services[service_name].duration = strfdelta(
+                    duration, '{days}d {hours}h {minutes}m {seconds}s')
+
+
+
     def _set_recheck(self, host, service):
         """
             Do a POST-Request to recheck the given host or service in monitos 4
@@ -446,9 +489,10 @@ class Monitos4xServer(GenericServer):
             uuid = self.hosts[host].services[service].uuid
 
         if self.use_autologin is True:
-            self.session.post('{0}/api/{1}/{2}/reschedule?authtoken={3}'.format(self.monitor_url, type_, uuid, self.autologin_key))
+            response = self.session.post('{0}/api/{1}/{2}/reschedule?authtoken={3}'.format(self.monitor_url, type_, uuid, self.autologin_key), timeout=self.timeout)
         else:
-            self.session.post('{0}/api/{1}/{2}/reschedule'.format(self.monitor_url, type_, uuid))
+            response = self.session.post('{0}/api/{1}/{2}/reschedule'.format(self.monitor_url, type_, uuid), timeout=self.timeout)
+        return Result(result=response.text, status_code=response.status_code)
 
     def _set_acknowledge(self, host, service, author, comment, sticky, notify, persistent, all_services=None):
         """
@@ -483,9 +527,10 @@ class Monitos4xServer(GenericServer):
                  'persistent': int(persistent), 'sticky': int(sticky)})
 
         if self.use_autologin is True:
-            self.session.post('{0}/api/{1}/{2}/acknowledge?authtoken={3}'.format(self.monitor_url, type_ ,uuid, self.autologin_key), data=form_data)
+            response = self.session.post('{0}/api/{1}/{2}/acknowledge?authtoken={3}'.format(self.monitor_url, type_ ,uuid, self.autologin_key), data=form_data, timeout=self.timeout)
         else:
-            self.session.post('{0}/api/{1}/{2}/acknowledge'.format(self.monitor_url, type_,uuid), data=form_data)
+            response = self.session.post('{0}/api/{1}/{2}/acknowledge'.format(self.monitor_url, type_,uuid), data=form_data, timeout=self.timeout)
+        return Result(result=response.text, status_code=response.status_code)
 
     def _set_submit_check_result(self, host, service, state, comment, check_output, performance_data):
         """
@@ -537,9 +582,10 @@ class Monitos4xServer(GenericServer):
                     {'exit_status': state_number, 'plugin_output': check_output, 'performance_data': performance_data})
 
         if self.use_autologin is True:
-            self.session.post('{0}/api/{1}/{2}/checkresult?authtoken={3}'.format(self.monitor_url, type_ ,uuid, self.autologin_key), data=form_data)
+            response = self.session.post('{0}/api/{1}/{2}/checkresult?authtoken={3}'.format(self.monitor_url, type_ ,uuid, self.autologin_key), data=form_data, timeout=self.timeout)
         else:
-            self.session.post('{0}/api/{1}/{2}/checkresult'.format(self.monitor_url, type_ ,uuid), data=form_data)
+            response = self.session.post('{0}/api/{1}/{2}/checkresult'.format(self.monitor_url, type_ ,uuid), data=form_data, timeout=self.timeout)
+        return Result(result=response.text, status_code=response.status_code)
 
     def _set_downtime(self, host, service, author, comment, fixed, start_time, end_time, hours, minutes):
         """
@@ -586,9 +632,10 @@ class Monitos4xServer(GenericServer):
                                     'id': uuid, 'duration': duration, 'type': type_})
 
         if self.use_autologin is True:
-            self.session.post('{0}/api/downtime?authtoken={1}'.format(self.monitor_url, self.autologin_key), data=form_data)
+            response = self.session.post('{0}/api/downtime?authtoken={1}'.format(self.monitor_url, self.autologin_key), data=form_data, timeout=self.timeout)
         else:
-            self.session.post('{0}/api/downtime'.format(self.monitor_url), data=form_data)
+            response = self.session.post('{0}/api/downtime'.format(self.monitor_url), data=form_data, timeout=self.timeout)
+        return Result(result=response.text, status_code=response.status_code)
 
     def get_start_end(self, host):
         """
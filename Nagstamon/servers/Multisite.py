@@ -22,7 +22,6 @@ from datetime import datetime
 import copy
 import html
 import json
-import socket
 import sys
 import urllib.request, urllib.parse, urllib.error
 import time
@@ -33,7 +32,8 @@ from Nagstamon.objects import (GenericHost,
                                GenericService,
                                Result)
 from Nagstamon.servers.Generic import GenericServer
-from Nagstamon.helpers import webbrowser_open
+from Nagstamon.helpers import (human_readable_duration_from_timestamp,
+                               webbrowser_open)
 from Nagstamon.config import conf
 
 
@@ -49,6 +49,29 @@ class MultisiteServer(GenericServer):
     """
     TYPE = 'Checkmk Multisite'
 
+    # view columns actually used - everything else in the view output is skipped while decoding
+    VIEW_HOST_COLUMNS = ['host', 'host_state', 'host_check_age', 'host_state_age', 'host_plugin_output',
+                         'host_attempt', 'sitename_plain', 'host_address', 'host_in_downtime',
+                         'host_acknowledged', 'host_notifications_enabled']
+    VIEW_SERVICE_COLUMNS = ['host', 'service_description', 'service_state', 'svc_check_age', 'svc_state_age',
+                            'svc_attempt', 'svc_plugin_output', 'svc_is_active', 'svc_check_command',
+                            'svc_flapping', 'sitename_plain', 'host_address', 'svc_in_downtime',
+                            'svc_acknowledged', 'svc_notifications_enabled', 'host_in_downtime']
+
+    # livestatus columns requested via REST API since Checkmk 2.3
+    REST_HOST_COLUMNS = ['name', 'state', 'has_been_checked', 'last_check', 'last_state_change', 'current_attempt',
+                         'max_check_attempts', 'state_type', 'plugin_output', 'address', 'scheduled_downtime_depth',
+                         'acknowledged', 'notifications_enabled']
+    REST_SERVICE_COLUMNS = ['host_name', 'description', 'state', 'has_been_checked', 'last_check',
+                            'last_state_change', 'current_attempt', 'max_check_attempts', 'state_type', 'plugin_output',
+                            'active_checks_enabled', 'check_command', 'is_flapping', 'host_address',
+                            'scheduled_downtime_depth', 'acknowledged', 'notifications_enabled',
+                            'host_scheduled_downtime_depth']
+    REST_HOST_STATES = {0: 'UP', 1: 'DOWN', 2: 'UNREACHABLE'}
+    REST_SERVICE_STATES = {0: 'OK', 1: 'WARNING', 2: 'CRITICAL', 3: 'UNKNOWN'}
+    # REST API status cannot honor custom views, so it is only used with the default ones
+    REST_DEFAULT_VIEWS = ('nagstamon_hosts', 'nagstamon_svc')
+
     # URLs for browser shortlinks/buttons on popup window
     BROWSER_URLS= { 'monitor': '$MONITOR$',
                     'hosts': '$MONITOR$/index.py?start_url=view.py?view_name=hostproblems',
@@ -68,6 +91,9 @@ class MultisiteServer(GenericServer):
         # flag for newer cookie authentication
         self.cookie_auth = False
 
+        # site name as reported by /version - REST API status rows do not contain it
+        self.central_site = ''
+
 
     def init_http(self):
         # general initialization
@@ -85,7 +111,7 @@ class MultisiteServer(GenericServer):
         # Prepare all urls needed by nagstamon if not yet done
         if len(self.urls) == len(self.statemap):
             self.urls = {
-              'api_services':    self.monitor_url + '/view.py?view_name={0}&output_format=python&lang=&limit=hard'.\
+              'api_services':    self.monitor_url + '/view.py?view_name={0}&output_format=json&lang=&limit=hard'.\
                                                                           format(self.checkmk_view_services),
               'human_services':  self.monitor_url + '/index.py?%s' % \
                                                    urllib.parse.urlencode({'start_url': 'view.py?view_name={0}'.\
@@ -93,7 +119,7 @@ class MultisiteServer(GenericServer):
               'human_service':   self.monitor_url + '/index.py?%s' %
                                                    urllib.parse.urlencode({'start_url': 'view.py?view_name=service'}),
 
-              'api_hosts':       self.monitor_url + '/view.py?view_name={0}&output_format=python&lang=&limit=hard'.\
+              'api_hosts':       self.monitor_url + '/view.py?view_name={0}&output_format=json&lang=&limit=hard'.\
                                                                           format(self.checkmk_view_hosts),
               'human_hosts':     self.monitor_url + '/index.py?%s' %
                                                    urllib.parse.urlencode({'start_url': 'view.py?view_name={0}'.\
@@ -113,8 +139,13 @@ class MultisiteServer(GenericServer):
                                                    urllib.parse.urlencode({'start_url': 'view.py?view_name=events'}),
               'omd_host_downtime': self.monitor_url + '/api/1.0/domain-types/downtime/collections/host',
               'omd_svc_downtime': self.monitor_url + '/api/1.0/domain-types/downtime/collections/service',
+              'omd_host_ack':    self.monitor_url + '/api/1.0/domain-types/acknowledge/collections/host',
+              'omd_svc_ack':     self.monitor_url + '/api/1.0/domain-types/acknowledge/collections/service',
               'recheck':         self.monitor_url + '/ajax_reschedule.py?_ajaxid=0',
               'omd_version':         self.monitor_url + '/api/1.0/version',
+              'rest_hosts':      self.monitor_url + '/api/1.0/domain-types/host/collections/all',
+              'rest_services':   self.monitor_url + '/api/1.0/domain-types/service/collections/all',
+              'rest_sites':      self.monitor_url + '/api/1.0/domain-types/site_connection/collections/all',
               'transid':         self.monitor_url + '/view.py?actions=yes&filled_in=actions&host=$HOST$&service=$SERVICE$&view_name=service'
             }
 
@@ -131,6 +162,9 @@ class MultisiteServer(GenericServer):
         if version >= [2, 3]:
             self._set_downtime = self._set_downtime_since_2_3
             self._set_recheck = self._set_recheck_since_2_3
+            self._set_acknowledge = self._set_acknowledge_since_2_3
+            if self._rest_status_usable():
+                self._get_status = self._get_status_since_2_3
 
         if self.authentication != 'web':
             if self.cookie_auth and not self.refresh_authentication:
@@ -218,7 +252,27 @@ class MultisiteServer(GenericServer):
             self.refresh_authentication = True
             return ''
 
-        return eval(content)
+        return self._decode_view(content)
+
+    @staticmethod
+    def _decode_view(content):
+        """
+        decode view.py output_format=json - a list of rows with the column names as first row
+        """
+        return json.loads(content)
+
+    @staticmethod
+    def _project_rows(response, columns):
+        """
+        turn decoded view rows into dicts only containing the needed columns
+        column indices are looked up once in the header row instead of zipping every complete row
+        """
+        if not response:
+            return
+        header = response[0]
+        indices = [(column, header.index(column)) for column in columns if column in header]
+        for row in response[1:]:
+            yield {column: row[index] for column, index in indices}
 
     def _get_cookie_login(self):
         """
@@ -269,8 +323,7 @@ class MultisiteServer(GenericServer):
                               error='Login failed',
                               status_code=401)
 
-            for row in response[1:]:
-                host= dict(list(zip(copy.deepcopy(response[0]), copy.deepcopy(row))))
+            for host in self._project_rows(response, self.VIEW_HOST_COLUMNS):
                 n = {
                     'host':               host['host'],
                     'status':             self.statemap.get(host['host_state'], host['host_state']),
@@ -295,6 +348,7 @@ class MultisiteServer(GenericServer):
                     self.new_hosts[new_host].status_information= html.unescape(n['status_information'].replace('\n', ' '))
                     self.new_hosts[new_host].site = n['site']
                     self.new_hosts[new_host].address = n['address']
+                    self.set_host_address(new_host, n['address'])
 
                     # transisition to Checkmk 1.1.10p2
                     if 'host_in_downtime' in host:
@@ -338,11 +392,11 @@ class MultisiteServer(GenericServer):
                 if e.terminate:
                     return e.result
                 else:
-                    response = copy.deepcopy(e.result.content)
-                    ret = copy.deepcopy(e.result)
+                    response = self._decode_view(e.result.result)
+                    ret = Result(error=e.result.error,
+                                 status_code=e.result.status_code)
 
-            for row in response[1:]:
-                service = dict(list(zip(copy.deepcopy(response[0]), copy.deepcopy(row))))
+            for service in self._project_rows(response, self.VIEW_SERVICE_COLUMNS):
                 n = {
                     'host':               service['host'],
                     'service':            service['service_description'],
@@ -366,6 +420,7 @@ class MultisiteServer(GenericServer):
                     self.new_hosts[n['host']].status = 'UP'
                     self.new_hosts[n['host']].site = n['site']
                     self.new_hosts[n['host']].address = n['address']
+                    self.set_host_address(n['host'], n['address'])
                 # if a service does not exist create its object
                 if n['service'] not in self.new_hosts[n['host']].services:
                     new_service = n['service']
@@ -424,6 +479,144 @@ class MultisiteServer(GenericServer):
         return ret
 
 
+    def _get_rest_headers(self):
+        """
+        headers required for Checkmk REST API
+        """
+        return {
+            "Authorization": f"Bearer {self.username} {self.password}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+
+    def _rest_status_usable(self):
+        """
+        REST API status rows contain neither custom view filters nor the site they come from,
+        so custom views and distributed setups stay with view.py
+        """
+        if (self.checkmk_view_hosts, self.checkmk_view_services) != self.REST_DEFAULT_VIEWS:
+            return False
+        try:
+            result = self.fetch_url(self.urls['rest_sites'], giveback='raw', headers=self._get_rest_headers())
+            if result.error or result.status_code >= 400:
+                return False
+            # only the central site is known - see self.central_site
+            return len(json.loads(result.result).get('value', [])) <= 1
+        except:
+            return False
+
+    def _get_rest_url(self, url, query, columns):
+        """
+        build REST API collection URL with livestatus query and only the needed columns
+        """
+        return url + '?' + urllib.parse.urlencode([('query', json.dumps(query))] +
+                                                  [('columns', column) for column in columns])
+
+    def _get_status_since_2_3(self):
+        """
+        Get status from Checkmk Server via REST API for Checkmk version 2.3+
+        only problem rows and needed columns are requested, hosts and services in parallel
+        """
+        host_query = {'op': '!=', 'left': 'state', 'right': '0'}
+        service_query = {'op': '!=', 'left': 'state', 'right': '0'}
+        if conf.filter_services_on_unreachable_hosts:
+            # equivalent of hst0/hst1 view filters
+            service_query = {'op': 'and', 'expr': [service_query,
+                                                   {'op': '!=', 'left': 'host_state', 'right': '2'}]}
+        urls = [self._get_rest_url(self.urls['rest_hosts'], host_query, self.REST_HOST_COLUMNS),
+                self._get_rest_url(self.urls['rest_services'], service_query, self.REST_SERVICE_COLUMNS)]
+
+        try:
+            responses = [None, None]
+            for index, result in self.fetch_urls(urls, giveback='raw', headers=self._get_rest_headers()):
+                errors_occured = self.check_for_error(result.result, result.error, result.status_code)
+                if errors_occured is not None:
+                    return errors_occured
+                responses[index] = json.loads(result.result)
+            hosts, services = responses
+
+            for item in hosts.get('value', []):
+                self._process_rest_host(item['extensions'])
+            for item in services.get('value', []):
+                self._process_rest_service(item['extensions'])
+
+        except:
+            import traceback
+            traceback.print_exc(file=sys.stdout)
+
+            self.isChecking = False
+            result, error = self.error(sys.exc_info())
+            return Result(result=result, error=error)
+
+        return Result()
+
+    def _rest_common(self, item, status):
+        """
+        details shared by hosts and services in REST API results
+        """
+        return {
+            'status': status if item['has_been_checked'] else 'PENDING',
+            'last_check': datetime.fromtimestamp(int(item['last_check'])).strftime('%Y-%m-%d %H:%M:%S'),
+            'duration': human_readable_duration_from_timestamp(item['last_state_change']),
+            'attempt': '{0}/{1}'.format(item['current_attempt'], item['max_check_attempts']),
+            'status_information': html.unescape(item['plugin_output'].replace('\n', ' ')).strip(),
+            'status_type': 'hard' if item['state_type'] else 'soft',
+        }
+
+    def _process_rest_host(self, item):
+        """
+        add host from REST API result to self.new_hosts
+        """
+        if item['name'] in self.new_hosts:
+            return
+        new_host = GenericHost()
+        new_host.name = item['name']
+        new_host.server = self.name
+        for attribute, value in self._rest_common(item, self.REST_HOST_STATES.get(item['state'])).items():
+            setattr(new_host, attribute, value)
+        new_host.site = self.central_site
+        new_host.address = item['address']
+        self.set_host_address(new_host.name, item['address'])
+        new_host.scheduled_downtime = item['scheduled_downtime_depth'] > 0
+        new_host.acknowledged = bool(item['acknowledged'])
+        new_host.notifications_disabled = not item['notifications_enabled']
+        self.new_hosts[new_host.name] = new_host
+
+    def _process_rest_service(self, item):
+        """
+        add service from REST API result to self.new_hosts
+        """
+        host = item['host_name']
+        # host objects contain service objects
+        if host not in self.new_hosts:
+            self.new_hosts[host] = GenericHost()
+            self.new_hosts[host].name = host
+            self.new_hosts[host].status = 'UP'
+            self.new_hosts[host].site = self.central_site
+            self.new_hosts[host].address = item['host_address']
+            self.set_host_address(host, item['host_address'])
+        if item['host_scheduled_downtime_depth'] > 0:
+            self.new_hosts[host].scheduled_downtime = True
+        if item['description'] in self.new_hosts[host].services:
+            return
+        new_service = GenericService()
+        new_service.host = host
+        new_service.server = self.name
+        new_service.name = item['description']
+        for attribute, value in self._rest_common(item, self.REST_SERVICE_STATES.get(item['state'])).items():
+            setattr(new_service, attribute, value)
+        # Checkmk passive services can be re-scheduled by using the Checkmk service
+        new_service.passiveonly = not item['active_checks_enabled'] and not item['check_command'].startswith('check_mk')
+        new_service.flapping = bool(item['is_flapping'])
+        new_service.site = self.central_site
+        new_service.address = item['host_address']
+        new_service.command = item['check_command']
+        new_service.scheduled_downtime = item['scheduled_downtime_depth'] > 0
+        new_service.acknowledged = bool(item['acknowledged'])
+        new_service.notifications_disabled = not item['notifications_enabled']
+        self.new_hosts[host].services[new_service.name] = new_service
+
+
     def open_monitor(self, host, service=''):
         """
         open monitor from treeview context menu
@@ -449,22 +642,17 @@ class MultisiteServer(GenericServer):
         if conf.connect_by_host == True or host == '':
             return Result(result=host)
 
-        ip = ''
-
         try:
+            # address comes with status data, cache helps if the host has vanished meanwhile
             if host in self.hosts:
                 ip = self.hosts[host].address
+            else:
+                ip = self.host_addresses.get(host, '')
 
             if conf.debug_mode:
                 self.debug(server=self.get_name(), host=host, debug ='IP of %s:' % (host) + ' ' + ip)
 
-            if conf.connect_by_dns:
-                try:
-                    address = socket.gethostbyaddr(ip)[0]
-                except:
-                    address = ip
-            else:
-                address = ip
+            address = self.resolve_address(ip)
         except:
             result, error = self.error(sys.exc_info())
             return Result(result=result, error=error)
@@ -500,7 +688,7 @@ class MultisiteServer(GenericServer):
             self.debug(server=self.get_name(), host=host, debug =f'Submitting action: {url} & {urllib.parse.urlencode(params)}')
 
         # apply action
-        self.fetch_url(url + '&' + urllib.parse.urlencode(params))
+        return self.fetch_url(url + '&' + urllib.parse.urlencode(params))
 
     def _set_downtime(self, host, service, author, comment, fixed, start_time, end_time, hours, minutes):
         try:
@@ -539,11 +727,13 @@ class MultisiteServer(GenericServer):
             # service needs extra parameter
             if service:
                 params['_do_confirm_service_downtime'] = 'Schedule+downtime+for+1+service'
-            self._action(self.hosts[host].site, host, service, params)
+            return self._action(self.hosts[host].site, host, service, params)
         except:
             if conf.debug_mode:
                 self.debug(server=self.get_name(), host=host,
                            debug='Invalid start/end date/time given')
+            result, error = self.error(sys.exc_info())
+            return Result(result=result, error=error)
 
 
     def _set_downtime_since_2_3(self, host, service, author, comment, fixed, start_time, end_time, hours, minutes):
@@ -552,11 +742,7 @@ class MultisiteServer(GenericServer):
         """
         try:
             # Headers required for Checkmk API
-            headers = {
-                "Authorization": f"Bearer {self.username} {self.password}",
-                "Content-Type": "application/json",
-                "Accept": "application/json",
-            }
+            headers = self._get_rest_headers()
 
             # Only timezone aware dates are allowed
             iso_start_time = datetime.strptime(start_time, "%Y-%m-%d %H:%M").replace(tzinfo=tzlocal.get_localzone()).isoformat()
@@ -579,11 +765,13 @@ class MultisiteServer(GenericServer):
                 url = self.urls['omd_svc_downtime']
                 params['downtime_type'] = 'service'
                 params['service_descriptions'] = [service]
-            result = self.fetch_url(url, headers=headers, cgi_data=json.dumps(params))
-        except Exception as error:
+            return self.fetch_url(url, headers=headers, cgi_data=json.dumps(params))
+        except Exception:
             if conf.debug_mode:
                 self.debug(server=self.get_name(), host=host,
                            debug='Invalid start/end date/time given')
+            result, error = self.error(sys.exc_info())
+            return Result(result=result, error=error)
 
 
     def _set_acknowledge(self, host, service, author, comment, sticky, notify, persistent, all_services=None):
@@ -594,12 +782,45 @@ class MultisiteServer(GenericServer):
             '_ack_persistent': persistent == 1 and 'on' or '',
             '_ack_comment':    author == self.username and comment or '%s: %s' % (author, comment)
         }
-        self._action(self.hosts[host].site, host, service, specific_params)
+        result = self._action(self.hosts[host].site, host, service, specific_params)
 
         # acknowledge all services on a host when told to do so
         if all_services:
             for s in all_services:
-                self._action(self.hosts[host].site, host, s, specific_params)
+                if self._action_failed(result):
+                    break
+                result = self._action(self.hosts[host].site, host, s, specific_params)
+        return result
+
+
+    def _set_acknowledge_since_2_3(self, host, service, author, comment, sticky, notify, persistent, all_services=None):
+        """
+        _set_acknowledge function for Checkmk version 2.3+
+        all services are acknowledged with one request filtered by a livestatus query
+        """
+        headers = self._get_rest_headers()
+        params = {
+            'sticky': bool(sticky),
+            'persistent': bool(persistent),
+            'notify': bool(notify),
+            'comment': author == self.username and comment or '%s: %s' % (author, comment),
+        }
+        result = Result()
+        if service == '':
+            result = self.fetch_url(self.urls['omd_host_ack'], headers=headers,
+                                    cgi_data=json.dumps(dict(params, acknowledge_type='host', host_name=host)))
+            if self._action_failed(result):
+                return result
+
+        services = ([service] if service else []) + [s for s in all_services or [] if s != service]
+        if services:
+            query = {'op': 'and', 'expr': [
+                {'op': '=', 'left': 'services.host_name', 'right': host},
+                {'op': 'or', 'expr': [{'op': '=', 'left': 'services.description', 'right': s}
+                                      for s in services]}]}
+            result = self.fetch_url(self.urls['omd_svc_ack'], headers=headers,
+                                    cgi_data=json.dumps(dict(params, acknowledge_type='service_by_query', query=query)))
+        return result
 
 
     def _set_recheck(self, host, service):
@@ -607,7 +828,7 @@ class MultisiteServer(GenericServer):
             '_resched_checks': 'Reschedule active checks',
             '_resched_spread':  '0'
         }
-        self._action(self.hosts[host].site, host, service, specific_params)
+        return self._action(self.hosts[host].site, host, service, specific_params)
 
 
     def _set_recheck_since_2_3(self, host, service):
@@ -622,7 +843,7 @@ class MultisiteServer(GenericServer):
             "wait_svc": service,
             "_csrf_token": csrf_token,
         }
-        result = self.fetch_url(self.urls["recheck"], cgi_data=data)
+        return self.fetch_url(self.urls["recheck"], cgi_data=data)
 
     def _get_transid(self, host, service):
         """
@@ -654,7 +875,9 @@ class MultisiteServer(GenericServer):
         """
         try:
             # need authentication to access /version api
-            version = [int(x) for x in self.fetch_url(self.urls['omd_version'], giveback='json').result['versions']['checkmk'].split('.')[:2]]
+            response = self.fetch_url(self.urls['omd_version'], giveback='json').result
+            version = [int(x) for x in response['versions']['checkmk'].split('.')[:2]]
+            self.central_site = response.get('site', '')
         # If /version api is not supported, return the lowest non-negative pair
         except:
             version = [0, 0]
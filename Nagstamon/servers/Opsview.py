@@ -133,7 +133,7 @@ class OpsviewServer(GenericServer):
         cgi_data = urllib.parse.urlencode(data)
 
         self.debug(server=self.get_name(), debug="Downtime url: " + url)
-        self.fetch_url(url + cgi_data, giveback="raw", cgi_data=({ }))
+        return self.fetch_url(url + cgi_data, giveback="raw", cgi_data=({ }))
 
 
     def _set_submit_check_result(self, host, service, state, comment, check_output, performance_data):
@@ -156,7 +156,7 @@ class OpsviewServer(GenericServer):
         cgi_data = urllib.parse.urlencode(data)
 
         self.debug(server=self.get_name(), debug="Submit result url: " + url)
-        self.fetch_url(url + cgi_data, giveback="raw", cgi_data=({ }))
+        return self.fetch_url(url + cgi_data, giveback="raw", cgi_data=({ }))
 
 
     def _set_acknowledge(self, host, service, author, comment, sticky, notify, persistent, all_services=None):
@@ -177,7 +177,7 @@ class OpsviewServer(GenericServer):
         cgi_data = urllib.parse.urlencode(data)
 
         self.debug(server=self.get_name(), debug="ACK url: " + url)
-        self.fetch_url(url + cgi_data, giveback="raw", cgi_data=({ }))
+        return self.fetch_url(url + cgi_data, giveback="raw", cgi_data=({ }))
 
 
     def _set_recheck(self, host, service):
@@ -195,7 +195,7 @@ class OpsviewServer(GenericServer):
         cgi_data = urllib.parse.urlencode(data)
 
         self.debug(server=self.get_name(), debug="Recheck url: " + url)
-        self.fetch_url(url + cgi_data, giveback="raw", cgi_data=({ }))
+        return self.fetch_url(url + cgi_data, giveback="raw", cgi_data=({ }))
 
 
     def _get_status(self):
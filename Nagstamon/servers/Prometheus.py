@@ -61,6 +61,7 @@ from Nagstamon.objects import (GenericHost,
                                Result)
 from Nagstamon.servers.Generic import GenericServer
 from Nagstamon.helpers import webbrowser_open
+from Nagstamon.servers.Alertmanager.helpers import compile_label_mapping
 
 
 class PrometheusService(GenericService):
@@ -169,6 +170,13 @@ class PrometheusServer(GenericServer):
                 self.debug(server=self.get_name(),
                            debug="Fetched JSON: " + pprint.pformat(data))
 
+            # mapping config split once per poll instead of once per alert
+            # Prometheus has no severity mapping, so its plan is cached apart from the Alertmanager one,
+            # only the split label lists are shared
+            label_plan = compile_label_mapping(self.map_to_hostname,
+                                               self.map_to_servicename,
+                                               self.map_to_status_information)
+
             for alert in data["data"]["alerts"]:
                 if conf.debug_mode:
                     self.debug(
@@ -183,17 +191,8 @@ class PrometheusServer(GenericServer):
                 if severity == "NONE":
                     continue
 
-                hostname = "unknown"
-                for host_label in self.map_to_hostname.split(','):
-                    if host_label in labels:
-                        hostname = labels.get(host_label)
-                        break
-
-                servicename = "unknown"
-                for service_label in self.map_to_servicename.split(','):
-                    if service_label in labels:
-                        servicename = labels.get(service_label)
-                        break
+                hostname = label_plan.hostname(labels)
+                servicename = label_plan.servicename(labels)
 
                 service = PrometheusService()
                 service.host = str(hostname)
@@ -205,12 +204,7 @@ class PrometheusServer(GenericServer):
                 service.duration = str(self._get_duration(alert["activeAt"]))
 
                 annotations = alert.get("annotations", {})
-                status_information = ""
-                for status_information_label in self.map_to_status_information.split(','):
-                    if status_information_label in annotations:
-                        status_information = annotations.get(status_information_label)
-                        break
-                service.status_information = status_information
+                service.status_information = label_plan.status_information(annotations)
 
                 if hostname not in self.new_hosts:
                     self.new_hosts[hostname] = GenericHost()
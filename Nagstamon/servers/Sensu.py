@@ -94,7 +94,8 @@ class SensuServer(GenericServer):
                 self.api_url,
                 username=self.username,
                 password=self.password,
-                verify=verify
+                verify=verify,
+                timing_hook=self.debug_request_timing
             )
         except SensuAPIException:
                 self.error(sys.exc_info())
@@ -175,7 +176,7 @@ class SensuServer(GenericServer):
             }
             self.sensu_api.post_silence_request(silenece_args)
         except SensuAPIException as e:
-            pass
+            return Result(error=str(e))
 
     @staticmethod
     def _format_client_subscription(client: str):
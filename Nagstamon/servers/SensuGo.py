@@ -1,5 +1,6 @@
 import sys
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from Nagstamon.servers.Generic import GenericServer
 from Nagstamon.objects import (GenericHost, GenericService, Result)
 from Nagstamon.config import conf
@@ -13,6 +14,9 @@ class SensuGoServer(GenericServer):
     TYPE = 'SensuGo'
     MENU_ACTIONS = ['Acknowledge']
 
+    # namespaces fetched at the same time
+    MAX_NAMESPACE_WORKERS = 8
+
     _authentication = 'basic'
     _api_url = ''
     _sensugo_api = None
@@ -43,7 +47,7 @@ class SensuGoServer(GenericServer):
 
     def _get_status(self):
         try:
-            response_code, events = self._sensugo_api.get_all_events()
+            events = self._get_problem_events()
             self._create_services(events)
         except Exception:
             result, error = self.error(sys.exc_info())
@@ -51,6 +55,31 @@ class SensuGoServer(GenericServer):
             return Result(result=result, error=error)
         return Result()
 
+    def _get_field_selector(self):
+        # OK events are never shown and silenced ones are shown as acknowledged
+        selectors = ['event.check.status != "0"']
+        if conf.filter_acknowledged_hosts_services:
+            selectors.append('event.check.is_silenced == false')
+        return ' && '.join(selectors)
+
+    def _get_problem_events(self):
+        field_selector = self._get_field_selector()
+        try:
+            namespaces = self._sensugo_api.get_namespaces()
+        except SensuGoAPIException:
+            # users without permission to list namespaces still get the events of all namespaces at once
+            namespaces = [None]
+        if not namespaces:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(len(namespaces), self.MAX_NAMESPACE_WORKERS)) as executor:
+            futures = [executor.submit(self._sensugo_api.get_events, namespace, self.page_size, field_selector)
+                       for namespace in namespaces]
+            events = []
+            for future in futures:
+                events.extend(future.result())
+        return events
+
     def _create_services(self, events):
         for event in events:
             service = self._parse_event_to_service(event)
@@ -24,7 +24,6 @@
 # Status/TODOs:
 #
 
-import copy
 import datetime
 import json
 import logging
@@ -97,6 +96,8 @@ class SnagViewServer(GenericServer):
         'services': '$MONITOR$',
         'history': '$MONITOR$/#/alert/ticker'
     }
+    # keys which might contain the total number of records in paged answers
+    TOTAL_KEYS = ('recordsFiltered', 'recordsTotal', 'total')
 
     def init_config(self):
         """
@@ -158,85 +159,54 @@ class SnagViewServer(GenericServer):
             form_data['downtime'] = 1
             form_data['inactiveHosts'] = 0
             form_data['disabledNotification'] = 1
-            form_data['limit_start'] = 0
-            # Get all hosts
-            form_data['limit_length'] = 99999
 
-            result = self.fetch_url(
-                self.cgiurl_hosts, giveback='raw', cgi_data=form_data)
-
-            # authentication errors get a status code 200 too
-            if result.status_code < 400 and \
-                    result.result.startswith('<'):
-                # in case of auth error reset HTTP session and try again
-                self.reset_http()
-                result = self.fetch_url(
-                    self.cgiurl_hosts, giveback='raw', cgi_data=form_data)
-
-                if result.status_code < 400 and \
-                        result.result.startswith('<'):
-                    self.refresh_authentication = True
-                    return Result(result=result.result,
-                                  error='Authentication error',
-                                  status_code=result.status_code)
-
-            # purify JSON result
-            jsonraw = copy.deepcopy(result.result.replace('\n', ''))
-            error = copy.deepcopy(result.error)
-            status_code = result.status_code
-
-            if error != '' or status_code >= 400:
-                return Result(result=jsonraw,
-                              error=error,
-                              status_code=status_code)
-
-            self.check_for_error(jsonraw, error, status_code)
-
-            hosts = json.loads(jsonraw)
-
-            for host in hosts['data']:
-                h = dict(host)
-
-                # Skip if Host is 'Pending'
-                if int(h['sv_host__nagios_status__current_state']) == 4:
-                    continue
-
-                # host
-                host_name = h['sv_host__nagios__host_name']
-
-                # If a host does not exist, create its object
-                if host_name not in self.new_hosts:
-                    self.new_hosts[host_name] = GenericHost()
-                    self.new_hosts[host_name].name = host_name
-                    self.new_hosts[host_name].svid = h['sv_host__svobjects____SVID']
-                    self.new_hosts[host_name].server = self.name
-                    self.new_hosts[host_name].status = self.STATES_MAPPING['hosts'][int(
-                        h['sv_host__nagios_status__current_state'] or 4)]
-                    self.new_hosts[host_name].last_check = datetime.datetime.fromtimestamp(
-                        int(h['sv_host__nagios_status__last_check']))
-                    self.new_hosts[host_name].attempt = h['sv_host__nagios__max_check_attempts']
-                    self.new_hosts[host_name].status_information = h['sv_host__nagios_status__plugin_output']
-                    self.new_hosts[host_name].passiveonly = not (
-                        bool(h['sv_host__nagios_status__checks_enabled'] or False))
-                    self.new_hosts[host_name].notifications_disabled = not (
-                        bool(h['sv_host__nagios_status__notifications_enabled'] or False))
-                    self.new_hosts[host_name].flapping = bool(
-                        h['sv_host__nagios_status__is_flapping'] or False)
-                    self.new_hosts[host_name].acknowledged = bool(
-                        h['sv_host__nagios_status__problem_has_been_acknowledged'] or False)
-                    self.new_hosts[host_name].scheduled_downtime = bool(
-                        h['sv_host__nagios_status__scheduled_downtime_depth'] or False)
-                    self.new_hosts[host_name].status_type = 'soft' if int(
-                        h['sv_host__nagios_status__state_type'] or 0) == 0 else 'hard'
-
-                    # extra duration needed for calculation
-                    duration = datetime.datetime.now(
-                    ) - datetime.datetime.fromtimestamp(int(h['sv_host__nagios_status__last_state_change']))
-
-                    self.new_hosts[host_name].duration = strfdelta(
-                        duration, '{days}d {hours}h {minutes}m {seconds}s')
-
-                del h, host_name
+            for hosts in self._get_pages(self.cgiurl_hosts, form_data):
+                if isinstance(hosts, Result):
+                    return hosts
+
+                for host in hosts:
+                    h = dict(host)
+
+                    # Skip if Host is 'Pending'
+                    if int(h['sv_host__nagios_status__current_state']) == 4:
+                        continue
+
+                    # host
+                    host_name = h['sv_host__nagios__host_name']
+
+                    # If a host does not exist, create its object
+                    if host_name not in self.new_hosts:
+                        self.new_hosts[host_name] = GenericHost()
+                        self.new_hosts[host_name].name = host_name
+                        self.new_hosts[host_name].svid = h['sv_host__svobjects____SVID']
+                        self.new_hosts[host_name].server = self.name
+                        self.new_hosts[host_name].status = self.STATES_MAPPING['hosts'][int(
+                            h['sv_host__nagios_status__current_state'] or 4)]
+                        self.new_hosts[host_name].last_check = datetime.datetime.fromtimestamp(
+                            int(h['sv_host__nagios_status__last_check']))
+                        self.new_hosts[host_name].attempt = h['sv_host__nagios__max_check_attempts']
+                        self.new_hosts[host_name].status_information = h['sv_host__nagios_status__plugin_output']
+                        self.new_hosts[host_name].passiveonly = not (
+                            bool(h['sv_host__nagios_status__checks_enabled'] or False))
+                        self.new_hosts[host_name].notifications_disabled = not (
+                            bool(h['sv_host__nagios_status__notifications_enabled'] or False))
+                        self.new_hosts[host_name].flapping = bool(
+                            h['sv_host__nagios_status__is_flapping'] or False)
+                        self.new_hosts[host_name].acknowledged = bool(
+                            h['sv_host__nagios_status__problem_has_been_acknowledged'] or False)
+                        self.new_hosts[host_name].scheduled_downtime = bool(
+                            h['sv_host__nagios_status__scheduled_downtime_depth'] or False)
+                        self.new_hosts[host_name].status_type = 'soft' if int(
+                            h['sv_host__nagios_status__state_type'] or 0) == 0 else 'hard'
+
+                        # extra duration needed for calculation
+                        duration = datetime.datetime.now(
+                        ) - datetime.datetime.fromtimestamp(int(h['sv_host__nagios_status__last_state_change']))
+
+                        self.new_hosts[host_name].duration = strfdelta(
+                            duration, '{days}d {hours}h {minutes}m {seconds}s')
+
+                    del h, host_name
         except:
             import traceback
             traceback.print_exc(file=sys.stdout)
@@ -254,83 +224,67 @@ class SnagViewServer(GenericServer):
             form_data['inactiveHosts'] = 0
             form_data['disabledNotification'] = 1
             form_data['softstate'] = 1
-            form_data['limit_start'] = 0
-            # Get all services
-            form_data['limit_length'] = 99999
-
-            result = self.fetch_url(self.cgiurl_services,
-                                    giveback='raw', cgi_data=form_data)
-
-            # purify JSON result
-            jsonraw = copy.deepcopy(result.result.replace('\n', ''))
-            error = copy.deepcopy(result.error)
-            status_code = result.status_code
-
-            if error != '' or status_code >= 400:
-                return Result(result=jsonraw,
-                              error=error,
-                              status_code=status_code)
-
-            self.check_for_error(jsonraw, error, status_code)
-
-            services = json.loads(jsonraw)
-
-            for service in services['data']:
-                s = dict(service)
-
-                # Skip if Host or Service is 'Pending'
-                if int(s['sv_service_status__nagios_status__current_state']) == 4 or int(
-                        s['sv_host__nagios_status__current_state']) == 4:
-                    continue
-
-                # host and service
-                host_name = s['sv_host__nagios__host_name']
-                service_name = s['sv_service_status__svobjects__rendered_label']
-
-                # If a service does not exist, create its object
-                if service_name not in self.new_hosts[host_name].services:
-                    self.new_hosts[host_name].services[service_name] = GenericService(
-                    )
-                    self.new_hosts[host_name].services[service_name].host = host_name
-                    self.new_hosts[host_name].services[service_name].svid = s[
-                        'sv_service_status__svobjects____SVID']
-                    self.new_hosts[host_name].services[service_name].name = service_name
-                    self.new_hosts[host_name].services[service_name].server = self.name
-                    self.new_hosts[host_name].services[service_name].status = self.STATES_MAPPING['services'][int(
-                        s['sv_service_status__nagios_status__current_state'] or 4)]
-                    self.new_hosts[host_name].services[service_name].last_check = datetime.datetime.fromtimestamp(
-                        int(s['sv_service_status__nagios_status__last_check']))
-                    self.new_hosts[host_name].services[service_name].attempt = s[
-                        'sv_service_status__nagios__max_check_attempts']
-                    self.new_hosts[host_name].services[service_name].status_information = BeautifulSoup(
-                        s['sv_service_status__nagios_status__plugin_output'].replace(
-                            '\n', ' ').strip(),
-                        'html.parser').text
-                    self.new_hosts[host_name].services[service_name].passiveonly = not (
-                        bool(s['sv_service_status__nagios_status__checks_enabled'] or False))
-                    self.new_hosts[host_name].services[service_name].notifications_disabled = not (
-                        bool(s['sv_service_status__nagios_status__notifications_enabled'] or False))
-                    self.new_hosts[host_name].services[service_name].flapping = bool(
-                        s['sv_service_status__nagios_status__is_flapping'] or False)
-                    self.new_hosts[host_name].services[service_name].acknowledged = bool(
-                        s['sv_service_status__nagios_status__problem_has_been_acknowledged'] or False)
-                    self.new_hosts[host_name].services[service_name].scheduled_downtime = bool(
-                        s['sv_service_status__nagios_status__scheduled_downtime_depth'] or False)
-                    self.new_hosts[host_name].services[service_name].status_type = 'soft' if int(
-                        s['sv_service_status__nagios_status__state_type'] or 0) == 0 else 'hard'
-
-                    # acknowledge needs service_description and no display name
-                    self.new_hosts[host_name].services[service_name].real_name = s[
-                        'sv_service_status__nagios__service_description']
-
-                    # extra duration needed for calculation
-                    duration = datetime.datetime.now(
-                    ) - datetime.datetime.fromtimestamp(
-                        int(s['sv_service_status__nagios_status__last_state_change']))
-                    self.new_hosts[host_name].services[service_name].duration = strfdelta(
-                        duration, '{days}d {hours}h {minutes}m {seconds}s')
-
-                del s, host_name, service_name
+
+            for services in self._get_pages(self.cgiurl_services, form_data):
+                if isinstance(services, Result):
+                    return services
+
+                for service in services:
+                    s = dict(service)
+
+                    # Skip if Host or Service is 'Pending'
+                    if int(s['sv_service_status__nagios_status__current_state']) == 4 or int(
+                            s['sv_host__nagios_status__current_state']) == 4:
+                        continue
+
+                    # host and service
+                    host_name = s['sv_host__nagios__host_name']
+                    service_name = s['sv_service_status__svobjects__rendered_label']
+
+                    # If a service does not exist, create its object
+                    if service_name not in self.new_hosts[host_name].services:
+                        self.new_hosts[host_name].services[service_name] = GenericService(
+                        )
+                        self.new_hosts[host_name].services[service_name].host = host_name
+                        self.new_hosts[host_name].services[service_name].svid = s[
+                            'sv_service_status__svobjects____SVID']
+                        self.new_hosts[host_name].services[service_name].name = service_name
+                        self.new_hosts[host_name].services[service_name].server = self.name
+                        self.new_hosts[host_name].services[service_name].status = self.STATES_MAPPING['services'][int(
+                            s['sv_service_status__nagios_status__current_state'] or 4)]
+                        self.new_hosts[host_name].services[service_name].last_check = datetime.datetime.fromtimestamp(
+                            int(s['sv_service_status__nagios_status__last_check']))
+                        self.new_hosts[host_name].services[service_name].attempt = s[
+                            'sv_service_status__nagios__max_check_attempts']
+                        self.new_hosts[host_name].services[service_name].status_information = BeautifulSoup(
+                            s['sv_service_status__nagios_status__plugin_output'].replace(
+                                '\n', ' ').strip(),
+                            'html.parser').text
+                        self.new_hosts[host_name].services[service_name].passiveonly = not (
+                            bool(s['sv_service_status__nagios_status__checks_enabled'] or False))
+                        self.new_hosts[host_name].services[service_name].notifications_disabled = not (
+                            bool(s['sv_service_status__nagios_status__notifications_enabled'] or False))
+                        self.new_hosts[host_name].services[service_name].flapping = bool(
+                            s['sv_service_status__nagios_status__is_flapping'] or False)
+                        self.new_hosts[host_name].services[service_name].acknowledged = bool(
+                            s['sv_service_status__nagios_status__problem_has_been_acknowledged'] or False)
+                        self.new_hosts[host_name].services[service_name].scheduled_downtime = bool(
+                            s['sv_service_status__nagios_status__scheduled_downtime_depth'] or False)
+                        self.new_hosts[host_name].services[service_name].status_type = 'soft' if int(
+                            s['sv_service_status__nagios_status__state_type'] or 0) == 0 else 'hard'
+
+                        # acknowledge needs service_description and no display name
+                        self.new_hosts[host_name].services[service_name].real_name = s[
+                            'sv_service_status__nagios__service_description']
+
+                        # extra duration needed for calculation
+                        duration = datetime.datetime.now(
+                        ) - datetime.datetime.fromtimestamp(
+                            int(s['sv_service_status__nagios_status__last_state_change']))
+                        self.new_hosts[host_name].services[service_name].duration = strfdelta(
+                            duration, '{days}d {hours}h {minutes}m {seconds}s')
+
+                    del s, host_name, service_name
         except:
             import traceback
             traceback.print_exc(file=sys.stdout)
@@ -340,11 +294,90 @@ class SnagViewServer(GenericServer):
             result, error = self.error(sys.exc_info())
             return Result(result=result, error=error)
 
-        del jsonraw, error, hosts
-
         # dummy return in case all is OK
         return Result()
 
+    def _get_pages(self, url, form_data):
+        """
+            yields the records of url page by page - the first page tells the total number of records
+            and the remaining pages are fetched concurrently and yielded as soon as they arrive
+            yields a Result instead if something went wrong
+        """
+        page = self._fetch_page(url, form_data, 0)
+        if isinstance(page, Result):
+            yield page
+            return
+        yield page['data']
+
+        total = self._get_total(page)
+        if total is None:
+            # no total known - continue as long as pages are full
+            start = 0
+            while len(page['data']) >= self.page_size:
+                start += self.page_size
+                page = self._fetch_page(url, form_data, start)
+                if isinstance(page, Result):
+                    yield page
+                    return
+                yield page['data']
+            return
+
+        items = [(url, dict(form_data, limit_start=start, limit_length=self.page_size))
+                 for start in range(self.page_size, total, self.page_size)]
+        for index, result in self.fetch_urls(items, giveback='raw'):
+            page = self._decode_page(result)
+            if isinstance(page, Result):
+                yield page
+                return
+            yield page['data']
+
+    def _fetch_page(self, url, form_data, start):
+        """
+            fetch and decode one page, renewing the session once if authentication got lost
+        """
+        page_data = dict(form_data, limit_start=start, limit_length=self.page_size)
+        result = self.fetch_url(url, giveback='raw', cgi_data=page_data)
+
+        # authentication errors get a status code 200 too
+        if result.status_code < 400 and \
+                result.result.startswith('<'):
+            # in case of auth error reset HTTP session and try again
+            self.reset_http()
+            result = self.fetch_url(url, giveback='raw', cgi_data=page_data)
+
+            if result.status_code < 400 and \
+                    result.result.startswith('<'):
+                self.refresh_authentication = True
+                return Result(result=result.result,
+                              error='Authentication error',
+                              status_code=result.status_code)
+
+        return self._decode_page(result)
+
+    @staticmethod
+    def _decode_page(result):
+        """
+            decoded JSON page or Result in case of an error
+        """
+        # purify JSON result
+        jsonraw = result.result.replace('\n', '')
+
+        if result.error != '' or result.status_code >= 400:
+            return Result(result=jsonraw,
+                          error=result.error,
+                          status_code=result.status_code)
+
+        return json.loads(jsonraw)
+
+    def _get_total(self, page):
+        """
+            total number of records if the answer contains it
+        """
+        for key in self.TOTAL_KEYS:
+            if key in page:
+                return int(page[key])
+        return None
+
     def _set_recheck(self, host, service):
         """
             Do a POST-Request to recheck the given host or service in SNAG-View 3
@@ -363,8 +396,9 @@ class SnagViewServer(GenericServer):
                 {'__SVID': self.hosts[host].services[service].svid})
             form_data['commandType'] = 'sv_service_status'
 
-        self.session.post(
-            '{0}/rest/private/nagios/command/execute'.format(self.monitor_url), data=form_data)
+        response = self.session.post(
+            '{0}/rest/private/nagios/command/execute'.format(self.monitor_url), data=form_data, timeout=self.timeout)
+        return Result(result=response.text, status_code=response.status_code)
 
     def _set_acknowledge(self, host, service, author, comment, sticky, notify, persistent, all_services=None):
         """
@@ -400,8 +434,9 @@ class SnagViewServer(GenericServer):
                 {'__SVID': self.hosts[host].services[service].svid, 'comment': comment, 'notify': notify,
                  'persistent': persistent, 'sticky': sticky})
 
-        self.session.post(
-            '{0}/rest/private/nagios/command/execute'.format(self.monitor_url), data=form_data)
+        response = self.session.post(
+            '{0}/rest/private/nagios/command/execute'.format(self.monitor_url), data=form_data, timeout=self.timeout)
+        return Result(result=response.text, status_code=response.status_code)
 
     def _set_submit_check_result(self, host, service, state, comment, check_output, performance_data):
         """
@@ -457,8 +492,9 @@ class SnagViewServer(GenericServer):
                     {'__SVID': self.hosts[host].services[service].svid, 'status_code': state_number,
                      'plugin_output': check_output + ' | ' + performance_data})
 
-        self.session.post(
-            '{0}/rest/private/nagios/command/execute'.format(self.monitor_url), data=form_data)
+        response = self.session.post(
+            '{0}/rest/private/nagios/command/execute'.format(self.monitor_url), data=form_data, timeout=self.timeout)
+        return Result(result=response.text, status_code=response.status_code)
 
     def _set_downtime(self, host, service, author, comment, fixed, start_time, end_time, hours, minutes):
         """
@@ -497,8 +533,9 @@ class SnagViewServer(GenericServer):
         form_data['end'] = end_time
         form_data['comment'] = comment
 
-        self.session.put(
-            '{0}/rest/private/nagios/downtime'.format(self.monitor_url), data=form_data)
+        response = self.session.put(
+            '{0}/rest/private/nagios/downtime'.format(self.monitor_url), data=form_data, timeout=self.timeout)
+        return Result(result=response.text, status_code=response.status_code)
 
     def get_start_end(self, host):
         """
@@ -19,12 +19,14 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 from Nagstamon.servers.Generic import GenericServer
 from Nagstamon.config import conf
 import sys
 import json
 import datetime
 import copy
+import re
 import urllib.parse
 
 from Nagstamon.helpers import human_readable_duration_from_timestamp
@@ -63,10 +65,49 @@ class ThrukServer(GenericServer):
     STATES_MAPPING = {"hosts" : {0 : "OK", 1 : "DOWN", 2 : "UNREACHABLE"}, \
                       "services" : {0 : "OK", 1 : "WARNING", 2 : "CRITICAL", 3 : "UNKNOWN"}}
 
+    # status.cgi hostprops/serviceprops bits used to push filters down to Thruk
+    # see http://www.nagios-wiki.de/nagios/tips/host-_und_serviceproperties_fuer_status.cgi
+    PROPS_IN_DOWNTIME = 1
+    PROPS_NO_DOWNTIME = 2
+    PROPS_ACKNOWLEDGED = 4
+    PROPS_NOT_ACKNOWLEDGED = 8
+    PROPS_CHECKS_ENABLED = 32
+    PROPS_NOT_FLAPPING = 2048
+    PROPS_NOTIFICATIONS_DISABLED = 4096
+    PROPS_NOTIFICATIONS_ENABLED = 8192
+    PROPS_HARD_STATE = 262144
+    PROPS_SOFT_STATE = 524288
+    PROPS_OPPOSITES = {PROPS_IN_DOWNTIME: PROPS_NO_DOWNTIME,
+                       PROPS_ACKNOWLEDGED: PROPS_NOT_ACKNOWLEDGED,
+                       PROPS_NOTIFICATIONS_DISABLED: PROPS_NOTIFICATIONS_ENABLED,
+                       PROPS_SOFT_STATE: PROPS_HARD_STATE}
+    # additional host filter sets to get flags of hosts which are up but matter for their services
+    HOST_EXTRA_PROPS = [PROPS_IN_DOWNTIME, PROPS_ACKNOWLEDGED, PROPS_SOFT_STATE, PROPS_NOTIFICATIONS_DISABLED]
+
+    # upper limit of parallel requests in REST API mode
+    MAX_BACKEND_WORKERS = 32
+
+    # columns requested from REST API
+    REST_HOST_COLUMNS = 'name,state,last_check,last_state_change,plugin_output,current_attempt,max_check_attempts,'\
+                        'active_checks_enabled,notifications_enabled,is_flapping,acknowledged,scheduled_downtime_depth,'\
+                        'state_type'
+    REST_SERVICE_COLUMNS = 'host_name,description,state,last_check,last_state_change,plugin_output,current_attempt,'\
+                           'max_check_attempts,active_checks_enabled,is_flapping,notifications_enabled,acknowledged,'\
+                           'state_type,scheduled_downtime_depth,display_name'
+
+    # only regular expressions which mean the same for Python and Thruk are pushed down
+    SIMPLE_REGEX = re.compile(r'[\w .,:/|^$*+?()\[\]-]*')
+
+    # cmd.cgi quick command for selected hosts and services as used by the status page
+    QUICK_COMMAND_ACKNOWLEDGE = '4'
+
 
     def __init__(self, **kwds):
         GenericServer.__init__(self, **kwds)
 
+        # last complete answer of every backend in REST API mode, used if a backend is too slow
+        self.backend_cache = dict()
+
 
     def init_http(self):
         """
@@ -92,7 +133,11 @@ class ThrukServer(GenericServer):
         # create filters like described in
         # http://www.nagios-wiki.de/nagios/tips/host-_und_serviceproperties_fuer_status.cgi?s=servicestatustypes
         # Thruk allows requesting only needed information to reduce traffic
-        self.cgiurl_services = self.monitor_cgi_url + "/status.cgi?host=all&servicestatustypes=28&view_mode=json&"\
+        # REST API lives next to cgi-bin
+        self.rest_url = self.monitor_cgi_url.rstrip('/').rsplit('/cgi-bin', 1)[0] + '/r'
+
+        # filters are added with every poll by _get_host_filter() and _get_service_filter()
+        self.cgiurl_services = self.monitor_cgi_url + "/status.cgi?host=all&view_mode=json&"\
                                                       "entries=all&columns=host_name,description,state,last_check,"\
                                                       "last_state_change,plugin_output,current_attempt,"\
                                                       "max_check_attempts,active_checks_enabled,is_flapping,"\
@@ -100,13 +145,117 @@ class ThrukServer(GenericServer):
                                                       "scheduled_downtime_depth,host_display_name,display_name"
         # hosts (up or down or unreachable)
         self.cgiurl_hosts = self.monitor_cgi_url + "/status.cgi?hostgroup=all&style=hostdetail&"\
-                                                    "dfl_s0_hoststatustypes=12&dfl_s1_hostprops=1&dfl_s2_hostprops=4&dfl_s3_hostprops=524288&&dfl_s4_hostprops=4096&dfl_s5_hostprop=16&"\
                                                     "view_mode=json&entries=all&"\
                                                     "columns=name,state,last_check,last_state_change,"\
                                                     "plugin_output,current_attempt,max_check_attempts,"\
                                                     "active_checks_enabled,notifications_enabled,is_flapping,"\
                                                     "acknowledged,scheduled_downtime_depth,state_type,host_display_name,display_name"
 
+    def _get_regex_filters(self, with_service):
+        """
+            host and service regular expression filters as Thruk text filters
+            only the 'show matching' direction is pushed down because Thruk matches case-insensitive
+            and thus might return more but never less than the local filter would show
+        """
+        filters = []
+        if conf.re_host_enabled and conf.re_host_reverse and self.SIMPLE_REGEX.fullmatch(conf.re_host_pattern):
+            filters.append(('host', conf.re_host_pattern))
+        # Thruk matches the real service description, not the display name
+        if with_service and not self.use_display_name_service and \
+                conf.re_service_enabled and conf.re_service_reverse and \
+                self.SIMPLE_REGEX.fullmatch(conf.re_service_pattern):
+            filters.append(('service', conf.re_service_pattern))
+        return filters
+
+    def _get_filter_props(self, flapping, soft_state):
+        """
+            translate filters shared by hosts and services into a status.cgi properties bitmask
+        """
+        props = 0
+        if conf.filter_acknowledged_hosts_services:
+            props |= self.PROPS_NOT_ACKNOWLEDGED
+        if conf.filter_hosts_services_maintenance:
+            props |= self.PROPS_NO_DOWNTIME
+        if conf.filter_hosts_services_disabled_notifications:
+            props |= self.PROPS_NOTIFICATIONS_ENABLED
+        if conf.filter_hosts_services_disabled_checks:
+            props |= self.PROPS_CHECKS_ENABLED
+        if flapping:
+            props |= self.PROPS_NOT_FLAPPING
+        if soft_state:
+            props |= self.PROPS_HARD_STATE
+        return props
+
+    @staticmethod
+    def _encode_filter_sets(filter_sets):
+        """
+            encode list of (parameters, text filters) as dfl_s<n>_* arguments - sets are ORed by Thruk,
+            everything inside a set is ANDed
+        """
+        arguments = []
+        for number, (parameters, text_filters) in enumerate(filter_sets):
+            prefix = 'dfl_s{0}_'.format(number)
+            arguments += [(prefix + key, value) for key, value in parameters.items()]
+            for filter_type, value in text_filters:
+                arguments += [(prefix + 'type', filter_type), (prefix + 'op', '~'), (prefix + 'value', value)]
+        return urllib.parse.urlencode(arguments)
+
+    def _get_host_filter(self):
+        """
+            push active host filters down to Thruk to avoid transferring hosts which would be hidden anyway
+            local filtering in GenericServer.get_status() stays authoritative
+        """
+        hoststatustypes = 12
+        if conf.filter_all_down_hosts:
+            hoststatustypes &= ~4
+        if conf.filter_all_unreachable_hosts:
+            hoststatustypes &= ~8
+        # 0 would mean all hosts for status.cgi - leave it to the local filters
+        if hoststatustypes == 0:
+            hoststatustypes = 12
+        props = self._get_filter_props(conf.filter_all_flapping_hosts, conf.filter_hosts_in_soft_state)
+        text_filters = self._get_regex_filters(with_service=False)
+
+        filter_sets = [({'hoststatustypes': hoststatustypes, 'hostprops': props}, text_filters)]
+        # hosts which are up but have flags relevant for the services filters - unless they are excluded anyway
+        for extra_props in self.HOST_EXTRA_PROPS:
+            if not props & self.PROPS_OPPOSITES[extra_props]:
+                filter_sets.append(({'hostprops': props | extra_props}, text_filters))
+        return self._encode_filter_sets(filter_sets)
+
+    def _get_service_filter(self):
+        """
+            push active service filters down to Thruk to avoid transferring services which would be hidden anyway
+            local filtering in GenericServer.get_status() stays authoritative
+        """
+        servicestatustypes = 28
+        if conf.filter_all_warning_services:
+            servicestatustypes &= ~4
+        if conf.filter_all_unknown_services:
+            servicestatustypes &= ~8
+        if conf.filter_all_critical_services:
+            servicestatustypes &= ~16
+        # 0 would mean all services for status.cgi - leave it to the local filters
+        if servicestatustypes == 0:
+            servicestatustypes = 28
+        hoststatustypes = 15
+        if conf.filter_services_on_down_hosts:
+            hoststatustypes &= ~4
+        if conf.filter_services_on_unreachable_hosts:
+            hoststatustypes &= ~8
+        hostprops = 0
+        if conf.filter_services_on_acknowledged_hosts:
+            hostprops |= self.PROPS_NOT_ACKNOWLEDGED
+        if conf.filter_services_on_hosts_in_maintenance:
+            hostprops |= self.PROPS_NO_DOWNTIME
+        props = self._get_filter_props(conf.filter_all_flapping_services, conf.filter_services_in_soft_state)
+
+        return self._encode_filter_sets([({'servicestatustypes': servicestatustypes,
+                                           'serviceprops': props,
+                                           'hoststatustypes': hoststatustypes,
+                                           'hostprops': hostprops},
+                                          self._get_regex_filters(with_service=True))])
+
     def login(self):
         """
             use pure session instead of fetch_url to get Thruk session
@@ -190,14 +339,37 @@ class ThrukServer(GenericServer):
         if sticky is True:
             cgi_data['sticky_ack'] = 'on'
 
-        self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+        result = self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+        if self._action_failed(result):
+            return result
 
-        # acknowledge all services on a host
-        if all_services:
-            for s in all_services:
-                cgi_data['cmd_typ'] = '34'
-                cgi_data['service'] = self.hosts[host].services[ s ].real_name
-                self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+        services = [self.hosts[host].services[s].real_name for s in all_services or [] if s != service]
+        # names containing the separators of selected_services have to be acknowledged one by one
+        single_services = [s for s in services if ',' in host + s or ';' in host + s]
+        for s in single_services:
+            cgi_data['cmd_typ'] = '34'
+            cgi_data['service'] = s
+            result = self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+            if self._action_failed(result):
+                return result
+
+        # acknowledge all other services on a host at once with a quick command like the status page does
+        services = [s for s in services if s not in single_services]
+        if services:
+            cgi_data = OrderedDict()
+            cgi_data['quick_command'] = self.QUICK_COMMAND_ACKNOWLEDGE
+            cgi_data['selected_hosts'] = ''
+            cgi_data['selected_services'] = ','.join('{0};{1}'.format(host, s) for s in services)
+            cgi_data['com_author'] = author
+            cgi_data['com_data'] = comment
+            if notify is True:
+                cgi_data['send_notification'] = 'on'
+            if persistent is True:
+                cgi_data['persistent_ack'] = 'on'
+            if sticky is True:
+                cgi_data['sticky_ack'] = 'on'
+            result = self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+        return result
 
     def _set_recheck(self, host, service):
         self.session.headers.update({'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'})
@@ -210,6 +382,8 @@ class ThrukServer(GenericServer):
             # get start time from Nagios as HTML to use same timezone setting like the locally installed Nagios
             result = self.fetch_url(
                 self.monitor_cgi_url + '/cmd.cgi?' + urllib.parse.urlencode({'cmd_typ': '96', 'host': host}))
+            if result.error != '':
+                return result
             self.start_time = dict(result.result.find(attrs={'name': 'start_time'}).attrs)['value']
             # decision about host or service - they have different URLs
             if service == '':
@@ -229,9 +403,11 @@ class ThrukServer(GenericServer):
                                                ('force_check', 'on'),
                                                ('btnSubmit', 'Commit')])
             # execute POST request
-            self.fetch_url(self.monitor_cgi_url + '/cmd.cgi', giveback='raw', cgi_data=cgi_data)
+            return self.fetch_url(self.monitor_cgi_url + '/cmd.cgi', giveback='raw', cgi_data=cgi_data)
         except:
             traceback.print_exc(file=sys.stdout)
+            result, error = self.error(sys.exc_info())
+            return Result(result=result, error=error)
 
     def _set_downtime(self, host, service, author, comment, fixed, start_time, end_time, hours, minutes):
         '''
@@ -261,7 +437,7 @@ class ThrukServer(GenericServer):
         cgi_data['btnSubmit'] = 'Commit'
 
         # running remote cgi command
-        self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
+        return self.fetch_url(url, giveback='raw', cgi_data=cgi_data)
 
     def _get_status(self):
         """
@@ -270,12 +446,15 @@ class ThrukServer(GenericServer):
         # new_hosts dictionary
         self.new_hosts = dict()
 
+        if self.use_rest_api:
+            return self._get_status_rest_api()
+
         # hosts - mostly the down ones
         # unfortunately the hosts status page has a different structure so
         # hosts must be analyzed separately
         try:
             # JSON experiments
-            result = self.fetch_url(self.cgiurl_hosts, giveback='raw')
+            result = self.fetch_url(self.cgiurl_hosts + '&' + self._get_host_filter(), giveback='raw')
             jsonraw, error, status_code = copy.deepcopy(result.result),\
                                           copy.deepcopy(result.error),\
                                           result.status_code
@@ -293,25 +472,8 @@ class ThrukServer(GenericServer):
 
             # in case JSON is not empty evaluate it
             elif not jsonraw == "[]":
-                hosts = json.loads(jsonraw)
-
-                for h in hosts:
-                    if h["name"] not in self.new_hosts:
-                        self.new_hosts[h["name"]] = GenericHost()
-                        self.new_hosts[h["name"]].name = h["name"]
-                        self.new_hosts[h["name"]].server = self.name
-                        self.new_hosts[h["name"]].status = self.STATES_MAPPING["hosts"][h["state"]]
-                        self.new_hosts[h["name"]].last_check = datetime.datetime.fromtimestamp(int(h["last_check"])).isoformat(" ")
-                        self.new_hosts[h["name"]].duration = human_readable_duration_from_timestamp(h["last_state_change"])
-                        self.new_hosts[h["name"]].attempt = "%s/%s" % (h["current_attempt"], h["max_check_attempts"])
-                        self.new_hosts[h["name"]].status_information = h["plugin_output"].replace("\n", " ").strip()
-                        self.new_hosts[h["name"]].passiveonly = not(bool(int(h["active_checks_enabled"])))
-                        self.new_hosts[h["name"]].notifications_disabled = not(bool(int(h["notifications_enabled"])))
-                        self.new_hosts[h["name"]].flapping = bool(int(h["is_flapping"]))
-                        self.new_hosts[h["name"]].acknowledged = bool(int(h["acknowledged"]))
-                        self.new_hosts[h["name"]].scheduled_downtime = bool(int(h["scheduled_downtime_depth"]))
-                        self.new_hosts[h["name"]].status_type = {0: "soft", 1: "hard"}[h["state_type"]]
-                    del h
+                for h in json.loads(jsonraw):
+                    self._process_host(h)
         except:
             import traceback
             traceback.print_exc(file=sys.stdout)
@@ -323,7 +485,7 @@ class ThrukServer(GenericServer):
         # services
         try:
             # JSON experiments
-            result = self.fetch_url(self.cgiurl_services, giveback="raw")
+            result = self.fetch_url(self.cgiurl_services + '&' + self._get_service_filter(), giveback="raw")
             jsonraw, error, status_code = copy.deepcopy(result.result),\
                                           copy.deepcopy(result.error),\
                                           result.status_code
@@ -341,42 +503,8 @@ class ThrukServer(GenericServer):
 
             # in case JSON is not empty evaluate it
             elif not jsonraw == "[]":
-                services = json.loads(jsonraw)
-
-                for s in services:
-                    # host objects contain service objects
-                    if s["host_name"] not in self.new_hosts:
-                        self.new_hosts[s["host_name"]] = GenericHost()
-                        self.new_hosts[s["host_name"]].name = s["host_name"]
-                        self.new_hosts[s["host_name"]].server = self.name
-                        self.new_hosts[s["host_name"]].status = "UP"
-
-                    if self.use_display_name_service:
-                        entry = s["display_name"]
-                    else:
-                        entry = s["description"]
-
-                    # if a service does not exist create its object
-                    if entry not in self.new_hosts[s["host_name"]].services:
-                        self.new_hosts[s["host_name"]].services[ entry ] = GenericService()
-                        self.new_hosts[s["host_name"]].services[ entry ].host = s["host_name"]
-
-                        self.new_hosts[s["host_name"]].services[ entry ].name = entry
-                        self.new_hosts[s["host_name"]].services[ entry ].real_name = s["description"]
-
-                        self.new_hosts[s["host_name"]].services[ entry ].server = self.name
-                        self.new_hosts[s["host_name"]].services[ entry ].status = self.STATES_MAPPING["services"][s["state"]]
-                        self.new_hosts[s["host_name"]].services[ entry ].last_check = datetime.datetime.fromtimestamp(int(s["last_check"])).isoformat(" ")
-                        self.new_hosts[s["host_name"]].services[ entry ].duration = human_readable_duration_from_timestamp(s["last_state_change"])
-                        self.new_hosts[s["host_name"]].services[ entry ].attempt = "%s/%s" % (s["current_attempt"], s["max_check_attempts"])
-                        self.new_hosts[s["host_name"]].services[ entry ].status_information = s["plugin_output"].replace("\n", " ").strip()
-                        self.new_hosts[s["host_name"]].services[ entry ].passiveonly = not(bool(int(s["active_checks_enabled"])))
-                        self.new_hosts[s["host_name"]].services[ entry ].notifications_disabled = not(bool(int(s["notifications_enabled"])))
-                        self.new_hosts[s["host_name"]].services[ entry ].flapping = not(bool(int(s["notifications_enabled"])))
-                        self.new_hosts[s["host_name"]].services[ entry ] .acknowledged = bool(int(s["acknowledged"]))
-                        self.new_hosts[s["host_name"]].services[ entry ].scheduled_downtime = bool(int(s["scheduled_downtime_depth"]))
-                        self.new_hosts[s["host_name"]].services[ entry ].status_type = {0: "soft", 1: "hard"}[s["state_type"]]
-                        del s
+                for s in json.loads(jsonraw):
+                    self._process_service(s)
         except:
             import traceback
             traceback.print_exc(file=sys.stdout)
@@ -387,3 +515,165 @@ class ThrukServer(GenericServer):
 
         # dummy return in case all is OK
         return Result()
+
+    def _get_status_rest_api(self):
+        """
+            Get status from Thruk REST API - every backend is queried concurrently and
+            backends which do not answer within backend_timeout are shown with their last known state
+        """
+        try:
+            result = self.fetch_url(self.rest_url + '/sites?columns=id,name', giveback='raw')
+            errors_occured = self.check_for_error(result.result, result.error, result.status_code)
+            if errors_occured is not None:
+                return errors_occured
+            if result.result.startswith('<'):
+                self.refresh_authentication = True
+                return Result(result=None, error='Login failed')
+
+            disabled_backends = [backend.strip() for backend in (self.disabled_backends or '').split(',')]
+            backends = {site['id']: site['name'] for site in json.loads(result.result)
+                        if site['id'] not in disabled_backends and site['name'] not in disabled_backends}
+
+            # every backend gets its own workers so a slow one cannot hold back the others
+            executor = ThreadPoolExecutor(max_workers=max(1, min(len(backends) * 2, self.MAX_BACKEND_WORKERS)))
+            try:
+                futures = {}
+                for backend in backends:
+                    futures[executor.submit(self.fetch_url, self._get_rest_url('hosts', backend), giveback='raw')] = \
+                        (backend, 'hosts')
+                    futures[executor.submit(self.fetch_url, self._get_rest_url('services', backend), giveback='raw')] = \
+                        (backend, 'services')
+                done, not_done = wait(futures, timeout=self.backend_timeout)
+            finally:
+                # slow backends must not block this poll
+                executor.shutdown(wait=False, cancel_futures=True)
+
+            # collect answers per backend - only backends with both answers count as fresh
+            answers = {backend: {} for backend in backends}
+            for future in done:
+                backend, object_type = futures[future]
+                result = future.result()
+                if result.error == '' and result.status_code < 400 and not result.result.startswith('<'):
+                    answers[backend][object_type] = json.loads(result.result)
+
+            stale_backends = []
+            for backend, answer in answers.items():
+                if len(answer) == 2:
+                    self.backend_cache[backend] = answer
+                    stale = False
+                elif backend in self.backend_cache:
+                    answer = self.backend_cache[backend]
+                    stale = True
+                else:
+                    stale_backends.append(backends[backend])
+                    continue
+                if stale:
+                    stale_backends.append(backends[backend])
+                for h in answer['hosts']:
+                    self._process_host(h, stale=stale)
+                for s in answer['services']:
+                    self._process_service(s, stale=stale)
+
+            # forget backends which do not exist anymore
+            for backend in list(self.backend_cache):
+                if backend not in backends:
+                    self.backend_cache.pop(backend)
+
+            if stale_backends:
+                if conf.debug_mode:
+                    self.debug(server=self.get_name(),
+                               debug='Stale backends: ' + ', '.join(stale_backends))
+                # all backends failed - nothing to show
+                if len(stale_backends) == len(backends) and not self.backend_cache:
+                    return Result(result=None, error='No backend answered within {0} seconds'.format(self.backend_timeout))
+        except:
+            import traceback
+            traceback.print_exc(file=sys.stdout)
+            # set checking flag back to False
+            self.isChecking = False
+            result, error = self.error(sys.exc_info())
+            return Result(result=result, error=error)
+
+        return Result()
+
+    def _get_rest_url(self, object_type, backend):
+        """
+            REST API URL for problem hosts or services of one backend
+        """
+        if object_type == 'hosts':
+            # up hosts are needed too if their downtime or acknowledgement affects filtering of their services
+            query = 'state != 0 or scheduled_downtime_depth > 0 or acknowledged = 1'
+            columns = self.REST_HOST_COLUMNS
+        else:
+            query = 'state != 0'
+            columns = self.REST_SERVICE_COLUMNS
+        return self.rest_url + '/' + object_type + '?' + urllib.parse.urlencode({'backend': backend,
+                                                                              'columns': columns,
+                                                                              'q': query})
+
+    def _process_host(self, h, stale=False):
+        """
+            add host from JSON to self.new_hosts
+        """
+        if h["name"] not in self.new_hosts:
+            self.new_hosts[h["name"]] = GenericHost()
+            self.new_hosts[h["name"]].name = h["name"]
+            self.new_hosts[h["name"]].server = self.name
+            self.new_hosts[h["name"]].status = self.STATES_MAPPING["hosts"][h["state"]]
+            self.new_hosts[h["name"]].last_check = datetime.datetime.fromtimestamp(int(h["last_check"])).isoformat(" ")
+            self.new_hosts[h["name"]].duration = human_readable_duration_from_timestamp(h["last_state_change"])
+            self.new_hosts[h["name"]].attempt = "%s/%s" % (h["current_attempt"], h["max_check_attempts"])
+            self.new_hosts[h["name"]].status_information = self._stale_information(h["plugin_output"], stale)
+            self.new_hosts[h["name"]].passiveonly = not(bool(int(h["active_checks_enabled"])))
+            self.new_hosts[h["name"]].notifications_disabled = not(bool(int(h["notifications_enabled"])))
+            self.new_hosts[h["name"]].flapping = bool(int(h["is_flapping"]))
+            self.new_hosts[h["name"]].acknowledged = bool(int(h["acknowledged"]))
+            self.new_hosts[h["name"]].scheduled_downtime = bool(int(h["scheduled_downtime_depth"]))
+            self.new_hosts[h["name"]].status_type = {0: "soft", 1: "hard"}[h["state_type"]]
+
+    def _process_service(self, s, stale=False):
+        """
+            add service from JSON to self.new_hosts
+        """
+        # host objects contain service objects
+        if s["host_name"] not in self.new_hosts:
+            self.new_hosts[s["host_name"]] = GenericHost()
+            self.new_hosts[s["host_name"]].name = s["host_name"]
+            self.new_hosts[s["host_name"]].server = self.name
+            self.new_hosts[s["host_name"]].status = "UP"
+
+        if self.use_display_name_service:
+            entry = s["display_name"]
+        else:
+            entry = s["description"]
+
+        # if a service does not exist create its object
+        if entry not in self.new_hosts[s["host_name"]].services:
+            self.new_hosts[s["host_name"]].services[ entry ] = GenericService()
+            self.new_hosts[s["host_name"]].services[ entry ].host = s["host_name"]
+
+            self.new_hosts[s["host_name"]].services[ entry ].name = entry
+            self.new_hosts[s["host_name"]].services[ entry ].real_name = s["description"]
+
+            self.new_hosts[s["host_name"]].services[ entry ].server = self.name
+            self.new_hosts[s["host_name"]].services[ entry ].status = self.STATES_MAPPING["services"][s["state"]]
+            self.new_hosts[s["host_name"]].services[ entry ].last_check = datetime.datetime.fromtimestamp(int(s["last_check"])).isoformat(" ")
+            self.new_hosts[s["host_name"]].services[ entry ].duration = human_readable_duration_from_timestamp(s["last_state_change"])
+            self.new_hosts[s["host_name"]].services[ entry ].attempt = "%s/%s" % (s["current_attempt"], s["max_check_attempts"])
+            self.new_hosts[s["host_name"]].services[ entry ].status_information = self._stale_information(s["plugin_output"], stale)
+            self.new_hosts[s["host_name"]].services[ entry ].passiveonly = not(bool(int(s["active_checks_enabled"])))
+            self.new_hosts[s["host_name"]].services[ entry ].notifications_disabled = not(bool(int(s["notifications_enabled"])))
+            self.new_hosts[s["host_name"]].services[ entry ].flapping = not(bool(int(s["notifications_enabled"])))
+            self.new_hosts[s["host_name"]].services[ entry ] .acknowledged = bool(int(s["acknowledged"]))
+            self.new_hosts[s["host_name"]].services[ entry ].scheduled_downtime = bool(int(s["scheduled_downtime_depth"]))
+            self.new_hosts[s["host_name"]].services[ entry ].status_type = {0: "soft", 1: "hard"}[s["state_type"]]
+
+    @staticmethod
+    def _stale_information(plugin_output, stale):
+        """
+            status information of items from backends which did not answer in time gets marked
+        """
+        status_information = plugin_output.replace("\n", " ").strip()
+        if stale:
+            return '[stale] ' + status_information
+        return status_information
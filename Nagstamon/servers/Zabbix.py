@@ -6,7 +6,6 @@ import json
 import sys
 import time
 import datetime
-import socket
 from packaging import version
 
 from Nagstamon.helpers import (human_readable_duration_from_timestamp,
@@ -325,27 +324,43 @@ class ZabbixServer(GenericServer):
     def set_recheck(self, info_dict):
         pass
 
+    def set_acknowledge(self, info_dict):
+        """
+        failed API requests raise ZabbixError which carries the Result of the request
+        """
+        try:
+            return GenericServer.set_acknowledge(self, info_dict)
+        except ZabbixError as error:
+            return error.result
+
+    def set_downtime(self, info_dict):
+        """
+        failed API requests raise ZabbixError which carries the Result of the request
+        """
+        try:
+            return GenericServer.set_downtime(self, info_dict)
+        except ZabbixError as error:
+            return error.result
+
     def _set_acknowledge(self, host, service, author, comment, sticky, notify, persistent, all_services=None):
         if conf.debug_mode is True:
             self.debug(server=self.get_name(), debug=f'Set Acknowledge Host: {host} Service: {service} Sticky: {sticky} persistent: {persistent} All services: {all_services}')
         eventids = set()
         unclosable_events = set()
-        if all_services is None:
-            all_services = []
-        all_services.append(service)
+        # all services are acknowledged with one eventids array, so only collect them here
+        service_names = set(all_services or [])
+        service_names.add(service)
         get_host = self.hosts[host]
-        # Through all Services
-        for s in all_services:
-            # find Trigger ID
-            for host_service in get_host.services.values():
-                if host_service.name == s:
-                    eventid = host_service.eventid
-                    # https://github.com/HenriWahl/Nagstamon/issues/826 we may have set eventid = -1 earlier if there was no associated event
-                    if eventid == -1:
-                        continue
-                    eventids.add(eventid)
-                    if not host_service.allow_manual_close:
-                        unclosable_events.add(eventid)
+        # find Trigger IDs
+        for host_service in get_host.services.values():
+            if host_service.name in service_names:
+                eventid = host_service.eventid
+                # https://github.com/HenriWahl/Nagstamon/issues/826 we may have set eventid = -1 earlier if there was no associated event
+                if eventid == -1:
+                    continue
+                eventids.add(eventid)
+                if not host_service.allow_manual_close:
+                    unclosable_events.add(eventid)
 
         # If events pending of acknowledge, execute ack
         if len(eventids) > 0:
@@ -400,8 +415,7 @@ class ZabbixServer(GenericServer):
                     )
                 except RuntimeError as e:
                     if "Incorrect user name or password or account is temporarily blocked" in str(e):
-                        self.error(str(e))
-                        return
+                        return Result(error=str(e))
                     else:
                         raise e
 
@@ -413,8 +427,7 @@ class ZabbixServer(GenericServer):
                 triggerid = self.hosts[hostname].services[host_service].triggerid
                 break
         if self.hosts[hostname].hostid is None:
-            self.error("Host ID is None for " + hostname)
-            return
+            return Result(error="Host ID is None for " + hostname)
         hostids = [self.hosts[hostname].hostid]
 
         if fixed == 1:
@@ -470,13 +483,7 @@ class ZabbixServer(GenericServer):
             if conf.debug_mode is True:
                 self.debug(server=self.get_name(), host=host, debug=f'IP of {host}: {ip}')
 
-            if conf.connect_by_dns is True:
-                try:
-                    address = socket.gethostbyaddr(ip)[0]
-                except socket.herror:
-                    address = ip
-            else:
-                address = ip
+            address = self.resolve_address(ip)
         except ZabbixError:
             result, error = self.error(sys.exc_info())
             return Result(result=result, error=error)
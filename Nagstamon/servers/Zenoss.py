@@ -45,9 +45,21 @@ class ZenossServer(GenericServer):
 
     MENU_ACTIONS = ['Monitor', 'Acknowledge']
 
+    # seconds between full event console queries, polls in between only ask for events since the last one
+    FULL_SYNC_INTERVAL = 300
+    # event states closed, cleared and aged - asked for in incremental polls to drop recovered events
+    CLOSED_EVENT_STATES = (3, 4, 6)
+    CLOSED_EVENT_STATE_NAMES = ('Closed', 'Cleared', 'Aged')
+
     def __init__(self, **kwds):
         GenericServer.__init__(self, **kwds)
 
+        # processed events by evid, kept between polls and updated by incremental queries
+        self.events = dict()
+        # latest lastTime seen, next incremental query starts there
+        self.events_watermark = None
+        self.events_full_sync = 0
+
         # Prepare all urls needed by nagstamon 
         self.urls = {}
         self.statemap = {}
@@ -67,86 +79,108 @@ class ZenossServer(GenericServer):
     
     def _zlogin(self):
         try:
-            self.zapi = ZenossAPI(Server=self.server)
+            self.zapi = ZenossAPI(Server=self.server, timing_hook=self.debug_request_timing)
         except Exception:
             result, error = self.error(sys.exc_info())
             return Result(result=result, error=error)
     
     def _get_status(self):
-        nagitems = {"services":[], "hosts":[]}
-
         self.new_hosts = dict()
 
         try:
-            hosts = self._get_all_events()
-            
+            full_sync = self.events_watermark is None or \
+                        time.monotonic() - self.events_full_sync > self.FULL_SYNC_INTERVAL
+            if full_sync:
+                hosts = self._get_all_events()
+            else:
+                hosts = self._get_events_since(self.events_watermark)
+
             if 'events' in hosts:
-                hosts = hosts['events']
-
-                for host in hosts:
-                    n = dict()
-                    n['evid'] = host['evid']
-                    n['host'] = host['device']['text']
-                    n['service'] = host['eventClass']['text']
-
-                    n['status'] = self.SEVERITY_MAP.get(host['severity'])
-                    n['last_check'] = host['lastTime']
-                
-                    duration = self._calc_duration(host['firstTime'], host['lastTime'])
-                    if (duration == None):
-                        continue #Zenoss needs a length to cause an error
-                    n['duration'] = duration
-
-                    n["status_information"] = host['message']
-                    n["attempt"] = str(host['count'])+"/1" # needs a / with a number on either side to work
-
-                    n["passiveonly"] = False
-                    n["notifications_disabled"] = False
-                    n["flapping"] = False
-                    n["acknowledged"] = (host['eventState'] == 'Acknowledged')
-                    n["scheduled_downtime"] = False
-              
-                    nagitems["hosts"].append(n)
-
-                    new_host = n["host"]
-                    if not new_host in self.new_hosts:
-                        self.new_hosts[new_host] = GenericHost()
-                        self.new_hosts[new_host].name = new_host
-                    
-                    if not new_host in self.new_hosts[new_host].services:
-                        
-                        new_service = new_host
-                        self.new_hosts[new_host].services[new_service] = GenericService()
-                        
-                        self.new_hosts[new_host].services[new_service].host = new_host
-                        self.new_hosts[new_host].services[new_service].evid = n['evid']
-                        self.new_hosts[new_host].services[new_service].name = n["service"]
-                    
-                        self.new_hosts[new_host].services[new_service].server = self.name
-                        self.new_hosts[new_host].services[new_service].status = n["status"]
-                        self.new_hosts[new_host].services[new_service].last_check = n["last_check"]
-                    
-                        self.new_hosts[new_host].services[new_service].duration = n["duration"]
-                        self.new_hosts[new_host].services[new_service].status_information= n["status_information"].encode("utf-8")
-                        self.new_hosts[new_host].services[new_service].attempt = n["attempt"]
-
-                        self.new_hosts[new_host].services[new_service].passiveonly = n["passiveonly"]
-                        self.new_hosts[new_host].services[new_service].notifications_disabled = n["notifications_disabled"]
-                        self.new_hosts[new_host].services[new_service].flapping = n["flapping"]
-                        self.new_hosts[new_host].services[new_service].acknowledged = n["acknowledged"]
-                        self.new_hosts[new_host].services[new_service].scheduled_downtime = n["scheduled_downtime"]
-                    del n
-                
+                if full_sync:
+                    # events which are closed or cleared meanwhile are only dropped here
+                    self.events = dict()
+                    self.events_full_sync = time.monotonic()
+                for host in hosts['events']:
+                    self._merge_event(host)
+
+            for n in self.events.values():
+                new_host = n["host"]
+                if not new_host in self.new_hosts:
+                    self.new_hosts[new_host] = GenericHost()
+                    self.new_hosts[new_host].name = new_host
+
+                if not new_host in self.new_hosts[new_host].services:
+
+                    new_service = new_host
+                    self.new_hosts[new_host].services[new_service] = GenericService()
+
+                    self.new_hosts[new_host].services[new_service].host = new_host
+                    self.new_hosts[new_host].services[new_service].evid = n['evid']
+                    self.new_hosts[new_host].services[new_service].name = n["service"]
+
+                    self.new_hosts[new_host].services[new_service].server = self.name
+                    self.new_hosts[new_host].services[new_service].status = n["status"]
+                    self.new_hosts[new_host].services[new_service].last_check = n["last_check"]
+
+                    self.new_hosts[new_host].services[new_service].duration = n["duration"]
+                    self.new_hosts[new_host].services[new_service].status_information= n["status_information"].encode("utf-8")
+                    self.new_hosts[new_host].services[new_service].attempt = n["attempt"]
+
+                    self.new_hosts[new_host].services[new_service].passiveonly = n["passiveonly"]
+                    self.new_hosts[new_host].services[new_service].notifications_disabled = n["notifications_disabled"]
+                    self.new_hosts[new_host].services[new_service].flapping = n["flapping"]
+                    self.new_hosts[new_host].services[new_service].acknowledged = n["acknowledged"]
+                    self.new_hosts[new_host].services[new_service].scheduled_downtime = n["scheduled_downtime"]
+
         except:
             self.isChecking = False
+            # start over with a full sync
+            self.events_watermark = None
             result, error = self.error(sys.exc_info())
-            print(traceback.format_exc())
+            if conf.debug_mode:
+                self.debug(server=self.get_name(), debug=traceback.format_exc())
             return Result(result=result, error=error)
 
-        
-        del nagitems
         return Result(error="")
-    
+
+    def _merge_event(self, host):
+        """
+            process event once and keep it for the next polls
+        """
+        if self.events_watermark is None or host['lastTime'] > self.events_watermark:
+            self.events_watermark = host['lastTime']
+
+        if host['eventState'] in self.CLOSED_EVENT_STATE_NAMES:
+            # problem recovered since last poll
+            self.events.pop(host['evid'], None)
+            return
+
+        duration = self._calc_duration(host['firstTime'], host['lastTime'])
+        if (duration == None):
+            # Zenoss needs a length to cause an error
+            self.events.pop(host['evid'], None)
+            return
+
+        n = dict()
+        n['evid'] = host['evid']
+        n['host'] = host['device']['text']
+        n['service'] = host['eventClass']['text']
+
+        n['status'] = self.SEVERITY_MAP.get(host['severity'])
+        n['last_check'] = host['lastTime']
+        n['duration'] = duration
+
+        n["status_information"] = host['message']
+        n["attempt"] = str(host['count'])+"/1" # needs a / with a number on either side to work
+
+        n["passiveonly"] = False
+        n["notifications_disabled"] = False
+        n["flapping"] = False
+        n["acknowledged"] = (host['eventState'] == 'Acknowledged')
+        n["scheduled_downtime"] = False
+
+        self.events[n['evid']] = n
+
     def get_username(self):
         return str(self.server.username)
     def get_password(self):
@@ -156,6 +190,8 @@ class ZenossServer(GenericServer):
         if info_dict['host'] in self.hosts:
             evid = self.hosts[info_dict['host']].services[info_dict['host']].evid
             self.zapi.set_event_ack(evid)
+            # acknowledging does not touch lastTime so incremental queries would miss it
+            self.events_watermark = None
 
     def _open_browser(self, url):
         webbrowser.open(self.monitor_url)
@@ -167,6 +203,17 @@ class ZenossServer(GenericServer):
         events = self.zapi.get_event()
         return events
 
+    def _get_events_since(self, last_time):
+        if self.zapi is None:
+            self._zlogin()
+
+        events = self.zapi.get_event(last_time=last_time)
+        # clearing or closing does not touch lastTime, so recovered events are found by their state change
+        closed = self.zapi.get_event(state_change=last_time, event_states=self.CLOSED_EVENT_STATES)
+        if 'events' in events and 'events' in closed:
+            events['events'] = events['events'] + closed['events']
+        return events
+
     ##http://stackoverflow.com/questions/538666/python-format-timedelta-to-string
     def _calc_duration(self, startStr, endStr): # like: '2016-10-2213: 53: 43' (that day/hour gap..)
         start = datetime.strptime(startStr, '%Y-%m-%d %H:%M:%S')
@@ -164,6 +164,9 @@ def create_server(server=None):
     #new_server.timeout = server.timeout
     new_server.timeout = 30
 
+    # page size for monitors with paginated APIs
+    new_server.page_size = server.page_size
+
     # SSL/TLS
     new_server.ignore_cert = server.ignore_cert
     new_server.custom_cert_use = server.custom_cert_use
@@ -214,6 +217,7 @@ def create_server(server=None):
 
     # Prometheus & Alertmanager
     new_server.alertmanager_filter = server.alertmanager_filter
+    new_server.alertmanager_peers = server.alertmanager_peers
     new_server.map_to_hostname = server.map_to_hostname
     new_server.map_to_servicename = server.map_to_servicename
     new_server.map_to_status_information = server.map_to_status_information
@@ -226,8 +230,13 @@ def create_server(server=None):
     # LibreNMS
     new_server.treat_services_as_alerts = server.treat_services_as_alerts
 
+    # Icinga2API
+    new_server.use_event_stream = server.use_event_stream
+
     # Thruk
     new_server.disabled_backends = server.disabled_backends
+    new_server.use_rest_api = server.use_rest_api
+    new_server.backend_timeout = server.backend_timeout
 
     # server's individual preparations for HTTP connections (for example cookie creation)
     # is done in GetStatus() method of monitor
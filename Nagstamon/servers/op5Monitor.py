@@ -64,7 +64,6 @@ class Op5MonitorServer(GenericServer):
     """
 
     TYPE = 'op5Monitor'
-    api_count='/api/filter/count/?query='
     api_query='/api/filter/query/?query='
     api_cmd='/api/command'
 
@@ -72,7 +71,6 @@ class Op5MonitorServer(GenericServer):
     api_host_col = []
     api_host_col.append('acknowledged')
     api_host_col.append('active_checks_enabled')
-    api_host_col.append('alias')
     api_host_col.append('current_attempt')
     api_host_col.append('is_flapping')
     api_host_col.append('last_check')
@@ -125,166 +123,151 @@ class Op5MonitorServer(GenericServer):
     def _get_status(self):
         """
         Get status from op5 Monitor Server
+        hosts and services are queried in parallel and paged with self.page_size instead of asking
+        for the count first - every page which comes back full triggers the next one
         """
-        # create Nagios items dictionary with to lists for services and hosts
-        # every list will contain a dictionary for every failed service/host
-        # this dictionary is only temporarily
-        nagitems = {"hosts":[], "services":[]}
-
         # new_hosts dictionary
         self.new_hosts = dict()
 
+        # query string and processing method per object type
+        queries = {'hosts': (self._build_query('hosts', self.host_filter, self.api_host_col), self._process_host),
+                   'services': (self._build_query('services', self.service_filter, self.api_svc_col), self._process_service)}
+        # next offset per object type which still has pages to fetch
+        offsets = {'hosts': 0, 'services': 0}
+        # hosts have to be processed before services to keep their details
+        services_pending = []
+
         # Fetch api listview with filters
+        status_code = None
         try:
+            while offsets:
+                object_types = list(offsets)
+                urls = ['%s%s%s&limit=%s&offset=%s' % (self.monitor_url, self.api_query, queries[object_type][0],
+                                                       self.page_size, offsets[object_type])
+                        for object_type in object_types]
+                for index, result in self.fetch_urls(urls, giveback='raw'):
+                    object_type = object_types[index]
+                    status_code = result.status_code
+                    # check if any error occured
+                    errors_occured = self.check_for_error(result.result, result.error, result.status_code)
+                    # if there are errors return them
+                    if errors_occured is not None:
+                        return errors_occured
+
+                    data = json.loads(result.result)
+                    if object_type == 'hosts':
+                        for api in data:
+                            self._process_host(api)
+                    else:
+                        services_pending.extend(data)
+
+                    # a full page means there might be more
+                    if len(data) < self.page_size:
+                        offsets.pop(object_type)
+                    else:
+                        offsets[object_type] += self.page_size
+
+            for api in services_pending:
+                self._process_service(api)
 
-            # Fetch Host info
-            api_default_host_query='[hosts] %s ' % self.host_filter
-            api_default_host_query+='&columns=%s' % (','.join(self.api_host_col))
-            api_default_host_query+='&format=json'
-
-            api_default_host_query = api_default_host_query.replace(" ", "%20")
-            result = self.fetch_url(self.monitor_url + self.api_count + api_default_host_query, giveback="raw")
-            data, error, status_code = json.loads(result.result),\
-                                       result.error,\
-                                       result.status_code
-          
-            # check if any error occured
-            errors_occured = self.check_for_error(data, error, status_code)
-            # if there are errors return them
-            if errors_occured is not None:
-                return errors_occured    
-                           
-            if data['count']:
-                count = data['count']
-                api_default_host_query='[hosts] %s ' % self.host_filter
-                api_default_host_query+='&columns=%s' % (','.join(self.api_host_col))
-                api_default_host_query+='&format=json'
-
-                api_default_host_query = api_default_host_query.replace(" ", "%20")
-                result = self.fetch_url(self.monitor_url + self.api_query + api_default_host_query + '&limit=' + str(count), giveback="raw")
-                data = json.loads(result.result)
-                n = dict()
-                for api in data:
-                    n['host'] = api['name']
-                    n["acknowledged"] = BOOLPOOL[api['acknowledged']]
-                    n["flapping"] = BOOLPOOL[api['is_flapping']]
-                    n["notifications_disabled"] = False if api['notifications_enabled'] else True
-                    n["passiveonly"] = False if api['active_checks_enabled'] else True
-                    n["scheduled_downtime"] = True if api['scheduled_downtime_depth'] else False
-                    n['attempt'] = "%s/%s" % (str(api['current_attempt']), str(api['max_check_attempts']))
-                    n['duration'] = human_duration(api['last_state_change'])
-                    n['last_check'] = datetime.fromtimestamp(int(api['last_check'])).strftime('%Y-%m-%d %H:%M:%S')
-                    n['status'] = self.STATUS_HOST_MAPPING[str(api['state'])]
-                    n['status_information'] = api['plugin_output']
-                    n['status_type'] = api['state']
-                    n['groups'] = str(api['groups'])
-
-                    if not n['host'] in self.new_hosts:
-                        self.new_hosts[n['host']] = GenericHost()
-                        self.new_hosts[n['host']].name = n['host']
-                        self.new_hosts[n['host']].acknowledged = n["acknowledged"]
-                        self.new_hosts[n['host']].attempt = n['attempt']
-                        self.new_hosts[n['host']].duration = n['duration']
-                        self.new_hosts[n['host']].flapping = n["flapping"]
-                        self.new_hosts[n['host']].last_check = n['last_check']
-                        self.new_hosts[n['host']].notifications_disabled = n["notifications_disabled"]
-                        self.new_hosts[n['host']].passiveonly = n["passiveonly"]
-                        self.new_hosts[n['host']].scheduled_downtime = n["scheduled_downtime"]
-                        self.new_hosts[n['host']].status = n['status']
-                        self.new_hosts[n['host']].status_information = n['status_information'].replace("\n", " ").strip()
-                        self.new_hosts[n['host']].status_type = n['status_type']
-                        self.new_hosts[n['host']].groups = n['groups']
-                    nagitems['hosts'].append(n)
-                del n
-
-
-            # Fetch services info
-            api_default_svc_query='[services] %s ' % self.service_filter
-            api_default_svc_query+='&columns=%s' % (','.join(self.api_svc_col))
-            api_default_svc_query+='&format=json'
-
-            api_default_svc_query = api_default_svc_query.replace(" ", "%20")
-            result = self.fetch_url(self.monitor_url + self.api_count + api_default_svc_query, giveback="raw")
-            data, error, status_code = json.loads(result.result),\
-                                       result.error,\
-                                       result.status_code
-                        
-            # check if any error occured
-            errors_occured = self.check_for_error(data, error, status_code)
-            # if there are errors return them
-            if errors_occured is not None:
-                return errors_occured    
-
-            if data['count']:
-                count = data['count']
-                api_default_svc_query='[services] %s ' % self.service_filter
-                api_default_svc_query+='&columns=%s' % (','.join(self.api_svc_col))
-                api_default_svc_query+='&format=json'
-
-                api_default_svc_query = api_default_svc_query.replace(" ", "%20")
-                result = self.fetch_url(self.monitor_url + self.api_query + api_default_svc_query + '&limit=' + str(count), giveback="raw")
-                data = json.loads(result.result)
-                for api in data:
-                    n = dict()
-                    n['host'] = api['host']['name']
-                    n['status'] = self.STATUS_HOST_MAPPING[str(api['host']['state'])]
-                    n["passiveonly"] = False if api['host']['active_checks_enabled'] else True
-
-                    if not n['host'] in self.new_hosts:
-                        self.new_hosts[n['host']] = GenericHost()
-                        self.new_hosts[n['host']].name = n['host']
-                        self.new_hosts[n['host']].status = n['status']
-                        self.new_hosts[n['host']].passiveonly = n["passiveonly"]
-
-                    n['service'] = api['description']
-                    n["acknowledged"] = BOOLPOOL[api['acknowledged']]
-                    n["flapping"] = BOOLPOOL[api['is_flapping']]
-                    n["notifications_disabled"] = False if api['notifications_enabled'] else True
-                    n["passiveonly"] = False if api['active_checks_enabled'] else True
-                    n["scheduled_downtime"] = True if api['scheduled_downtime_depth'] or api['host']['scheduled_downtime_depth'] else False
-                    n['attempt'] = "%s/%s" % (str(api['current_attempt']), str(api['max_check_attempts']))
-                    n['duration'] = human_duration(api['last_state_change'])
-                    n['last_check'] = datetime.fromtimestamp(int(api['last_check'])).strftime('%Y-%m-%d %H:%M:%S')
-                    n['status_information'] = api['plugin_output']
-                    n['groups'] = str(api['host']['groups'])
-
-                    if not n['host'] in self.new_hosts:
-                        self.new_hosts[n['host']] = GenericHost()
-                        self.new_hosts[n['host']].name = n['host']
-                        self.new_hosts[n['host']].status = n['status']
-
-                    if not n['service'] in self.new_hosts[n['host']].services:
-                        n['status'] = self.STATUS_SVC_MAPPING[str(api['state'])]
-
-                        self.new_hosts[n['host']].services[n['service']] = GenericService()
-                        self.new_hosts[n['host']].services[n['service']].acknowledged = n['acknowledged']
-                        self.new_hosts[n['host']].services[n['service']].attempt = n['attempt']
-                        self.new_hosts[n['host']].services[n['service']].duration = n['duration']
-                        self.new_hosts[n['host']].services[n['service']].flapping = n['flapping']
-                        self.new_hosts[n['host']].services[n['service']].host = n['host']
-                        self.new_hosts[n['host']].services[n['service']].last_check = n['last_check']
-                        self.new_hosts[n['host']].services[n['service']].name = n['service']
-                        self.new_hosts[n['host']].services[n['service']].notifications_disabled = n["notifications_disabled"]
-                        self.new_hosts[n['host']].services[n['service']].passiveonly = n['passiveonly']
-                        self.new_hosts[n['host']].services[n['service']].scheduled_downtime = n['duration']
-                        self.new_hosts[n['host']].services[n['service']].scheduled_downtime = n['scheduled_downtime']
-                        self.new_hosts[n['host']].services[n['service']].status = n['status']
-                        self.new_hosts[n['host']].services[n['service']].status_information = n['status_information'].replace("\n", " ").strip()
-                        self.new_hosts[n['host']].services[n['service']].groups = n['groups']
-
-                    nagitems['services'].append(n)
-                return Result()
         except:
 
             self.isChecking = False
-            # store status_code for returning result to tell GUI to reauthenticate
-            status_code = result.status_code
-
             result, error = self.error(sys.exc_info())
+            # return status_code for returning result to tell GUI to reauthenticate
             return Result(result=result, error=error, status_code=status_code)
 
         return Result()
 
+    def _build_query(self, object_type, query_filter, columns):
+        """
+        build URL-ready listview query for object_type, only asking for the columns actually used
+        """
+        query = '[%s] %s ' % (object_type, query_filter)
+        query += '&columns=%s' % (','.join(columns))
+        query += '&format=json'
+        return query.replace(" ", "%20")
+
+    def _process_host(self, api):
+        """
+        add host from api query result to self.new_hosts
+        """
+        n = dict()
+        n['host'] = api['name']
+        n["acknowledged"] = BOOLPOOL[api['acknowledged']]
+        n["flapping"] = BOOLPOOL[api['is_flapping']]
+        n["notifications_disabled"] = False if api['notifications_enabled'] else True
+        n["passiveonly"] = False if api['active_checks_enabled'] else True
+        n["scheduled_downtime"] = True if api['scheduled_downtime_depth'] else False
+        n['attempt'] = "%s/%s" % (str(api['current_attempt']), str(api['max_check_attempts']))
+        n['duration'] = human_duration(api['last_state_change'])
+        n['last_check'] = datetime.fromtimestamp(int(api['last_check'])).strftime('%Y-%m-%d %H:%M:%S')
+        n['status'] = self.STATUS_HOST_MAPPING[str(api['state'])]
+        n['status_information'] = api['plugin_output']
+        n['status_type'] = api['state']
+        n['groups'] = str(api['groups'])
+
+        if not n['host'] in self.new_hosts:
+            self.new_hosts[n['host']] = GenericHost()
+            self.new_hosts[n['host']].name = n['host']
+            self.new_hosts[n['host']].acknowledged = n["acknowledged"]
+            self.new_hosts[n['host']].attempt = n['attempt']
+            self.new_hosts[n['host']].duration = n['duration']
+            self.new_hosts[n['host']].flapping = n["flapping"]
+            self.new_hosts[n['host']].last_check = n['last_check']
+            self.new_hosts[n['host']].notifications_disabled = n["notifications_disabled"]
+            self.new_hosts[n['host']].passiveonly = n["passiveonly"]
+            self.new_hosts[n['host']].scheduled_downtime = n["scheduled_downtime"]
+            self.new_hosts[n['host']].status = n['status']
+            self.new_hosts[n['host']].status_information = n['status_information'].replace("\n", " ").strip()
+            self.new_hosts[n['host']].status_type = n['status_type']
+            self.new_hosts[n['host']].groups = n['groups']
+
+    def _process_service(self, api):
+        """
+        add service from api query result to self.new_hosts
+        """
+        n = dict()
+        n['host'] = api['host']['name']
+        n['status'] = self.STATUS_HOST_MAPPING[str(api['host']['state'])]
+        n["passiveonly"] = False if api['host']['active_checks_enabled'] else True
+
+        if not n['host'] in self.new_hosts:
+            self.new_hosts[n['host']] = GenericHost()
+            self.new_hosts[n['host']].name = n['host']
+            self.new_hosts[n['host']].status = n['status']
+            self.new_hosts[n['host']].passiveonly = n["passiveonly"]
+
+        n['service'] = api['description']
+        n["acknowledged"] = BOOLPOOL[api['acknowledged']]
+        n["flapping"] = BOOLPOOL[api['is_flapping']]
+        n["notifications_disabled"] = False if api['notifications_enabled'] else True
+        n["passiveonly"] = False if api['active_checks_enabled'] else True
+        n["scheduled_downtime"] = True if api['scheduled_downtime_depth'] or api['host']['scheduled_downtime_depth'] else False
+        n['attempt'] = "%s/%s" % (str(api['current_attempt']), str(api['max_check_attempts']))
+        n['duration'] = human_duration(api['last_state_change'])
+        n['last_check'] = datetime.fromtimestamp(int(api['last_check'])).strftime('%Y-%m-%d %H:%M:%S')
+        n['status_information'] = api['plugin_output']
+        n['groups'] = str(api['host']['groups'])
+
+        if not n['service'] in self.new_hosts[n['host']].services:
+            n['status'] = self.STATUS_SVC_MAPPING[str(api['state'])]
+
+            self.new_hosts[n['host']].services[n['service']] = GenericService()
+            self.new_hosts[n['host']].services[n['service']].acknowledged = n['acknowledged']
+            self.new_hosts[n['host']].services[n['service']].attempt = n['attempt']
+            self.new_hosts[n['host']].services[n['service']].duration = n['duration']
+            self.new_hosts[n['host']].services[n['service']].flapping = n['flapping']
+            self.new_hosts[n['host']].services[n['service']].host = n['host']
+            self.new_hosts[n['host']].services[n['service']].last_check = n['last_check']
+            self.new_hosts[n['host']].services[n['service']].name = n['service']
+            self.new_hosts[n['host']].services[n['service']].notifications_disabled = n["notifications_disabled"]
+            self.new_hosts[n['host']].services[n['service']].passiveonly = n['passiveonly']
+            self.new_hosts[n['host']].services[n['service']].scheduled_downtime = n['scheduled_downtime']
+            self.new_hosts[n['host']].services[n['service']].status = n['status']
+            self.new_hosts[n['host']].services[n['service']].status_information = n['status_information'].replace("\n", " ").strip()
+            self.new_hosts[n['host']].services[n['service']].groups = n['groups']
+
 
     def open_monitor(self, host, service):
         if not service:
@@ -300,7 +283,7 @@ class Op5MonitorServer(GenericServer):
 
     def send_command(self, command, params=False):
         url = self.monitor_url + self.api_cmd + '/' + command
-        self.fetch_url(url, cgi_data=params, giveback='raw')
+        return self.fetch_url(url, cgi_data=params, giveback='raw')
 
 
     def _set_recheck(self, host, service):
@@ -312,7 +295,7 @@ class Op5MonitorServer(GenericServer):
                 return
             command = 'SCHEDULE_SVC_CHECK'
             params['service_description'] = service
-        self.send_command(command, params)
+        return self.send_command(command, params)
 
 
     def _set_acknowledge(self, host, service, author, comment, sticky, notify, persistent, all_services=None):
@@ -324,7 +307,7 @@ class Op5MonitorServer(GenericServer):
         else:
             params['service_description'] = service
             command = 'ACKNOWLEDGE_SVC_PROBLEM'
-        self.send_command(command, params)
+        return self.send_command(command, params)
 
 
     def _set_downtime(self, host, service, author, comment, fixed, start_time, end_time, hours, minutes):
@@ -339,4 +322,4 @@ class Op5MonitorServer(GenericServer):
         else:
             command = 'SCHEDULE_SVC_DOWNTIME'
             params['service_description'] = service
-        self.send_command(command, params)
+        return self.send_command(command, params)
@@ -19,3 +19,21 @@
 
 """Module thirdparty"""
 
+
+class BodyPreview:
+    """
+    first bytes of a response body for log messages - only sliced and decoded if the message
+    is really logged, without copying the whole body
+    """
+    __slots__ = ('body', 'length')
+
+    def __init__(self, body, length=80):
+        self.body = body
+        self.length = length
+
+    def __str__(self):
+        if isinstance(self.body, str):
+            preview = self.body[:self.length]
+        else:
+            preview = bytes(memoryview(self.body)[:self.length]).decode('utf-8', 'replace')
+        return preview.replace('\n', '')
@@ -24,10 +24,13 @@
 
 import json
 import logging
+import time
 
 import requests
 from requests.auth import HTTPBasicAuth
 
+from Nagstamon.thirdparty import BodyPreview
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,8 +39,10 @@ class SensuAPIException(Exception):
 
 
 class SensuAPI:
-    def __init__(self, url_base, username=None, password=None, verify=None):
+    def __init__(self, url_base, username=None, password=None, verify=None, timing_hook=None):
         self._url_base = url_base
+        # called with method, url, status code and duration in seconds after every request
+        self._timing_hook = timing_hook
         self._session = requests.Session()
         self._session.headers.update({
             'User-Agent': 'PySensu Client v0.9.0'
@@ -54,8 +59,9 @@ class SensuAPI:
 
     def _request(self, method, path, **kwargs):
         url = '{}{}'.format(self._url_base, path)
-        logger.debug('{} -> {} with {}'.format(method, url, kwargs))
+        logger.debug('%s -> %s with %s', method, url, kwargs)
 
+        start = time.perf_counter()
         if method == 'GET':
             resp = self._session.get(url, **kwargs)
 
@@ -72,25 +78,19 @@ class SensuAPI:
                 'Method {} not implemented'.format(method)
             )
 
+        if self._timing_hook is not None:
+            self._timing_hook(method, url, resp.status_code, time.perf_counter() - start)
+
         if resp.status_code in self.good_status:
-            logger.debug('{}: {}'.format(
-                resp.status_code,
-                ''.join(resp.text.split('\n'))[0:80]
-            ))
+            logger.debug('%s: %s', resp.status_code, BodyPreview(resp.content))
             return resp
 
         elif resp.status_code == 400:
-            logger.error('{}: {}'.format(
-                resp.status_code,
-                resp.text
-            ))
+            logger.error('%s: %s', resp.status_code, resp.text)
             raise SensuAPIException('API returned "Bad Request"')
 
         else:
-            logger.warning('{}: {}'.format(
-                resp.status_code,
-                resp.text
-            ))
+            logger.warning('%s: %s', resp.status_code, resp.text)
             raise SensuAPIException('API bad response {}: {}'.format(resp.status_code, resp.text))
 
     """
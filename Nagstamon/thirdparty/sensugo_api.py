@@ -57,6 +57,45 @@ class SensuGoAPI:
         response = self._session.get(f'{self._base_api_url}/api/core/v2/events')
         return (response.status_code, response.json())
 
+    def get_namespaces(self):
+        self._refresh_access_token()
+        response = self._session.get(f'{self._base_api_url}/api/core/v2/namespaces')
+        self._check_response(response)
+        return [namespace['name'] for namespace in response.json()]
+
+    def get_events(self, namespace=None, limit=None, field_selector=None, label_selector=None):
+        """
+        events of one namespace or of all namespaces if none is given, filtered server-side
+        by field and label selectors and fetched page by page if a limit is given
+        """
+        if namespace is None:
+            url = f'{self._base_api_url}/api/core/v2/events'
+        else:
+            url = f'{self._base_api_url}/api/core/v2/namespaces/{namespace}/events'
+        params = {}
+        if limit:
+            params['limit'] = limit
+        if field_selector:
+            params['fieldSelector'] = field_selector
+        if label_selector:
+            params['labelSelector'] = label_selector
+
+        events = []
+        while True:
+            response = self._session.get(url, params=params)
+            self._check_response(response)
+            events.extend(response.json())
+            # continue token is only sent if there are more pages
+            continue_token = response.headers.get('Sensu-Continue')
+            if not limit or not continue_token:
+                return events
+            params['continue'] = continue_token
+
+    def _check_response(self, response):
+        if response.status_code not in SensuGoAPI.GOOD_RESPONSE_CODES:
+            logger.error(f'Response code: {response.status_code} {response.text}')
+            raise SensuGoAPIException(f'API bad response {response.status_code}')
+
     def has_acquired_token(self):
         return self._refresh_token != ''
 
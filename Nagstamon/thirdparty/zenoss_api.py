@@ -30,6 +30,7 @@ import hashlib
 import logging
 import string
 import sys
+import time
 import urllib
 
     
@@ -44,6 +45,10 @@ except ImportError:
     # Python >=2.6
     import json
 
+from Nagstamon.thirdparty import BodyPreview
+
+logger = logging.getLogger(__name__)
+
 
 ZENOSS_INSTANCE = ''
 ZENOSS_USERNAME = ''
@@ -63,14 +68,17 @@ ROUTERS = {'MessagingRouter': 'messaging',
 
 class ZenossAPI:
 
-    def __init__(self, debug=False, Server=None):
+    def __init__(self, debug=False, Server=None, timing_hook=None):
         """
         Initialise the API connection, log in, and store authentication cookie
+        timing_hook is called with HTTP method, URL, HTTP status and duration in seconds after every request
         """
 
+        self.timing_hook = timing_hook
         self.set_config_data(Server)
         self.urlOpener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor())
-        if debug: self.urlOpener.add_handler(urllib.request.HTTPHandler(debuglevel=1))
+        # http.client debuglevel would print every request eagerly - use the lazy module logger instead
+        if debug: logger.setLevel(logging.DEBUG)
         self.reqCount = 1
 
         self._login() #login to the zenoss system
@@ -116,7 +124,10 @@ class ZenossAPI:
         # calls in a single request
         self.reqCount += 1
 
+        logger.debug('%s.%s -> POST %s', router, method, req.full_url)
+
         # Submit the request and convert the returned JSON to objects
+        start = time.perf_counter()
         try:
             response = self.urlOpener.open(req, reqData)
         except:
@@ -130,6 +141,10 @@ class ZenossAPI:
             jsondata = response.read()
         except:
             raise ZenossAPIException("Couldn't read response data")
+
+        if self.timing_hook is not None:
+            self.timing_hook('POST', req.full_url, response.code, time.perf_counter() - start)
+        logger.debug('%s: %s', response.code, BodyPreview(jsondata))
         
         if len(jsondata) == 0:
             raise ZenossAPIException("Received zero json data")
@@ -145,17 +160,25 @@ class ZenossAPI:
     '''
     The API
     '''
-    def get_event(self, device=None, component=None, eventClass=None):
+    def get_event(self, device=None, component=None, eventClass=None, last_time=None, state_change=None,
+                  event_states=(0, 1)):
+        """
+        events with severity warning or worse, by default the open ones (new and acknowledged)
+        only those which occurred since last_time or changed their state since state_change if given
+        """
         data = dict(start=0, limit=500, dir='ASC', sort='severity')
         data['uid'] = '/zport/dmd'
         data['sort'] = 'device'
         data['keys'] = ['eventState', 'severity', 'device', 'component', 'eventClass', 'message', 'firstTime',
                         'lastTime', 'count', 'DevicePriority', 'evid', 'eventClassKey']
-        data['params'] = dict(severity=[5, 4, 3], eventState=[0, 1], tags=[])
+        data['params'] = dict(severity=[5, 4, 3], eventState=list(event_states), tags=[])
 
         if device: data['params']['device'] = device
         if component: data['params']['component'] = component
         if eventClass: data['params']['eventClass'] = eventClass
+        # only events with lastTime or stateChange since this single timestamp are returned
+        if last_time: data['params']['lastTime'] = last_time
+        if state_change: data['params']['stateChange'] = state_change
 
         return self._router_request('EventsRouter', 'query', [data])['result']
 
@@ -1,9 +1,16 @@
 import json
+import threading
 
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pylint import lint
 
 import unittest
 from Nagstamon.servers.Alertmanager import AlertmanagerServer
+from Nagstamon.servers.Alertmanager.helpers import compile_label_mapping
+from Nagstamon.servers.Prometheus import PrometheusServer
+from Nagstamon.objects import Result
+from Nagstamon import config
+from urllib.parse import parse_qs, urlparse
 
 conf = {}
 conf['debug_mode'] = True
@@ -168,6 +175,251 @@ class test_alertmanager(unittest.TestCase):
         self.assertEqual(test_result['fingerprint'], '0ef7c4bd7a504b8d')
         self.assertEqual(test_result['status_information'], 'Network interface "murpel" showing errors on node-exporter monitoring/monitoring-prometheus-node-exporter-4711')
 
+    def test_unit_label_plan_shared(self):
+        alertmanager = AlertmanagerServer()
+        alertmanager.map_to_hostname = 'instance,pod_name,namespace'
+        alertmanager.map_to_servicename = 'alertname'
+        alertmanager.map_to_status_information = 'message,summary,description'
+        alertmanager.map_to_critical = 'error,critical'
+        alertmanager.map_to_warning = 'error,warning'
+
+        plan = alertmanager.get_label_plan()
+
+        # compiled only once for the same config
+        self.assertIs(plan, alertmanager.get_label_plan())
+        self.assertEqual(plan.hostname_keys, ('instance', 'pod_name', 'namespace'))
+        # earlier severity mapping wins
+        self.assertEqual(plan.map_severity('error'), 'CRITICAL')
+        self.assertEqual(plan.map_severity('info'), 'INFO')
+        self.assertEqual(plan.hostname({'namespace': 'monitoring', 'pod_name': 'pod'}), 'pod')
+
+        prometheus = PrometheusServer(name='prometheus-stand-in')
+        prometheus.map_to_hostname = 'instance,pod_name,namespace'
+        prometheus.map_to_servicename = 'alertname'
+        prometheus.map_to_status_information = 'message,summary,description'
+        alerts = {'data': {'alerts': [{'labels': {'severity': 'warning', 'namespace': 'monitoring',
+                                                  'alertname': 'Error'},
+                                       'annotations': {'summary': 'stand-in'},
+                                       'state': 'firing', 'activeAt': '2024-01-01T00:00:00Z'}]}}
+        prometheus.fetch_url = lambda url, giveback='obj', **kwargs: Result(result=json.dumps(alerts),
+                                                                             status_code=200)
+
+        self.assertEqual(prometheus._get_status().error, '')
+        service = prometheus.new_hosts['monitoring'].services['Error']
+        self.assertEqual(service.status, 'WARNING')
+        self.assertEqual(service.status_information, 'stand-in')
+
+        # without severity mapping Prometheus gets its own plan but the same split label lists
+        prometheus_plan = compile_label_mapping(prometheus.map_to_hostname, prometheus.map_to_servicename,
+                                                prometheus.map_to_status_information)
+        self.assertIsNot(prometheus_plan, plan)
+        self.assertIs(prometheus_plan.hostname_keys, plan.hostname_keys)
+        self.assertEqual(prometheus_plan.map_severity('error'), 'ERROR')
+
+    def test_unit_query_pushdown(self):
+        saved = {key: getattr(config.conf, key) for key in ('re_host_enabled', 're_host_pattern', 're_host_reverse',
+                                                     'filter_acknowledged_hosts_services',
+                                                     'filter_hosts_services_maintenance')}
+        self.addCleanup(lambda: [setattr(config.conf, key, value) for key, value in saved.items()])
+        test_class = AlertmanagerServer()
+        test_class.map_to_hostname = 'instance'
+        test_class.alertmanager_filter = 'job%3D%22node%22'
+
+        config.conf.re_host_enabled = True
+        config.conf.re_host_pattern = '^web'
+        config.conf.re_host_reverse = True
+        config.conf.filter_acknowledged_hosts_services = True
+        path = test_class._get_alerts_path()
+        query = parse_qs(urlparse(path).query)
+        self.assertEqual(query['active'], ['true'])
+        self.assertEqual(query['inhibited'], ['false'])
+        self.assertEqual(query['silenced'], ['false'])
+        self.assertEqual(query['filter'], ['instance=~"(?s).*(?:^web).*"', 'job="node"'])
+
+        # hiding matches or patterns which might see the port stay local
+        for reverse, pattern in ((False, '^web'), (True, 'web$'), (True, 'unk')):
+            config.conf.re_host_reverse = reverse
+            config.conf.re_host_pattern = pattern
+            self.assertEqual(parse_qs(urlparse(test_class._get_alerts_path()).query)['filter'], ['job="node"'])
+
+        config.conf.filter_acknowledged_hosts_services = False
+        config.conf.filter_hosts_services_maintenance = False
+        # without these filters suppressed alerts are shown, so nothing may hide them
+        query = parse_qs(urlparse(test_class._get_alerts_path()).query)
+        self.assertNotIn('silenced', query)
+        self.assertNotIn('inhibited', query)
+
+
+NUMBER_ALERTS = 10000
+
+
+def stand_in_alerts():
+    """
+    alerts as delivered by /api/v2/alerts
+    """
+    with open('tests/test_alertmanager_warning.json') as json_file:
+        template = json.load(json_file)
+    alerts = []
+    for number in range(NUMBER_ALERTS):
+        alert = json.loads(json.dumps(template))
+        alert['labels']['instance'] = f'10.0.{number // 250}.{number % 250}:9100'
+        alert['labels']['alertname'] = f'TargetDown{number % 50}'
+        alert['startsAt'] = '2024-01-01T00:00:00.520032135Z'
+        alert['updatedAt'] = '2024-01-01T00:05:00.520032135Z'
+        alert['fingerprint'] = f'{number:016x}'
+        alerts.append(alert)
+    return json.dumps(alerts).encode()
+
+
+class AlertsHandler(BaseHTTPRequestHandler):
+    """
+    stand-in for Alertmanager API
+    """
+    body = b'[]'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class test_alertmanager_benchmark(unittest.TestCase):
+
+    def setUp(self):
+        AlertsHandler.body = stand_in_alerts()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), AlertsHandler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+        self.server = AlertmanagerServer(name='alertmanager-stand-in')
+        self.server.authentication = 'basic'
+        self.server.ignore_cert = False
+        self.server.custom_cert_use = False
+        self.server.monitor_url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self.server.map_to_hostname = 'instance,pod_name,namespace'
+        self.server.map_to_servicename = 'alertname'
+        self.server.map_to_status_information = 'message,summary,description'
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def poll(self):
+        self.server.new_hosts = {}
+        result = self.server._get_status()
+        self.assertEqual(result.error, '')
+        self.assertEqual(sum(len(host.services) for host in self.server.new_hosts.values()), NUMBER_ALERTS)
+        return {service.fingerprint: service
+                for host in self.server.new_hosts.values() for service in host.services.values()}
+
+    def test_benchmark_fingerprint_cache(self):
+        services_cold = self.poll()
+        services_warm = self.poll()
+
+        self.assertEqual(len(self.server.alert_cache), NUMBER_ALERTS)
+        self.assertEqual(services_warm.keys(), services_cold.keys())
+
+    def test_cache_follows_changes(self):
+        self.poll()
+        alerts = json.loads(AlertsHandler.body)
+        alerts[0]['annotations']['message'] = 'changed'
+        alerts[1]['status']['state'] = 'suppressed'
+        AlertsHandler.body = json.dumps(alerts).encode()
+
+        services = self.poll()
+
+        self.assertEqual(services[alerts[0]['fingerprint']].status_information, 'changed')
+        self.assertTrue(services[alerts[1]['fingerprint']].acknowledged)
+
+        # new mapping config invalidates the cache
+        self.server.map_to_servicename = 'job'
+        services = self.poll()
+        self.assertEqual(services[alerts[2]['fingerprint']].display_name, 'kubelet')
+        self.assertEqual({service.display_name for service in services.values()}, {'kubelet'})
+
+
+class PeerHandler(AlertsHandler):
+    """
+    stand-in for one Alertmanager cluster peer, a slow one blocks until released
+    """
+    slow = False
+    requested = 0
+
+    def do_GET(self):
+        type(self).requested += 1
+        if self.slow:
+            self.arrived.set()
+            self.release.wait()
+        super().do_GET()
+
+
+class test_alertmanager_peers(unittest.TestCase):
+
+    def setUp(self):
+        alerts = json.loads(stand_in_alerts())[:10]
+        self.peers = []
+        self.arrived = threading.Event()
+        self.release = threading.Event()
+        for slow in (True, False, False):
+            handler = type('Peer', (PeerHandler,), {'slow': slow, 'body': json.dumps(alerts).encode(),
+                                                    'arrived': self.arrived, 'release': self.release})
+            httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+            httpd.daemon_threads = True
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+            self.peers.append(httpd)
+        self.urls = [f'http://127.0.0.1:{httpd.server_address[1]}' for httpd in self.peers]
+
+        self.server = AlertmanagerServer(name='alertmanager-stand-in')
+        self.server.authentication = 'basic'
+        self.server.ignore_cert = False
+        self.server.custom_cert_use = False
+        self.server.backend_timeout = 1
+        self.server.monitor_url = self.urls[0]
+        self.server.alertmanager_peers = ', '.join(self.urls[1:] + [self.urls[1] + '/'])
+        self.server.map_to_hostname = 'instance'
+        self.server.map_to_servicename = 'alertname'
+        self.server.map_to_status_information = 'message,summary,description'
+
+    def tearDown(self):
+        self.release.set()
+        for httpd in self.peers:
+            httpd.shutdown()
+            httpd.server_close()
+
+    def test_peer_urls(self):
+        self.assertEqual(self.server._get_peer_urls(), self.urls)
+
+    def test_slow_peer_does_not_block(self):
+        # monitor URL peer does not answer before the poll is over
+        result = self.server._get_status()
+
+        self.assertEqual(result.error, '')
+        self.assertIn(self.server.active_peer_url, self.urls[1:])
+        # alerts known to several peers show up only once
+        self.assertEqual(sum(len(host.services) for host in self.server.new_hosts.values()), 10)
+        # all peers are asked at once and none of them twice, the other fast peer might not be asked
+        # anymore if the first answer came before its request got sent
+        self.assertTrue(self.arrived.wait(5))
+        active = self.peers[self.urls.index(self.server.active_peer_url)]
+        self.assertEqual(active.RequestHandlerClass.requested, 1)
+        for httpd in self.peers:
+            self.assertLessEqual(httpd.RequestHandlerClass.requested, 1)
+
+    def test_no_peer_answers(self):
+        self.server.alertmanager_peers = ''
+        self.server.backend_timeout = 1
+        self.peers[0].RequestHandlerClass.slow = False
+        self.peers[0].RequestHandlerClass.body = b'no json'
+
+        result = self.server._get_status()
+
+        self.assertNotEqual(result.error, '')
+        self.assertIsNone(self.server.active_peer_url)
+
 
 if __name__ == '__main__':
     unittest.main()
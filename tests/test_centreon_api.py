@@ -0,0 +1,147 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from Nagstamon.objects import Result
+from Nagstamon.servers.Centreon.CentreonAPI import CentreonServer
+
+NUMBER_HOSTS = 25
+NUMBER_SERVICES = 237
+
+
+def resource(number, resource_type):
+    """
+    minimal /monitoring/resources entry as delivered by Centreon 24.04
+    """
+    entry = {'id': number,
+             'type': resource_type,
+             'name': f'{resource_type}_{number}',
+             'severity': None,
+             'status': {'name': 'CRITICAL' if resource_type == 'service' else 'DOWN'},
+             'last_check': '2024-01-01T00:00:00+00:00',
+             'duration': '5m',
+             'tries': '3/3 (H)',
+             'information': 'stand-in',
+             'has_passive_checks_enabled': False,
+             'is_notification_enabled': True,
+             'is_acknowledged': False,
+             'is_in_downtime': False}
+    if resource_type == 'service':
+        entry['parent'] = {'id': number % 10, 'name': f'host_{number % 10}'}
+    return entry
+
+
+class PagedResourcesHandler(BaseHTTPRequestHandler):
+    """
+    stand-in for Centreon /monitoring/resources which serves paged JSON
+    """
+    requested_pages = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        limit = int(query.get('limit', ['10'])[0])
+        page = int(query.get('page', ['1'])[0])
+        types = json.loads(query.get('types', ['[]'])[0])
+        if 'host' in types:
+            resources = [resource(number, 'host') for number in range(NUMBER_HOSTS)]
+        elif 'service' in types:
+            resources = [resource(number, 'service') for number in range(NUMBER_SERVICES)]
+        else:
+            resources = []
+        self.requested_pages.append((tuple(types), page, limit))
+        body = json.dumps({'result': resources[(page - 1) * limit:page * limit],
+                           'meta': {'page': page, 'limit': limit, 'total': len(resources)}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class test_centreon_api(unittest.TestCase):
+
+    def setUp(self):
+        PagedResourcesHandler.requested_pages = []
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), PagedResourcesHandler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+        self.server = CentreonServer(name='centreon-stand-in')
+        self.server.authentication = 'basic'
+        self.server.ignore_cert = False
+        self.server.custom_cert_use = False
+        self.server.centreon_version_major = 24
+        self.server.centreon_version_minor = 4
+        self.server.restapi_version = 'v24.04'
+        self.server.monitor_cgi_url = f'http://127.0.0.1:{self.httpd.server_address[1]}/centreon'
+        self.server.define_url()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def test_paginated_resources(self):
+        self.server.page_size = 10
+
+        result = self.server._get_status()
+
+        self.assertEqual(result.error, '')
+        services = [service for host in self.server.new_hosts.values() for service in host.services]
+        self.assertEqual(len(services), NUMBER_SERVICES)
+        self.assertEqual(len([host for host in self.server.new_hosts.values() if host.status == 'DOWN']),
+                         NUMBER_HOSTS)
+        # every page has been requested exactly once with the configured page size
+        service_pages = sorted(page for types, page, limit in PagedResourcesHandler.requested_pages
+                               if 'service' in types and limit == 10)
+        self.assertEqual(service_pages, list(range(1, 25)))
+
+    def test_single_page(self):
+        self.server.page_size = 1000
+
+        result = self.server._get_status()
+
+        self.assertEqual(result.error, '')
+        services = [service for host in self.server.new_hosts.values() for service in host.services]
+        self.assertEqual(len(services), NUMBER_SERVICES)
+        self.assertEqual(len([page for types, page, limit in PagedResourcesHandler.requested_pages
+                              if 'service' in types]), 1)
+
+    def test_object_id_index(self):
+        self.server.page_size = 1000
+        self.assertEqual(self.server._get_status().error, '')
+        requests_poll = len(PagedResourcesHandler.requested_pages)
+
+        # IDs come from the poll
+        self.assertEqual(self.server.get_host_and_service_id('host_13'), 13)
+        self.assertEqual(self.server.get_host_and_service_id('host_3', 'service_13'), (3, 13))
+        self.assertEqual(len(PagedResourcesHandler.requested_pages), requests_poll)
+
+        # unknown objects are looked up once
+        self.assertEqual(self.server.get_host_and_service_id('host_99'), 0)
+        self.assertEqual(self.server.get_host_and_service_id('host_99'), 0)
+        self.assertEqual(len(PagedResourcesHandler.requested_pages), requests_poll + 1)
+
+    def test_bulk_acknowledge(self):
+        ids = {'': 1, 'load': 11, 'disk': 12}
+        self.server.get_host_and_service_id = lambda host, service='': \
+            ids[service] if service == '' else (ids[''], ids[service])
+        posted = []
+        self.server.fetch_url = lambda url, giveback='obj', cgi_data=None, **kwargs: \
+            posted.append((url, json.loads(cgi_data))) or Result(status_code=204)
+
+        self.server._set_acknowledge('host_1', '', 'author', 'comment', True, False, False, ['load', 'disk'])
+
+        # host and all its services in one request
+        self.assertEqual(len(posted), 1)
+        url, data = posted[0]
+        self.assertTrue(url.endswith('/resources/acknowledge'))
+        self.assertEqual([(entry['type'], entry['id']) for entry in data['resources']],
+                         [('host', 1), ('service', 11), ('service', 12)])
+
+
+if __name__ == '__main__':
+    unittest.main()
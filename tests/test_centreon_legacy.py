@@ -0,0 +1,74 @@
+import unittest
+from xml.etree import ElementTree
+
+from Nagstamon.servers.Centreon.CentreonLegacy import CentreonServer
+
+WELL_FORMED = b'''<?xml version="1.0" encoding="UTF-8"?>
+<reponse>
+  <i><numrows>3</numrows></i>
+  <l><hn>host_1</hn><sd>load</sd><cs>CRITICAL</cs></l>
+  <l><hn>host_2</hn><sd>disk</sd><cs>WARNING</cs></l>
+  <l><hn>host_3</hn><sd>ping &amp; more</sd><cs>UNKNOWN</cs></l>
+</reponse>'''
+
+# unescaped ampersand in the third record breaks the XML parser after two records
+MALFORMED = WELL_FORMED.replace(b'ping &amp; more', b'ping & more')
+
+OTHER_HOSTS = b'''<?xml version="1.0" encoding="UTF-8"?>
+<reponse>
+  <l><hn>host_4</hn><sd>uptime</sd><cs>WARNING</cs></l>
+</reponse>'''
+
+
+class test_centreon_legacy(unittest.TestCase):
+
+    def setUp(self):
+        self.server = CentreonServer(name='centreon-legacy-stand-in')
+
+    def record(self, l):
+        # stand-in for _process_*_record() which fills the same attributes
+        self.server.new_hosts.setdefault(l['hn'], []).append(l['sd'])
+        self.server.new_object_ids[(l['hn'], l['sd'])] = l['cs']
+
+    def test_parse_well_formed(self):
+        records = list(self.server._parse_xml_records(WELL_FORMED))
+
+        self.assertEqual([record['hn'] for record in records], ['host_1', 'host_2', 'host_3'])
+        self.assertEqual(records[2], {'hn': 'host_3', 'sd': 'ping & more', 'cs': 'UNKNOWN'})
+
+    def test_parse_streams(self):
+        records = self.server._parse_xml_records(MALFORMED)
+
+        # records before the broken one are given back before the parser fails
+        self.assertEqual(next(records)['hn'], 'host_1')
+        self.assertEqual(next(records)['hn'], 'host_2')
+        self.assertRaises(ElementTree.ParseError, next, records)
+
+    def test_parse_malformed_fallback(self):
+        records = self.server._parse_xml_records_fallback(MALFORMED)
+
+        self.assertEqual([record['hn'] for record in records], ['host_1', 'host_2', 'host_3'])
+        self.assertEqual(records[1], {'hn': 'host_2', 'sd': 'disk', 'cs': 'WARNING'})
+        self.assertEqual(records[2]['sd'], 'ping & more')
+
+    def test_process_well_formed(self):
+        self.server.new_hosts = dict()
+        self.server._process_xml_documents([(WELL_FORMED, self.record)])
+
+        self.assertEqual(self.server.new_hosts, {'host_1': ['load'], 'host_2': ['disk'], 'host_3': ['ping & more']})
+        self.assertEqual(len(self.server.new_object_ids), 3)
+
+    def test_process_malformed(self):
+        self.server.new_hosts = dict()
+        # the well-formed first document has been processed completely when the second one breaks
+        self.server._process_xml_documents([(OTHER_HOSTS, self.record), (MALFORMED, self.record)])
+
+        # partially built objects are dropped and every record is processed exactly once
+        self.assertEqual(self.server.new_hosts, {'host_1': ['load'], 'host_2': ['disk'], 'host_3': ['ping & more'],
+                                                 'host_4': ['uptime']})
+        self.assertEqual(len(self.server.new_object_ids), 4)
+        self.assertEqual(self.server.new_object_ids[('host_3', 'ping & more')], 'UNKNOWN')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+import queue
+import socket
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Nagstamon.helpers import TokenBucket
+from Nagstamon.objects import Result
+from Nagstamon.servers.Generic import GenericServer
+
+ACKNOWLEDGE = {'host': 'server', 'service': 'load', 'author': 'author', 'comment': 'comment', 'sticky': True,
+               'notify': True, 'persistent': False, 'acknowledge_all_services': False, 'all_services': []}
+
+
+class CommandHandler(BaseHTTPRequestHandler):
+    """
+    stand-in for cmd.cgi which refuses or delays commands
+    """
+    status = 500
+    delay = 0
+    posts = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.posts.append(self.path)
+        time.sleep(self.delay)
+        try:
+            self.send_response(self.status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        except OSError:
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def closed_port():
+    """
+    port nobody listens on
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class test_generic(unittest.TestCase):
+
+    def setUp(self):
+        CommandHandler.status = 500
+        CommandHandler.delay = 0
+        CommandHandler.posts = []
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), CommandHandler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+        self.server = GenericServer(name='generic-stand-in')
+        self.server.authentication = 'basic'
+        self.server.ignore_cert = False
+        self.server.custom_cert_use = False
+        self.server.monitor_cgi_url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self.server.init_http()
+        self.server.action_queue.backoff = 0.01
+        self.server.refresh_objects = lambda items: None
+        self.finished = queue.Queue()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def queue_acknowledge(self):
+        self.server.queue_action('acknowledge', dict(ACKNOWLEDGE), self.server.set_acknowledge,
+                                 callback=lambda action, error: self.finished.put(error))
+        return self.finished.get(timeout=10)
+
+    def test_failed_connection_retried(self):
+        self.server.monitor_cgi_url = f'http://127.0.0.1:{closed_port()}'
+        attempts = []
+        fetch_url = self.server.fetch_url
+        self.server.fetch_url = lambda *args, **kwargs: attempts.append(args) or fetch_url(*args, **kwargs)
+
+        error = self.queue_acknowledge()
+
+        # connection error comes as Result from fetch_url() and is retried because nothing has been sent
+        self.assertTrue(error.startswith('requests.exceptions.ConnectionError'))
+        self.assertEqual(len(attempts), self.server.action_queue.retries + 1)
+
+    def test_refused_action_reported(self):
+        error = self.queue_acknowledge()
+
+        self.assertEqual(error, 'HTTP status 500')
+        self.assertEqual(len(CommandHandler.posts), 1)
+
+    def test_read_timeout_not_retried(self):
+        CommandHandler.status = 200
+        CommandHandler.delay = 1
+        self.server.timeout = 0.2
+
+        error = self.queue_acknowledge()
+
+        # the acknowledgement might have arrived already so it must not be sent again
+        self.assertTrue(error.startswith('requests.exceptions.ReadTimeout'))
+        self.assertEqual(len(CommandHandler.posts), 1)
+
+    def test_recheck_all(self):
+        rechecked = []
+        self.server.set_recheck = lambda info_dict: rechecked.append((info_dict['host'], info_dict['service']))
+        self.server.recheck_rate = 1000
+        self.server.max_concurrent_requests = 4
+        items = [(f'host_{number}', 'load') for number in range(30)]
+        progress = []
+
+        done, failed = self.server.set_recheck_all(items, progress=lambda done, total: progress.append((done, total)))
+
+        self.assertEqual((done, failed), (30, 0))
+        self.assertEqual(sorted(rechecked), sorted(items))
+        self.assertEqual(progress[-1], (30, 30))
+
+    def test_recheck_all_failures_counted(self):
+        def set_recheck(info_dict):
+            number = int(info_dict['host'].split('_')[1])
+            if number % 3 == 0:
+                return Result(error='requests.exceptions.ConnectionError')
+            if number % 3 == 1:
+                return Result(status_code=403)
+            return Result(status_code=200)
+
+        self.server.set_recheck = set_recheck
+        self.server.recheck_rate = 1000
+        progress = []
+
+        done, failed = self.server.set_recheck_all([(f'host_{number}', '') for number in range(30)],
+                                                   progress=lambda done, total: progress.append((done, total)))
+
+        # refused and failed rechecks are no successes but still advance the progress
+        self.assertEqual((done, failed), (10, 20))
+        self.assertEqual(progress[-1], (30, 30))
+
+    def test_recheck_all_raising(self):
+        def set_recheck(info_dict):
+            raise ValueError('stand-in')
+
+        self.server.set_recheck = set_recheck
+        self.server.recheck_rate = 1000
+
+        self.assertEqual(self.server.set_recheck_all([('host_1', ''), ('host_2', 'load')]), (0, 2))
+
+    def test_recheck_all_cancel(self):
+        cancel = threading.Event()
+        rechecked = []
+
+        def set_recheck(info_dict):
+            rechecked.append(info_dict)
+            if len(rechecked) == 5:
+                cancel.set()
+
+        self.server.set_recheck = set_recheck
+        self.server.recheck_rate = 100
+        self.server.max_concurrent_requests = 1
+
+        done, failed = self.server.set_recheck_all([(f'host_{number}', '') for number in range(100)], cancel=cancel)
+
+        self.assertEqual((done, failed), (5, 0))
+        self.assertEqual(len(rechecked), 5)
+
+
+class StandInClock:
+    """
+    clock which only advances while waiting, used as clock and cancel event of TokenBucket
+    """
+    def __init__(self):
+        self.now = 0.0
+        self.waits = []
+
+    def __call__(self):
+        return self.now
+
+    def is_set(self):
+        return False
+
+    def wait(self, timeout):
+        self.waits.append(timeout)
+        self.now += timeout
+
+
+class test_token_bucket(unittest.TestCase):
+
+    def test_rate_limited(self):
+        clock = StandInClock()
+        # rate is a power of two so the token arithmetic stays exact with the stand-in clock
+        bucket = TokenBucket(rate=32, burst=4, clock=clock)
+
+        for _ in range(4):
+            self.assertTrue(bucket.acquire(clock))
+        # burst needs no waiting
+        self.assertEqual(clock.waits, [])
+
+        for _ in range(26):
+            self.assertTrue(bucket.acquire(clock))
+        # 32 per second for the remaining 26
+        self.assertEqual(len(clock.waits), 26)
+        self.assertEqual(clock.now, 26 / 32)
+
+    def test_cancelled(self):
+        cancel = threading.Event()
+        bucket = TokenBucket(rate=1, burst=1)
+        self.assertTrue(bucket.acquire(cancel))
+
+        cancel.set()
+
+        self.assertFalse(bucket.acquire(cancel))
+
+
+if __name__ == '__main__':
+    unittest.main()
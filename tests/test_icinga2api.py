@@ -0,0 +1,275 @@
+import json
+import queue
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from Nagstamon.config import conf, Server
+from Nagstamon.objects import Result
+from Nagstamon.servers.Icinga2API import Icinga2APIServer
+
+
+def api_object(host, service=None, state=2):
+    """
+    minimal Icinga2 API host or service object
+    """
+    attrs = {'name': service or host, 'state': state, 'state_type': 1, 'check_attempt': 1, 'max_check_attempts': 3,
+             'last_check': 1700000000, 'previous_state_change': 1700000000,
+             'last_check_result': {'output': f'{service or host} problem'}, 'enable_active_checks': True,
+             'enable_notifications': True, 'flapping': False, 'acknowledgement': 0, 'downtime_depth': 0}
+    if service:
+        attrs['host_name'] = host
+    return {'attrs': attrs}
+
+
+class Icinga2Handler(BaseHTTPRequestHandler):
+    """
+    stand-in for Icinga2 API with objects and event stream
+    """
+    protocol_version = 'HTTP/1.1'
+    events = queue.Queue()
+    object_queries = []
+    # API user without events/* permission
+    refuse_events = False
+
+    def do_GET(self, query=None):
+        url = urlparse(self.path)
+        if query is None:
+            query = parse_qs(url.query)
+        object_filter = query.get('filter', [''])[0]
+        self.object_queries.append((url.path, object_filter, self.command, query))
+        if url.path.endswith('/hosts'):
+            results = [api_object('router', state=1)]
+        elif 'disk' in object_filter:
+            results = [api_object('server', 'disk')]
+        else:
+            results = [api_object('server', 'load')]
+        body = json.dumps({'results': results}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.headers.get('X-HTTP-Method-Override') == 'GET':
+            query = json.loads(body)
+            query['filter'] = [query['filter']]
+            return self.do_GET(query)
+        if self.refuse_events:
+            self.send_response(403)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        while True:
+            event = self.events.get()
+            if event is None:
+                self.wfile.write(b'0\r\n\r\n')
+                break
+            chunk = json.dumps(event).encode() + b'\n'
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.flush()
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class test_icinga2api(unittest.TestCase):
+
+    def setUp(self):
+        Icinga2Handler.events = queue.Queue()
+        Icinga2Handler.object_queries = []
+        Icinga2Handler.refuse_events = False
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Icinga2Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+        conf.servers['icinga-stand-in'] = Server()
+        conf.servers['icinga-stand-in'].monitor_url = f'http://127.0.0.1:{self.httpd.server_address[1]}/v1'
+        self.server = Icinga2APIServer(name='icinga-stand-in')
+        self.server.authentication = 'basic'
+        self.server.ignore_cert = False
+        self.server.custom_cert_use = False
+        self.server.enabled = True
+        self.server.use_event_stream = True
+        self.server.session = self.server.create_session()
+
+    def tearDown(self):
+        Icinga2Handler.events.put(None)
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        conf.servers.pop('icinga-stand-in')
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_event_stream(self):
+        # seeding with full query
+        self.assertEqual(self.server._get_status().error, '')
+        self.assertEqual(self.server.new_hosts['router'].status, 'DOWN')
+        self.assertIn('load', self.server.new_hosts['server'].services)
+        full_queries = len(Icinga2Handler.object_queries)
+
+        Icinga2Handler.events.put({'type': 'StateChange', 'host': 'router', 'state': 0, 'state_type': 1,
+                                   'timestamp': 1700000100})
+        Icinga2Handler.events.put({'type': 'AcknowledgementSet', 'host': 'server', 'service': 'load'})
+        Icinga2Handler.events.put({'type': 'CheckResult', 'host': 'server', 'service': 'disk',
+                                   'check_result': {'state': 2, 'output': 'disk full',
+                                                    'vars_after': {'state': 2, 'state_type': 0, 'attempt': 1}}})
+        # unknown service is left to the next status poll
+        self.wait_for(lambda: ('server', 'disk') in self.server.event_stream_missing)
+
+        self.assertEqual(self.server._get_status().error, '')
+        self.assertNotIn('router', self.server.new_hosts)
+        self.assertTrue(self.server.new_hosts['server'].services['load'].acknowledged)
+        self.assertIn('disk', self.server.new_hosts['server'].services)
+        # only the unknown service has been fetched additionally
+        self.assertEqual(len(Icinga2Handler.object_queries), full_queries + 1)
+
+        # broken stream leads to resync with full query
+        Icinga2Handler.events.put(None)
+        self.wait_for(lambda: self.server.event_stream_resync)
+        self.assertEqual(self.server._get_status().error, '')
+        self.assertEqual(len(Icinga2Handler.object_queries), full_queries + 3)
+        self.assertEqual(self.server.new_hosts['router'].status, 'DOWN')
+
+    def test_event_stream_refused(self):
+        Icinga2Handler.refuse_events = True
+
+        result = self.server._get_status()
+
+        self.assertEqual(result.error, 'Event stream refused (status=403)')
+        self.assertFalse(self.server.event_stream_connected.is_set())
+
+        # later polls use full queries without trying the stream again
+        thread = self.server.event_stream_thread
+        self.assertEqual(self.server._get_status().error, '')
+        self.assertIs(self.server.event_stream_thread, thread)
+        self.assertEqual(self.server.new_hosts['router'].status, 'DOWN')
+        self.assertIn('load', self.server.new_hosts['server'].services)
+
+    def test_host_check_result_event(self):
+        self.assertEqual(self.server._get_status().error, '')
+        self.assertTrue(self.server.event_stream_connected.is_set())
+
+        # check results of hosts carry the raw check state, 2 must not turn into UNREACHABLE
+        Icinga2Handler.events.put({'type': 'CheckResult', 'host': 'router',
+                                   'check_result': {'state': 2, 'output': 'ping timeout',
+                                                    'vars_after': {'state': 2, 'state_type': 1, 'attempt': 1}}})
+        self.wait_for(lambda: self.server.api_hosts['router']['attrs']['last_check_result']['output'] == 'ping timeout')
+
+        self.assertEqual(self.server._get_status().error, '')
+        self.assertEqual(self.server.new_hosts['router'].status, 'DOWN')
+
+    def test_attrs_and_joins(self):
+        self.server.use_event_stream = False
+
+        self.assertEqual(self.server._get_status().error, '')
+
+        path, object_filter, command, query = Icinga2Handler.object_queries[-1]
+        self.assertEqual(command, 'GET')
+        self.assertEqual(query['attrs'], Icinga2APIServer.SERVICE_ATTRS)
+        self.assertEqual(query['joins'], Icinga2APIServer.SERVICE_JOINS)
+
+    def test_long_filter_as_post(self):
+        long_filter = ' || '.join(f'host.name=="host_{number}"' for number in range(200))
+
+        results = self.server._list_objects('hosts', long_filter)
+
+        self.assertEqual(results[0]['attrs']['name'], 'router')
+        path, object_filter, command, query = Icinga2Handler.object_queries[-1]
+        self.assertEqual(command, 'POST')
+        self.assertEqual(object_filter, long_filter)
+        self.assertEqual(query['attrs'], Icinga2APIServer.HOST_ATTRS)
+
+    def test_bulk_acknowledge(self):
+        actions = []
+        self.server._trigger_action = lambda action, **data: actions.append((action, data)) or Result()
+
+        self.server._set_acknowledge('server', '', 'author', 'comment', False, True, False,
+                                     ['load', 'disk', 'swap'])
+
+        self.assertEqual([action for action, data in actions], ['acknowledge-problem'] * 2)
+        self.assertEqual(actions[0][1]['type'], 'Host')
+        # all services in one action
+        self.assertEqual(actions[1][1]['type'], 'Service')
+        self.assertEqual(actions[1][1]['filter_vars'], {'host_name': 'server', 'service_names': ['load', 'disk', 'swap']})
+
+    def test_bulk_recheck_all(self):
+        actions = []
+        self.server._trigger_action = lambda action, **data: actions.append((action, data)) or Result()
+
+        done, failed = self.server.set_recheck_all([('router', ''), ('server', 'load'), ('server', 'disk'),
+                                                     ('db', 'load')])
+
+        self.assertEqual((done, failed), (4, 0))
+        self.assertEqual([action for action, data in actions], ['reschedule-check'] * 3)
+        self.assertEqual(actions[0][1]['filter_vars'], {'host_names': ['router']})
+        self.assertEqual(actions[1][1]['filter_vars'], {'host_name': 'server', 'service_names': ['load', 'disk']})
+        self.assertEqual(actions[2][1]['filter_vars'], {'host_name': 'db', 'service_names': ['load']})
+
+    def test_action_queue(self):
+        self.server.action_queue.backoff = 0.01
+        release = threading.Event()
+        calls = []
+        finished = queue.Queue()
+        refreshed = []
+        self.server.refresh_objects = refreshed.extend
+
+        def set_acknowledge(info_dict):
+            calls.append(info_dict['host'])
+            release.wait(5)
+            if len(calls) == 1:
+                raise requests.exceptions.ConnectionError("HTTPConnectionPool(host='icinga', port=5665): "
+                                                          "Max retries exceeded (Caused by NewConnectionError("
+                                                          "'Failed to establish a new connection'))")
+
+        info = {'server': self.server, 'host': 'server', 'service': 'load',
+                'acknowledge_all_services': True, 'all_services': ['disk']}
+        self.assertTrue(self.server.queue_action('acknowledge', info, set_acknowledge,
+                                                 callback=lambda action, error: finished.put((action, error))))
+        # identical action while still pending gets merged
+        self.assertFalse(self.server.queue_action('acknowledge', dict(info), set_acknowledge,
+                                                  callback=lambda action, error: finished.put((action, error))))
+        release.set()
+
+        self.assertEqual(finished.get(timeout=5), ('acknowledge', ''))
+        self.assertEqual(finished.get(timeout=5), ('acknowledge', ''))
+        # transient error has been retried
+        self.assertEqual(calls, ['server', 'server'])
+        self.assertEqual(set(refreshed), {('server', 'load'), ('server', 'disk')})
+
+        # permanent errors are reported without retry
+        self.server.queue_action('downtime', info, lambda info_dict: 1 / 0,
+                                 callback=lambda action, error: finished.put((action, error)))
+        action, error = finished.get(timeout=5)
+        self.assertTrue(error.startswith('ZeroDivisionError'))
+
+    def test_refresh_objects(self):
+        self.assertEqual(self.server._get_status().error, '')
+        self.assertIn('load', self.server.new_hosts['server'].services)
+        Icinga2Handler.object_queries = []
+
+        self.server.refresh_objects([('server', 'disk')])
+
+        # only the affected object has been fetched and the next poll is brought forward
+        self.assertEqual(len(Icinga2Handler.object_queries), 1)
+        self.assertIn(('server', 'disk'), self.server.api_services)
+        self.assertGreaterEqual(self.server.thread_counter, conf.update_interval_seconds)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from Nagstamon.objects import GenericHost, GenericService
+from Nagstamon.servers.IcingaWeb2 import IcingaWeb2Server
+
+FORM = '''<html><body>
+<form name="IcingaModuleMonitoringFormsCommandObjectCheckNowCommandForm" method="post">
+<input type="hidden" name="CSRFToken" value="{token}">
+<input type="hidden" name="formUID" value="form_check_now">
+<button type="submit" name="btn_submit" value="Check now">Check now</button>
+</form>
+</body></html>'''
+
+
+class IcingaWeb2Handler(BaseHTTPRequestHandler):
+    """
+    stand-in for IcingaWeb2 command forms which only accepts the current CSRF token
+    """
+    token = 'token-1'
+    requests = []
+
+    def send_html(self, status, body):
+        body = body.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.requests.append(('GET', urlparse(self.path).path, None))
+        self.send_html(200, FORM.format(token=self.token))
+
+    def do_POST(self):
+        data = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())
+        self.requests.append(('POST', urlparse(self.path).path, data))
+        if data.get('CSRFToken') != [self.token]:
+            self.send_html(400, 'Invalid CSRF token provided')
+        else:
+            self.send_html(200, '')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class test_icingaweb2(unittest.TestCase):
+
+    def setUp(self):
+        IcingaWeb2Handler.token = 'token-1'
+        IcingaWeb2Handler.requests = []
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), IcingaWeb2Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+        self.server = IcingaWeb2Server(name='icingaweb2-stand-in')
+        self.server.authentication = 'basic'
+        self.server.ignore_cert = False
+        self.server.custom_cert_use = False
+        self.server.no_cookie_auth = True
+        self.server.monitor_url = self.server.monitor_cgi_url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self.server.init_http()
+        host = GenericHost()
+        host.name = host.real_name = 'server'
+        for name in ('load', 'disk'):
+            host.services[name] = GenericService()
+            host.services[name].real_name = name
+        self.server.hosts = {'server': host}
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def test_cached_form_template(self):
+        self.assertIsNone(self.server._set_recheck('server', 'load'))
+        self.assertIsNone(self.server._set_recheck('server', 'disk'))
+
+        # form page has only been fetched once
+        self.assertEqual([method for method, path, data in IcingaWeb2Handler.requests], ['GET', 'POST', 'POST'])
+        data = IcingaWeb2Handler.requests[-1][2]
+        self.assertEqual(data['formUID'], ['form_check_now'])
+        self.assertEqual(data['btn_submit'], ['Check now'])
+
+    def test_rejected_form_template(self):
+        self.assertIsNone(self.server._set_recheck('server', 'load'))
+        IcingaWeb2Handler.token = 'token-2'
+        IcingaWeb2Handler.requests = []
+
+        self.assertIsNone(self.server._set_recheck('server', 'disk'))
+
+        # rejected token led to fetching the form again
+        self.assertEqual([method for method, path, data in IcingaWeb2Handler.requests], ['POST', 'GET', 'POST'])
+        self.assertEqual(IcingaWeb2Handler.requests[-1][2]['CSRFToken'], ['token-2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
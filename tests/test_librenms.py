@@ -0,0 +1,65 @@
+import unittest
+
+from Nagstamon.objects import Result
+from Nagstamon.servers.LibreNMS import LibreNMSServer
+
+NUMBER_DEVICES = 20
+
+
+def alert(number, device_id):
+    """
+    minimal /api/v0/alerts entry
+    """
+    return {'id': number, 'device_id': device_id, 'hostname': f'10.0.0.{device_id}', 'rule_id': 1,
+            'name': f'alert_{number}', 'state': 1, 'severity': 'critical', 'timestamp': '2024-01-01 00:00:00'}
+
+
+class test_librenms(unittest.TestCase):
+
+    def setUp(self):
+        self.server = LibreNMSServer(name='librenms-stand-in')
+        self.server.monitor_url = 'http://stand-in'
+        # device 99 is missing in the device list and has to be fetched on its own
+        self.alerts = [alert(number, number % NUMBER_DEVICES) for number in range(100)] + [alert(100, 99)]
+        self.requested = []
+        self.server.fetch_url = self.fetch_url
+
+    def fetch_url(self, url, giveback='obj', **kwargs):
+        path = url[len(self.server.monitor_url):]
+        self.requested.append(path)
+        if path == LibreNMSServer.API_PATH_ALERTS:
+            return Result(result={'status': 'ok', 'alerts': self.alerts})
+        if path == LibreNMSServer.API_PATH_DEVICES:
+            return Result(result={'status': 'ok', 'devices': [{'device_id': device_id, 'sysName': f'device_{device_id}'}
+                                                              for device_id in range(NUMBER_DEVICES)]})
+        if path.startswith(LibreNMSServer.API_PATH_DEVICES + '/'):
+            device_id = path.rsplit('/', 1)[1]
+            return Result(result={'status': 'ok', 'devices': [{'device_id': device_id, 'sysName': f'device_{device_id}'}]})
+        return Result(result={'status': 'ok', 'services': []})
+
+    def test_device_cache(self):
+        self.assertEqual(self.server._get_status().error, '')
+        self.assertEqual(self.server._get_status().error, '')
+
+        self.assertEqual(len(self.server.new_hosts), NUMBER_DEVICES + 1)
+        self.assertIn('device_99', self.server.new_hosts)
+        # all devices with one request and the missing one only once for both polls
+        self.assertEqual(self.requested.count(LibreNMSServer.API_PATH_DEVICES), 1)
+        self.assertEqual(self.requested.count(LibreNMSServer.API_PATH_DEVICES + '/99'), 1)
+        self.assertEqual(len([path for path in self.requested if path.startswith(LibreNMSServer.API_PATH_DEVICES)]), 2)
+
+    def test_device_cache_expires(self):
+        self.assertEqual(self.server._get_status().error, '')
+        # single device entry and batch prefetch are outdated
+        self.server.devices.set(99, self.server.devices.get(99), ttl=-1)
+        self.server.devices_prefetched -= LibreNMSServer.METADATA_CACHE_TTL + 1
+
+        self.assertEqual(self.server._get_status().error, '')
+
+        self.assertEqual(self.requested.count(LibreNMSServer.API_PATH_DEVICES), 2)
+        self.assertEqual(self.requested.count(LibreNMSServer.API_PATH_DEVICES + '/99'), 2)
+        self.assertEqual(len([path for path in self.requested if path.startswith(LibreNMSServer.API_PATH_DEVICES)]), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import json
+import re
+import threading
+import unittest
+
+from Nagstamon.objects import Result
+from Nagstamon.servers.Monitos4x import Monitos4xServer
+
+NUMBER_HOSTS = 45
+NUMBER_SERVICES = 230
+
+
+def status():
+    """
+    status part of /api/host and /api/serviceinstance items
+    """
+    return {'currentState': 1, 'lastCheck': 1700000000, 'output': 'stand-in', 'checksEnabled': 1,
+            'notificationsEnabled': 1, 'isFlapping': 0, 'acknowleged': 0, 'scheduledDowntimeDepth': 0,
+            'stateType': 1, 'lastStateChange': 1700000000}
+
+
+def host_item(number):
+    """
+    one item of /api/host
+    """
+    return {'name': f'host_{number}', 'uuid': f'host-uuid-{number}', 'syncEnabled': 1,
+            'status': status(), 'configuration': {'maxCheckAttempts': 3}}
+
+
+def service_item(number):
+    """
+    one item of /api/serviceinstance
+    """
+    return {'uuid': f'service-uuid-{number}', 'syncEnabled': 1, 'status': dict(status(), currentState=2),
+            'configuration': {'hostName': f'host_{number % NUMBER_HOSTS}', 'serviceDescription': f'service_{number}',
+                              'maxCheckAttempts': 3, 'host': {'uuid': f'host-uuid-{number % NUMBER_HOSTS}'}}}
+
+
+class test_monitos4x(unittest.TestCase):
+
+    def setUp(self):
+        self.server = Monitos4xServer(name='monitos4x-stand-in')
+        self.server.monitor_cgi_url = 'http://stand-in'
+        self.server.use_autologin = False
+        self.server.init_config()
+        self.server.page_size = 20
+        self.requested = []
+        self.lock = threading.Lock()
+
+    def fetch_url(self, url, giveback='obj', cgi_data=None, with_total=True, max_limit=None, **kwargs):
+        if '/api/host?' in url:
+            items = [host_item(number) for number in range(NUMBER_HOSTS)]
+        else:
+            items = [service_item(number) for number in range(NUMBER_SERVICES)]
+        limit = int(re.search(r'limit=(\d+)', url).group(1))
+        if max_limit:
+            limit = min(limit, max_limit)
+        page = int(re.search(r'page=(\d+)', url).group(1))
+        with self.lock:
+            self.requested.append((url.split('?')[0], page))
+        answer = {'data': items[(page - 1) * limit:page * limit]}
+        if with_total:
+            answer['meta'] = {'total': len(items)}
+        return Result(result=json.dumps(answer, indent=1), status_code=200)
+
+    def count_services(self):
+        return sum(len(host.services) for host in self.server.new_hosts.values())
+
+    def pages(self, path):
+        return sorted(page for url, page in self.requested if url.endswith(path))
+
+    def test_concurrent_pages(self):
+        self.server.fetch_url = self.fetch_url
+
+        self.assertEqual(self.server._get_status().error, '')
+
+        self.assertEqual(len(self.server.new_hosts), NUMBER_HOSTS)
+        self.assertEqual(self.count_services(), NUMBER_SERVICES)
+        # no extra request after the last partial page
+        self.assertEqual(self.pages('/serviceinstance'), list(range(1, 13)))
+        self.assertEqual(self.pages('/host'), [1, 2, 3])
+
+    def test_pages_without_total(self):
+        self.server.fetch_url = lambda url, **kwargs: self.fetch_url(url, with_total=False, **kwargs)
+
+        self.assertEqual(self.server._get_status().error, '')
+
+        self.assertEqual(self.count_services(), NUMBER_SERVICES)
+        # page by page until a short one comes
+        self.assertEqual(self.pages('/host'), [1, 2, 3])
+
+    def test_total_too_small(self):
+        # a count which does not mean the total must not lose any items
+        def fetch_url(url, **kwargs):
+            result = self.fetch_url(url, **kwargs)
+            answer = json.loads(result.result)
+            answer['meta'] = {'total': len(answer['data'])}
+            return Result(result=json.dumps(answer), status_code=200)
+
+        self.server.fetch_url = fetch_url
+
+        self.assertEqual(self.server._get_status().error, '')
+
+        self.assertEqual(len(self.server.new_hosts), NUMBER_HOSTS)
+        self.assertEqual(self.count_services(), NUMBER_SERVICES)
+
+    def test_limit_capped_with_page_count(self):
+        # server delivers only 10 items per page and counts the items of this page
+        def fetch_url(url, **kwargs):
+            result = self.fetch_url(url, max_limit=10, **kwargs)
+            answer = json.loads(result.result)
+            answer['meta'] = {'count': len(answer['data'])}
+            return Result(result=json.dumps(answer), status_code=200)
+
+        self.server.fetch_url = fetch_url
+
+        self.assertEqual(self.server._get_status().error, '')
+
+        self.assertEqual(len(self.server.new_hosts), NUMBER_HOSTS)
+        self.assertEqual(self.count_services(), NUMBER_SERVICES)
+        # page by page until a short one comes
+        self.assertEqual(self.pages('/host'), list(range(1, 6)))
+
+
+if __name__ == '__main__':
+    unittest.main()
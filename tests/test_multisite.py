@@ -0,0 +1,193 @@
+import json
+import os
+import socket
+import time
+import unittest
+import urllib.parse
+
+from Nagstamon.config import conf
+from Nagstamon.objects import Result
+from Nagstamon.servers.Multisite import MultisiteServer
+
+NUMBER_SERVICES = 20000
+
+SERVICE_HEADER = ['service_state', 'host', 'service_description', 'svc_plugin_output', 'svc_state_age',
+                  'svc_check_age', 'svc_attempt', 'svc_is_active', 'svc_check_command', 'svc_flapping',
+                  'sitename_plain', 'host_address', 'svc_in_downtime', 'svc_acknowledged',
+                  'svc_notifications_enabled', 'host_in_downtime', 'perfometer', 'svc_long_plugin_output']
+
+
+def service_row(number):
+    """
+    one row of a svcproblems view as delivered by view.py
+    """
+    return ['CRIT', f'host_{number % 500}', f'service_{number}', f'CRIT - stand-in output {number}',
+            '5 min', '30 sec', '3/3', 'yes', 'check_mk-cpu', 'no', 'site', f'10.0.{number % 250}.1',
+            'no', 'no', 'yes', 'no', '', 'long output ' * 10]
+
+
+def view_output():
+    return [SERVICE_HEADER] + [service_row(number) for number in range(NUMBER_SERVICES)]
+
+
+class test_multisite(unittest.TestCase):
+
+    def setUp(self):
+        self.server = MultisiteServer(name='multisite-stand-in')
+        self.server.force_authuser = False
+        self.server.urls = {'api_hosts': 'http://stand-in/check_mk/view.py?view_name=hostproblems&output_format=json',
+                            'api_services': 'http://stand-in/check_mk/view.py?view_name=svcproblems&output_format=json'}
+        self.server.statemap = {'CRIT': 'CRITICAL'}
+        self.view_json = json.dumps(view_output())
+
+    def test_get_status_json_view(self):
+        host_view = json.dumps([['host', 'host_state'], ])
+
+        def fetch_url(url, giveback='obj', cgi_data=None, **kwargs):
+            if 'hostproblems' in url:
+                return Result(result=host_view, status_code=200)
+            return Result(result=self.view_json, status_code=200)
+
+        self.server.fetch_url = fetch_url
+
+        result = self.server._get_status()
+
+        self.assertEqual(result.error, '')
+        self.assertEqual(len(self.server.new_hosts), 500)
+        service = self.server.new_hosts['host_1'].services['service_1']
+        self.assertEqual(service.status, 'CRITICAL')
+        self.assertEqual(service.address, '10.0.1.1')
+        self.assertEqual(service.status_type, 'hard')
+
+    def test_host_address_cache(self):
+        host_view = json.dumps([['host', 'host_state'], ])
+        self.server.fetch_url = lambda url, *args, **kwargs: Result(result=host_view if 'hostproblems' in url
+                                                                    else self.view_json, status_code=200)
+        self.assertEqual(self.server._get_status().error, '')
+        # status data filled the cache without any extra request
+        self.assertEqual(self.server.host_addresses.get('host_1'), '10.0.1.1')
+
+        lookups = []
+
+        def gethostbyaddr(ip):
+            lookups.append(ip)
+            return 'host-1.example.com', [], [ip]
+
+        connect_by_host, connect_by_dns, original_gethostbyaddr = conf.connect_by_host, conf.connect_by_dns, socket.gethostbyaddr
+        conf.connect_by_host, conf.connect_by_dns, socket.gethostbyaddr = False, True, gethostbyaddr
+        try:
+            # host vanished from last poll but address is still known
+            self.server.hosts = {}
+            self.assertEqual(self.server.get_host('host_1').result, 'host-1.example.com')
+            self.assertEqual(self.server.get_host('host_1').result, 'host-1.example.com')
+        finally:
+            conf.connect_by_host, conf.connect_by_dns, socket.gethostbyaddr = connect_by_host, connect_by_dns, original_gethostbyaddr
+        # reverse DNS has been asked only once
+        self.assertEqual(lookups, ['10.0.1.1'])
+
+    def test_get_status_rest_api(self):
+        now = int(time.time())
+        common = {'has_been_checked': 1, 'last_check': now, 'last_state_change': now - 300,
+                  'current_attempt': 1, 'max_check_attempts': 3, 'state_type': 0, 'plugin_output': 'stand-in',
+                  'scheduled_downtime_depth': 0, 'acknowledged': 0, 'notifications_enabled': 1}
+        hosts = {'value': [{'extensions': dict(common, name='host_down', state=1, address='10.0.0.1')}]}
+        services = {'value': [{'extensions': dict(common, host_name='host_up', description='CPU', state=2, state_type=1,
+                                                  active_checks_enabled=0, check_command='check_mk-cpu',
+                                                  is_flapping=0, host_address='10.0.0.2',
+                                                  host_scheduled_downtime_depth=1)}]}
+        requested = []
+
+        def fetch_url(url, giveback='obj', cgi_data=None, headers=None, **kwargs):
+            requested.append(urllib.parse.urlparse(url))
+            if '/host/' in url:
+                return Result(result=json.dumps(hosts), status_code=200)
+            return Result(result=json.dumps(services), status_code=200)
+
+        self.server.fetch_url = fetch_url
+        self.server.urls.update({'rest_hosts': 'http://stand-in/api/1.0/domain-types/host/collections/all',
+                                 'rest_services': 'http://stand-in/api/1.0/domain-types/service/collections/all'})
+        self.server.central_site = 'site'
+
+        result = self.server._get_status_since_2_3()
+
+        self.assertEqual(result.error, '')
+        self.assertEqual(self.server.new_hosts['host_down'].status, 'DOWN')
+        self.assertEqual(self.server.new_hosts['host_down'].status_type, 'soft')
+        self.assertTrue(self.server.new_hosts['host_up'].scheduled_downtime)
+        service = self.server.new_hosts['host_up'].services['CPU']
+        self.assertEqual(service.status, 'CRITICAL')
+        self.assertEqual(service.status_type, 'hard')
+        self.assertEqual(service.site, 'site')
+        self.assertFalse(service.passiveonly)
+        # only problems and the needed columns are requested
+        query = urllib.parse.parse_qs([url for url in requested if '/service/' in url.path][0].query)
+        self.assertEqual(json.loads(query['query'][0])['left'], 'state')
+        self.assertEqual(query['columns'], MultisiteServer.REST_SERVICE_COLUMNS)
+
+    def test_rest_status_usable(self):
+        sites = {'value': [{'id': 'site'}]}
+        self.server.fetch_url = lambda url, *args, **kwargs: Result(result=json.dumps(sites), status_code=200)
+        self.server.urls['rest_sites'] = 'http://stand-in/api/1.0/domain-types/site_connection/collections/all'
+        self.server.checkmk_view_hosts, self.server.checkmk_view_services = MultisiteServer.REST_DEFAULT_VIEWS
+
+        self.assertTrue(self.server._rest_status_usable())
+        # distributed setup needs the site of every row
+        sites['value'].append({'id': 'remote'})
+        self.assertFalse(self.server._rest_status_usable())
+        # custom views can only be served by view.py
+        sites['value'].pop()
+        self.server.checkmk_view_services = 'custom_svc'
+        self.assertFalse(self.server._rest_status_usable())
+
+    def test_bulk_acknowledge_rest_api(self):
+        posted = []
+
+        def fetch_url(url, giveback='obj', cgi_data=None, headers=None, **kwargs):
+            posted.append((url, json.loads(cgi_data)))
+            return Result(status_code=204)
+
+        self.server.fetch_url = fetch_url
+        self.server.username = 'nagstamon'
+        self.server.urls.update({'omd_host_ack': 'http://stand-in/host', 'omd_svc_ack': 'http://stand-in/service'})
+
+        self.server._set_acknowledge_since_2_3('host_1', 'CPU', 'nagstamon', 'comment', True, False, True,
+                                               ['CPU', 'Memory', 'Disk'])
+
+        # one request for all services
+        self.assertEqual(len(posted), 1)
+        url, data = posted[0]
+        self.assertEqual(url, 'http://stand-in/service')
+        self.assertEqual(data['acknowledge_type'], 'service_by_query')
+        self.assertEqual(data['comment'], 'comment')
+        self.assertEqual(data['query']['expr'][0]['right'], 'host_1')
+        self.assertEqual([expr['right'] for expr in data['query']['expr'][1]['expr']], ['CPU', 'Memory', 'Disk'])
+
+    def test_json_matches_python_view(self):
+        # same view as it would have been delivered with output_format=python
+        rows_eval = eval(repr(view_output()))
+        rows_json = list(MultisiteServer._project_rows(MultisiteServer._decode_view(self.view_json),
+                                                       MultisiteServer.VIEW_SERVICE_COLUMNS))
+
+        self.assertEqual(len(rows_json), len(rows_eval) - 1)
+        self.assertEqual(rows_json[42]['service_description'], rows_eval[43][2])
+        self.assertNotIn('perfometer', rows_json[0])
+
+    @unittest.skipUnless(os.environ.get('NAGSTAMON_BENCHMARK'), 'set NAGSTAMON_BENCHMARK=1 to time the view decoders')
+    def test_benchmark_decoder(self):
+        view_python = repr(view_output())
+
+        start = time.perf_counter()
+        eval(view_python)
+        time_eval = time.perf_counter() - start
+
+        start = time.perf_counter()
+        list(MultisiteServer._project_rows(MultisiteServer._decode_view(self.view_json),
+                                           MultisiteServer.VIEW_SERVICE_COLUMNS))
+        time_json = time.perf_counter() - start
+
+        print(f'\n{NUMBER_SERVICES} services: output_format=python {time_eval:.3f}s, '
+              f'output_format=json {time_json:.3f}s')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import json
+import logging
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Nagstamon.thirdparty import BodyPreview
+from Nagstamon.thirdparty.sensu_api import SensuAPI
+
+
+class EventsHandler(BaseHTTPRequestHandler):
+    """
+    stand-in for Sensu API with a big events list
+    """
+    body = json.dumps([{'id': number, 'output': 'line\n' * 10} for number in range(10000)], indent=1).encode()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class test_sensu_api(unittest.TestCase):
+
+    def setUp(self):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), EventsHandler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def test_timing_hook_and_preview(self):
+        timings = []
+        api = SensuAPI(f'http://127.0.0.1:{self.httpd.server_address[1]}',
+                       timing_hook=lambda *args: timings.append(args))
+
+        with self.assertLogs('Nagstamon.thirdparty.sensu_api', logging.DEBUG) as logs:
+            events = api.get_events()
+
+        self.assertEqual(len(events), 10000)
+        method, url, status_code, duration = timings[0]
+        self.assertEqual((method, status_code), ('GET', 200))
+        self.assertTrue(url.endswith('/events'))
+        self.assertGreater(duration, 0)
+        # body preview is bounded and has no line breaks
+        self.assertLess(len(logs.output[-1]), 200)
+        self.assertNotIn('\n', logs.output[-1])
+
+    def test_body_preview(self):
+        self.assertEqual(str(BodyPreview(b'{\n"a": 1}' * 100, length=10)), '{"a": 1}{')
+        self.assertEqual(str(BodyPreview('x' * 1000)), 'x' * 80)
+
+
+if __name__ == '__main__':
+    unittest.main()
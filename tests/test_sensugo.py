@@ -0,0 +1,101 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from Nagstamon.config import conf, Server
+from Nagstamon.servers.SensuGo import SensuGoServer
+
+NAMESPACES = ['default', 'production', 'staging']
+NUMBER_EVENTS = 23
+
+
+def event(namespace, number):
+    """
+    minimal Sensu Go event
+    """
+    return {'entity': {'metadata': {'namespace': namespace, 'name': f'entity_{number % 5}'}},
+            'check': {'metadata': {'name': f'check_{number}'}, 'status': 2, 'last_ok': 0,
+                      'output': 'stand-in', 'is_silenced': False, 'occurrences': 1, 'publish': True},
+            'timestamp': 1700000000}
+
+
+class SensuGoHandler(BaseHTTPRequestHandler):
+    """
+    stand-in for Sensu Go API which pages events with continue tokens
+    """
+    requests = []
+
+    def send_json(self, data, headers=None):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.send_json({'access_token': 'access', 'refresh_token': 'refresh'})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        self.requests.append((url.path, query))
+        if url.path == '/auth':
+            self.send_json({'access_token': 'access', 'refresh_token': 'refresh'})
+        elif url.path == '/api/core/v2/namespaces':
+            self.send_json([{'name': namespace} for namespace in NAMESPACES])
+        else:
+            namespace = url.path.split('/')[5]
+            limit = int(query['limit'][0])
+            start = int(query.get('continue', ['0'])[0])
+            headers = {}
+            if start + limit < NUMBER_EVENTS:
+                headers['Sensu-Continue'] = str(start + limit)
+            self.send_json([event(namespace, number)
+                            for number in range(start, min(start + limit, NUMBER_EVENTS))], headers)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class test_sensugo(unittest.TestCase):
+
+    def setUp(self):
+        SensuGoHandler.requests = []
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), SensuGoHandler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+        conf.servers['sensugo-stand-in'] = Server()
+        conf.servers['sensugo-stand-in'].monitor_cgi_url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self.server = SensuGoServer(name='sensugo-stand-in')
+        self.server.custom_cert_use = False
+        self.server.ignore_cert = False
+        self.server.page_size = 10
+        self.server._setup_sensugo_api()
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        conf.servers.pop('sensugo-stand-in')
+
+    def test_paginated_namespaces(self):
+        result = self.server._get_status()
+
+        self.assertEqual(result.error, '')
+        services = [service for host in self.server.new_hosts.values() for service in host.services]
+        self.assertEqual(len(services), NUMBER_EVENTS * len(NAMESPACES))
+        event_requests = [query for path, query in SensuGoHandler.requests if path.endswith('/events')]
+        # 3 pages per namespace, every one filtered to problems
+        self.assertEqual(len(event_requests), 3 * len(NAMESPACES))
+        for query in event_requests:
+            self.assertEqual(query['limit'], ['10'])
+            self.assertIn('event.check.status != "0"', query['fieldSelector'][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import json
+import threading
+import unittest
+
+from Nagstamon.objects import Result
+from Nagstamon.servers.SnagView3 import SnagViewServer
+
+NUMBER_HOSTS = 45
+NUMBER_SERVICES = 230
+
+
+def host_record(number):
+    """
+    one record of /rest/private/nagios/host
+    """
+    return {'sv_host__nagios__host_name': f'host_{number}', 'sv_host__svobjects____SVID': number,
+            'sv_host__nagios_status__current_state': 1, 'sv_host__nagios_status__last_check': 1700000000,
+            'sv_host__nagios__max_check_attempts': 3, 'sv_host__nagios_status__plugin_output': 'stand-in',
+            'sv_host__nagios_status__checks_enabled': 1, 'sv_host__nagios_status__notifications_enabled': 1,
+            'sv_host__nagios_status__is_flapping': 0,
+            'sv_host__nagios_status__problem_has_been_acknowledged': 0,
+            'sv_host__nagios_status__scheduled_downtime_depth': 0, 'sv_host__nagios_status__state_type': 1,
+            'sv_host__nagios_status__last_state_change': 1700000000}
+
+
+def service_record(number):
+    """
+    one record of /rest/private/nagios/service_status/browser
+    """
+    return {'sv_host__nagios__host_name': f'host_{number % NUMBER_HOSTS}',
+            'sv_host__nagios_status__current_state': 1,
+            'sv_service_status__svobjects__rendered_label': f'service_{number}',
+            'sv_service_status__svobjects____SVID': number,
+            'sv_service_status__nagios_status__current_state': 2,
+            'sv_service_status__nagios_status__last_check': 1700000000,
+            'sv_service_status__nagios__max_check_attempts': 3,
+            'sv_service_status__nagios_status__plugin_output': 'stand-in',
+            'sv_service_status__nagios_status__checks_enabled': 1,
+            'sv_service_status__nagios_status__notifications_enabled': 1,
+            'sv_service_status__nagios_status__is_flapping': 0,
+            'sv_service_status__nagios_status__problem_has_been_acknowledged': 0,
+            'sv_service_status__nagios_status__scheduled_downtime_depth': 0,
+            'sv_service_status__nagios_status__state_type': 1,
+            'sv_service_status__nagios__service_description': f'service_{number}',
+            'sv_service_status__nagios_status__last_state_change': 1700000000}
+
+
+class test_snagview3(unittest.TestCase):
+
+    def setUp(self):
+        self.server = SnagViewServer(name='snagview-stand-in')
+        self.server.monitor_cgi_url = 'http://stand-in'
+        self.server.init_config()
+        self.server.page_size = 20
+        self.requested = []
+        self.lock = threading.Lock()
+
+    def fetch_url(self, url, giveback='obj', cgi_data=None, with_total=True, **kwargs):
+        if url.endswith('/host'):
+            records = [host_record(number) for number in range(NUMBER_HOSTS)]
+        else:
+            records = [service_record(number) for number in range(NUMBER_SERVICES)]
+        start, length = cgi_data['limit_start'], cgi_data['limit_length']
+        with self.lock:
+            self.requested.append((url, start, length))
+        answer = {'data': records[start:start + length]}
+        if with_total:
+            answer['recordsFiltered'] = len(records)
+        return Result(result=json.dumps(answer, indent=1), status_code=200)
+
+    def count_services(self):
+        return sum(len(host.services) for host in self.server.new_hosts.values())
+
+    def test_concurrent_pages(self):
+        self.server.fetch_url = self.fetch_url
+
+        self.assertEqual(self.server._get_status().error, '')
+
+        self.assertEqual(len(self.server.new_hosts), NUMBER_HOSTS)
+        self.assertEqual(self.count_services(), NUMBER_SERVICES)
+        service_starts = sorted(start for url, start, length in self.requested if url.endswith('/browser'))
+        self.assertEqual(service_starts, list(range(0, NUMBER_SERVICES, 20)))
+        self.assertEqual({length for url, start, length in self.requested}, {20})
+
+    def test_pages_without_total(self):
+        self.server.fetch_url = lambda url, **kwargs: self.fetch_url(url, with_total=False, **kwargs)
+
+        self.assertEqual(self.server._get_status().error, '')
+
+        self.assertEqual(self.count_services(), NUMBER_SERVICES)
+        self.assertEqual(len([url for url, start, length in self.requested if url.endswith('/host')]), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,259 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from Nagstamon.config import conf
+from Nagstamon.objects import GenericHost, GenericService, Result
+from Nagstamon.servers.Thruk import ThrukServer
+
+BACKENDS = ('fast1', 'fast2', 'slow')
+
+
+def item(backend, object_type):
+    """
+    minimal Thruk REST API host or service
+    """
+    entry = {'state': 2, 'last_check': 1700000000, 'last_state_change': 1700000000,
+             'plugin_output': f'{backend} problem', 'current_attempt': 3, 'max_check_attempts': 3,
+             'active_checks_enabled': 1, 'notifications_enabled': 1, 'is_flapping': 0, 'acknowledged': 0,
+             'scheduled_downtime_depth': 0, 'state_type': 1}
+    if object_type == 'hosts':
+        entry.update(name=f'host_{backend}', state=1)
+    else:
+        entry.update(host_name=f'host_{backend}_services', description='load', display_name='load')
+    return entry
+
+
+class ThrukRestHandler(BaseHTTPRequestHandler):
+    """
+    stand-in for Thruk REST API with one slow backend which blocks until released
+    """
+    slow = True
+    release = threading.Event()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path.endswith('/sites'):
+            body = [{'id': backend, 'name': backend} for backend in BACKENDS]
+        else:
+            backend = query['backend'][0]
+            if self.slow and backend == 'slow':
+                self.release.wait()
+            body = [item(backend, url.path.rsplit('/', 1)[1])]
+        body = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class test_thruk(unittest.TestCase):
+
+    def setUp(self):
+        ThrukRestHandler.slow = False
+        ThrukRestHandler.release = threading.Event()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), ThrukRestHandler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+        self.server = ThrukServer(name='thruk-stand-in')
+        self.server.authentication = 'basic'
+        self.server.ignore_cert = False
+        self.server.custom_cert_use = False
+        self.server.use_rest_api = True
+        self.server.backend_timeout = 1
+        self.server.monitor_cgi_url = f'http://127.0.0.1:{self.httpd.server_address[1]}/thruk/cgi-bin'
+        self.server.init_config()
+
+    def tearDown(self):
+        ThrukRestHandler.release.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def test_slow_backend_is_stale(self):
+        # first poll gets everything
+        result = self.server._get_status()
+        self.assertEqual(result.error, '')
+        self.assertIn('host_slow', self.server.new_hosts)
+
+        # now one backend lags behind and does not answer before the poll is over
+        ThrukRestHandler.slow = True
+        result = self.server._get_status()
+
+        self.assertEqual(result.error, '')
+        self.assertEqual(self.server.new_hosts['host_fast1'].status_information, 'fast1 problem')
+        self.assertEqual(self.server.new_hosts['host_slow'].status_information, '[stale] slow problem')
+        self.assertEqual(self.server.new_hosts['host_slow_services'].services['load'].status, 'CRITICAL')
+
+    def test_disabled_backend(self):
+        self.server.disabled_backends = 'slow'
+
+        result = self.server._get_status()
+
+        self.assertEqual(result.error, '')
+        self.assertNotIn('host_slow', self.server.new_hosts)
+        self.assertIn('host_fast2', self.server.new_hosts)
+
+    def test_bulk_acknowledge(self):
+        host = GenericHost()
+        host.name = host.real_name = 'server'
+        for name in ('load', 'disk', 'odd,name'):
+            host.services[name] = GenericService()
+            host.services[name].real_name = name
+        self.server.hosts = {'server': host}
+        posted = []
+        self.server.fetch_url = lambda url, giveback='obj', cgi_data=None, **kwargs: \
+            posted.append(dict(cgi_data)) or Result()
+
+        self.server._set_acknowledge('server', 'load', 'author', 'comment', True, False, False,
+                                     ['load', 'disk', 'odd,name'])
+
+        self.assertEqual([data.get('service') for data in posted[:2]], ['load', 'odd,name'])
+        # everything else in one quick command
+        self.assertEqual(len(posted), 3)
+        self.assertEqual(posted[2]['quick_command'], ThrukServer.QUICK_COMMAND_ACKNOWLEDGE)
+        self.assertEqual(posted[2]['selected_services'], 'server;disk')
+        self.assertEqual(posted[2]['sticky_ack'], 'on')
+
+
+FILTER_SETTINGS = ('filter_acknowledged_hosts_services', 'filter_hosts_services_maintenance',
+                   'filter_hosts_services_disabled_notifications', 'filter_hosts_services_disabled_checks',
+                   'filter_all_flapping_hosts', 'filter_all_flapping_services', 'filter_hosts_in_soft_state',
+                   'filter_services_in_soft_state', 'filter_all_down_hosts', 'filter_all_unreachable_hosts',
+                   'filter_all_warning_services', 'filter_all_unknown_services', 'filter_all_critical_services',
+                   'filter_services_on_down_hosts', 'filter_services_on_unreachable_hosts',
+                   'filter_services_on_acknowledged_hosts', 'filter_services_on_hosts_in_maintenance',
+                   're_host_enabled', 're_host_reverse', 're_service_enabled', 're_service_reverse')
+
+
+class test_thruk_filters(unittest.TestCase):
+
+    def setUp(self):
+        saved = {key: getattr(conf, key) for key in FILTER_SETTINGS + ('re_host_pattern', 're_service_pattern')}
+        self.addCleanup(lambda: [setattr(conf, key, value) for key, value in saved.items()])
+        for key in FILTER_SETTINGS:
+            setattr(conf, key, False)
+        self.server = ThrukServer(name='thruk-stand-in')
+
+    def host_filter(self):
+        return parse_qs(self.server._get_host_filter())
+
+    def service_filter(self):
+        return parse_qs(self.server._get_service_filter())
+
+    def test_no_filters(self):
+        query = self.host_filter()
+        self.assertEqual(query['dfl_s0_hoststatustypes'], ['12'])
+        self.assertEqual(query['dfl_s0_hostprops'], ['0'])
+        # up hosts with flags which matter for their services
+        self.assertEqual([query['dfl_s{0}_hostprops'.format(number)][0] for number in range(1, 5)],
+                         ['1', '4', '524288', '4096'])
+        self.assertNotIn('dfl_s0_type', query)
+
+        query = self.service_filter()
+        self.assertEqual((query['dfl_s0_servicestatustypes'], query['dfl_s0_serviceprops'],
+                          query['dfl_s0_hoststatustypes'], query['dfl_s0_hostprops']), (['28'], ['0'], ['15'], ['0']))
+        self.assertNotIn('dfl_s1_servicestatustypes', query)
+
+    def test_acknowledged_filter(self):
+        conf.filter_acknowledged_hosts_services = True
+        conf.filter_services_on_acknowledged_hosts = True
+
+        query = self.host_filter()
+        self.assertEqual(query['dfl_s0_hostprops'], ['8'])
+        # acknowledged hosts are not asked for in an extra set anymore
+        self.assertEqual([query['dfl_s{0}_hostprops'.format(number)][0] for number in range(1, 4)],
+                         ['9', '524296', '4104'])
+        self.assertNotIn('dfl_s4_hostprops', query)
+
+        query = self.service_filter()
+        self.assertEqual(query['dfl_s0_serviceprops'], ['8'])
+        self.assertEqual(query['dfl_s0_hostprops'], ['8'])
+
+    def test_downtime_filter(self):
+        conf.filter_hosts_services_maintenance = True
+        conf.filter_services_on_hosts_in_maintenance = True
+
+        query = self.host_filter()
+        self.assertEqual(query['dfl_s0_hostprops'], ['2'])
+        self.assertEqual([query['dfl_s{0}_hostprops'.format(number)][0] for number in range(1, 4)],
+                         ['6', '524290', '4098'])
+
+        query = self.service_filter()
+        self.assertEqual(query['dfl_s0_serviceprops'], ['2'])
+        self.assertEqual(query['dfl_s0_hostprops'], ['2'])
+
+    def test_soft_state_filter(self):
+        conf.filter_hosts_in_soft_state = True
+        conf.filter_services_in_soft_state = True
+
+        query = self.host_filter()
+        self.assertEqual(query['dfl_s0_hostprops'], ['262144'])
+        # soft state hosts are not asked for in an extra set anymore
+        self.assertEqual([query['dfl_s{0}_hostprops'.format(number)][0] for number in range(1, 4)],
+                         ['262145', '262148', '266240'])
+
+        self.assertEqual(self.service_filter()['dfl_s0_serviceprops'], ['262144'])
+
+    def test_state_filters(self):
+        conf.filter_all_down_hosts = True
+        conf.filter_all_warning_services = True
+        conf.filter_services_on_down_hosts = True
+
+        self.assertEqual(self.host_filter()['dfl_s0_hoststatustypes'], ['8'])
+        query = self.service_filter()
+        self.assertEqual(query['dfl_s0_servicestatustypes'], ['24'])
+        self.assertEqual(query['dfl_s0_hoststatustypes'], ['11'])
+
+        # nothing left would mean everything for status.cgi, so it stays local
+        conf.filter_all_unreachable_hosts = True
+        conf.filter_all_unknown_services = True
+        conf.filter_all_critical_services = True
+        self.assertEqual(self.host_filter()['dfl_s0_hoststatustypes'], ['12'])
+        self.assertEqual(self.service_filter()['dfl_s0_servicestatustypes'], ['28'])
+
+    def test_regex_filters(self):
+        conf.re_host_enabled = conf.re_host_reverse = True
+        conf.re_host_pattern = '^web'
+        conf.re_service_enabled = conf.re_service_reverse = True
+        conf.re_service_pattern = 'load|disk'
+
+        query = self.host_filter()
+        # every set gets the host filter
+        for number in range(5):
+            self.assertEqual((query['dfl_s{0}_type'.format(number)], query['dfl_s{0}_op'.format(number)],
+                              query['dfl_s{0}_value'.format(number)]), (['host'], ['~'], ['^web']))
+        query = self.service_filter()
+        self.assertEqual(query['dfl_s0_type'], ['host', 'service'])
+        self.assertEqual(query['dfl_s0_value'], ['^web', 'load|disk'])
+
+        # service filter matches the display name locally, Thruk only knows the description
+        self.server.use_display_name_service = True
+        self.assertEqual(self.service_filter()['dfl_s0_type'], ['host'])
+
+    def test_regex_filters_stay_local(self):
+        conf.re_host_enabled = conf.re_service_enabled = True
+        # hiding matches could hide more than the case-sensitive local filter
+        conf.re_host_reverse = conf.re_service_reverse = False
+        conf.re_host_pattern = '^web'
+        conf.re_service_pattern = 'load'
+        self.assertNotIn('dfl_s0_type', self.host_filter())
+        self.assertNotIn('dfl_s0_type', self.service_filter())
+
+        # patterns which might mean something else for Thruk
+        conf.re_host_reverse = conf.re_service_reverse = True
+        conf.re_host_pattern = r'web\d+'
+        conf.re_service_pattern = r'load\b'
+        self.assertNotIn('dfl_s0_type', self.host_filter())
+        self.assertNotIn('dfl_s0_type', self.service_filter())
+
+
+if __name__ == '__main__':
+    unittest.main()
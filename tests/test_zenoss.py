@@ -0,0 +1,166 @@
+import json
+import logging
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Nagstamon.config import conf, Server
+from Nagstamon.servers.Zenoss import ZenossServer
+from Nagstamon.thirdparty.zenoss_api import ZenossAPI
+
+
+EVENT_STATES = {'New': 0, 'Acknowledged': 1, 'Closed': 3, 'Cleared': 4, 'Aged': 6}
+
+
+def event(evid, device, last_time, severity=5, event_state='New', state_change=None):
+    """
+    minimal EventsRouter query result entry
+    """
+    return {'evid': evid, 'device': {'text': device}, 'eventClass': {'text': '/Status/Ping'},
+            'severity': severity, 'firstTime': '2024-01-01 00:00:00', 'lastTime': last_time,
+            'stateChange': state_change or last_time, 'message': f'{device} down', 'count': 1,
+            'eventState': event_state}
+
+
+class StandInZenossAPI:
+    """
+    stand-in for ZenossAPI which records the lastTime timestamps asked for
+    """
+    def __init__(self):
+        self.queries = []
+        self.state_change_queries = []
+        self.events = []
+
+    def get_event(self, device=None, component=None, eventClass=None, last_time=None, state_change=None,
+                  event_states=(0, 1)):
+        if state_change is not None:
+            self.state_change_queries.append(state_change)
+        else:
+            self.queries.append(last_time)
+        return {'events': [e for e in self.events if EVENT_STATES[e['eventState']] in event_states and
+                           (last_time is None or e['lastTime'] >= last_time) and
+                           (state_change is None or e['stateChange'] >= state_change)]}
+
+    def clear_event(self, evid, state_change):
+        # like Zenoss clearing leaves lastTime untouched
+        for e in self.events:
+            if e['evid'] == evid:
+                e['eventState'] = 'Cleared'
+                e['stateChange'] = state_change
+
+    def set_event_ack(self, evid):
+        # like Zenoss acknowledging leaves lastTime untouched
+        for e in self.events:
+            if e['evid'] == evid:
+                e['eventState'] = 'Acknowledged'
+
+
+class RouterHandler(BaseHTTPRequestHandler):
+    """
+    stand-in for Zenoss login and EventsRouter
+    """
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = json.dumps({'result': {'events': [event('1', 'router', '2024-01-01 00:05:00')]}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class test_zenoss_api(unittest.TestCase):
+
+    def setUp(self):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), RouterHandler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        self.server = Server()
+        self.server.server_url, self.server.server_port = '127.0.0.1', str(self.httpd.server_address[1])
+
+    def tearDown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def test_timing_hook(self):
+        timings = []
+        api = ZenossAPI(Server=self.server, timing_hook=lambda *args: timings.append(args))
+
+        with self.assertLogs('Nagstamon.thirdparty.zenoss_api', logging.DEBUG):
+            events = api.get_event()
+
+        self.assertEqual(len(events['events']), 1)
+        # same arguments as GenericServer.debug_request_timing() expects
+        method, url, status_code, duration = timings[0]
+        self.assertEqual((method, status_code), ('POST', 200))
+        self.assertTrue(url.endswith('/zport/dmd/evconsole_router'))
+        self.assertGreater(duration, 0)
+
+
+class test_zenoss(unittest.TestCase):
+
+    def setUp(self):
+        conf.servers['zenoss-stand-in'] = Server()
+        conf.servers['zenoss-stand-in'].monitor_url = 'zenoss:8080'
+        self.server = ZenossServer(name='zenoss-stand-in')
+        self.server.zapi = StandInZenossAPI()
+
+    def tearDown(self):
+        conf.servers.pop('zenoss-stand-in')
+
+    def test_incremental_polling(self):
+        zapi = self.server.zapi
+        zapi.events = [event('1', 'router', '2024-01-01 00:05:00'),
+                       event('2', 'switch', '2024-01-01 00:06:00')]
+        self.assertEqual(self.server._get_status().error, '')
+        self.assertEqual(set(self.server.new_hosts), {'router', 'switch'})
+
+        # only events since the newest one are asked for and merged into the known ones
+        zapi.events = [event('1', 'router', '2024-01-01 00:05:00'),
+                       event('2', 'switch', '2024-01-01 00:07:00', event_state='Acknowledged'),
+                       event('3', 'server', '2024-01-01 00:08:00')]
+        self.assertEqual(self.server._get_status().error, '')
+        self.assertEqual(zapi.queries, [None, '2024-01-01 00:06:00'])
+        self.assertEqual(set(self.server.new_hosts), {'router', 'switch', 'server'})
+        self.assertTrue(self.server.new_hosts['switch'].services['switch'].acknowledged)
+
+        # full sync drops events which are gone
+        zapi.events = zapi.events[1:]
+        self.server.events_full_sync -= ZenossServer.FULL_SYNC_INTERVAL + 1
+        self.assertEqual(self.server._get_status().error, '')
+        self.assertEqual(zapi.queries[-1], None)
+        self.assertEqual(set(self.server.new_hosts), {'switch', 'server'})
+
+    def test_cleared_event_dropped(self):
+        zapi = self.server.zapi
+        zapi.events = [event('1', 'router', '2024-01-01 00:05:00'),
+                       event('2', 'switch', '2024-01-01 00:06:00')]
+        self.assertEqual(self.server._get_status().error, '')
+        self.assertEqual(self.server._get_status().error, '')
+
+        zapi.clear_event('1', '2024-01-01 00:07:00')
+        self.assertEqual(self.server._get_status().error, '')
+
+        # recovered problem is gone without waiting for the next full sync
+        self.assertEqual(zapi.queries, [None, '2024-01-01 00:06:00', '2024-01-01 00:06:00'])
+        self.assertEqual(zapi.state_change_queries, ['2024-01-01 00:06:00', '2024-01-01 00:06:00'])
+        self.assertEqual(set(self.server.new_hosts), {'switch'})
+
+    def test_acknowledge_forces_full_sync(self):
+        zapi = self.server.zapi
+        zapi.events = [event('1', 'router', '2024-01-01 00:05:00')]
+        self.assertEqual(self.server._get_status().error, '')
+        self.server.hosts = self.server.new_hosts
+
+        self.server.set_acknowledge({'host': 'router'})
+        self.assertEqual(self.server._get_status().error, '')
+
+        # acknowledged event would not be found by an incremental query
+        self.assertEqual(zapi.queries, [None, None])
+        self.assertTrue(self.server.new_hosts['router'].services['router'].acknowledged)
+
+
+if __name__ == '__main__':
+    unittest.main()